@@ -0,0 +1,204 @@
+'''
+Offline end-to-end benchmark for the audit pipeline.
+
+Drives `create_graph()`'s app directly and/or the FastAPI /audit endpoint at
+fixed concurrency levels against local fakes of every Azure service (see
+fake_services.py) and reports p50/p95/p99 latency, throughput and peak RSS.
+
+Usage:
+    uv run python -m backend.benchmarks.benchmark_pipeline --concurrency 1,8,32 --requests 32
+    uv run python -m backend.benchmarks.benchmark_pipeline --target api --vi-delay 5 --json results.json
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger("benchmark")
+
+
+class PeakRSS:
+    '''Samples this process's resident set size in the background and keeps the peak.'''
+
+    def __init__(self, interval: float = 0.05):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def summarise(target, concurrency, latencies, errors, wall, peak_rss):
+    values = np.array(latencies) if latencies else np.array([0.0])
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_s": round(float(np.percentile(values, 50)), 3),
+        "p95_s": round(float(np.percentile(values, 95)), 3),
+        "p99_s": round(float(np.percentile(values, 99)), 3),
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall else 0.0,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+    }
+
+
+def run_level(target, concurrency, requests, call):
+    '''Runs `requests` calls of `call(i)` with `concurrency` in flight; `call` returns True on success.'''
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def _timed(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception as e:
+            logger.error(f"Request {i} failed : {e}")
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(_timed, range(requests)))
+        wall = time.perf_counter() - started
+    return summarise(target, concurrency, latencies, errors, wall, rss.peak)
+
+
+def graph_caller(graph):
+    from backend.src.graph.checkpoint import session_config
+
+    def _call(i):
+        final_state = graph.invoke({
+            "video_url": f"https://youtu.be/bench{i:07d}",
+            "video_id": f"vid_bench{i}",
+            "compliance_results": [],
+            "errors": []
+        }, session_config(f"bench-{i}-{time.time_ns()}"))
+        return not final_state.get("errors")
+    return _call
+
+
+def api_caller(base_url, poll_interval=0.1, timeout=600):
+    import httpx
+
+    client = httpx.Client(base_url=base_url, timeout=30)
+
+    def _call(i):
+        job = client.post("/audit", json={"video_url": f"https://youtu.be/bench{i:07d}"}).json()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            status = client.get(f"/audit/{job['job_id']}").json()
+            if status["status"] == "COMPLETED":
+                return True
+            if status["status"] == "FAILED":
+                return False
+            time.sleep(poll_interval)
+        return False
+    return _call
+
+
+def print_table(rows):
+    columns = ["target", "concurrency", "requests", "errors", "p50_s", "p95_s", "p99_s",
+               "throughput_per_s", "peak_rss_mb"]
+    print(" | ".join(f"{c:>16}" for c in columns))
+    for row in rows:
+        print(" | ".join(f"{row[c]!s:>16}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline audit pipeline benchmark")
+    parser.add_argument("--target", choices=["graph", "api", "both"], default="both")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="audits per concurrency level")
+    parser.add_argument("--vi-delay", type=float, default=2.0, help="fake Video Indexer processing time (s)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Video Indexer poll interval (s)")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="fake chat completion latency (s)")
+    parser.add_argument("--embed-delay", type=float, default=0.05, help="fake embedding latency (s)")
+    parser.add_argument("--download-delay", type=float, default=0.1, help="fake YouTube download time (s)")
+    parser.add_argument("--video-mb", type=float, default=5.0, help="size of the fake video (MB)")
+    parser.add_argument("--index-extra-faces", type=int, default=0,
+                        help="unused face/label insights added to the fake /Index payload (sizes it like a long video)")
+    parser.add_argument("--fake-port", type=int, default=8765)
+    parser.add_argument("--api-port", type=int, default=8766)
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    workdir = tempfile.mkdtemp(prefix="audit_bench_")
+
+    from backend.benchmarks.fake_services import (
+        create_fake_app, BackgroundServer, build_fake_rules_index, fake_environment, install_download_stub
+    )
+
+    rules_path = os.path.join(workdir, "rules_index")
+    build_fake_rules_index(rules_path)
+    fake_app = create_fake_app(vi_delay=args.vi_delay, llm_delay=args.llm_delay, embed_delay=args.embed_delay,
+                               index_extra_faces=args.index_extra_faces)
+
+    rows = []
+    with BackgroundServer(fake_app, args.fake_port) as fake:
+        os.environ.update(fake_environment(fake.url, rules_path, args.poll_interval))
+        os.environ.setdefault("AUDIT_MAX_WORKERS", str(max(levels)))
+        os.environ.setdefault("VIDEO_SPOOL_DIR", workdir)
+
+        # the ARM token comes from DefaultAzureCredential; seed it so no real identity is needed
+        from backend.src.services.video_indexer import token_cache
+        token_cache.get(("arm",), lambda: ("fake-arm-token", time.time() + 86400))
+        install_download_stub(int(args.video_mb * 1024 * 1024), args.download_delay)
+
+        if args.target in ("graph", "both"):
+            from backend.src.graph.workflow import create_graph
+            graph = create_graph()
+            for level in levels:
+                rows.append(run_level("graph", level, args.requests, graph_caller(graph)))
+                print_table(rows[-1:])
+
+        if args.target in ("api", "both"):
+            import backend.src.api.server as server
+            with BackgroundServer(server.app, args.api_port) as api:
+                for level in levels:
+                    rows.append(run_level("api", level, args.requests, api_caller(api.url)))
+                    print_table(rows[-1:])
+
+    print("\n=== BENCHMARK RESULTS ===")
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
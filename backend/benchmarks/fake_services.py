@@ -0,0 +1,238 @@
+'''
+Local stand-ins for the Azure services used by the audit pipeline.
+
+One FastAPI app serves:
+- ARM generateAccessToken           (management plane)
+- Video Indexer upload + /Index      (processing finishes after `vi_delay` seconds)
+- Azure OpenAI chat completions      (canned JSON verdict after `llm_delay` seconds)
+- Azure OpenAI embeddings            (deterministic vectors after `embed_delay` seconds)
+
+The search index is stood in for by a generated local NumPy index
+(RULES_RETRIEVER=local) and YouTube by a download stub that writes
+`video_bytes` bytes after `download_delay` seconds.
+'''
+
+import os
+import time
+import json
+import uuid
+import asyncio
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from langchain_core.documents import Document
+
+from backend.src.services.retrievers import export_local_index
+
+EMBEDDING_DIMENSIONS = 64
+
+FAKE_VERDICT = {
+    "compliance_results": [
+        {
+            "category": "Claim Violation",
+            "severity": "HIGH",
+            "description": "Absolute efficacy claim without substantiation."
+        }
+    ],
+    "status": "FAIL",
+    "final_report": "Benchmark verdict."
+}
+
+
+def fake_embedding(text: str):
+    # deterministic, so the same query always retrieves the same rules
+    seed = int.from_bytes(hashlib.sha256(str(text).encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=EMBEDDING_DIMENSIONS).astype(np.float32).tolist()
+
+
+def fake_index_payload(video_id: str, transcript_lines: int = 40, ocr_lines: int = 20, extra_faces: int = 0,
+                       included_insights: Optional[str] = None) -> Dict[str, Any]:
+    transcript = [
+        {"text": f"Line {i}: this product is guaranteed to work for everyone.",
+         "instances": [{"start": f"0:00:{i % 60:02d}", "end": f"0:00:{i % 60:02d}.9"}]}
+        for i in range(transcript_lines)
+    ]
+    ocr = [
+        {"text": "Limited offer #ad" if i % 2 else "Buy now",
+         "instances": [{"start": f"0:00:{i % 60:02d}", "end": f"0:00:{i % 60:02d}.5"}]}
+        for i in range(ocr_lines)
+    ]
+    # face / label insights the audit never reads, to size the payload like a long video's index
+    faces = [
+        {"id": i, "name": f"Unknown #{i}", "confidence": 0.9, "thumbnails": [{"id": uuid.uuid4().hex, "fileName": f"f{i}.jpg",
+         "instances": [{"start": "0:00:01", "end": "0:00:02"}]}]}
+        for i in range(extra_faces)
+    ]
+    insights = {"transcript": transcript, "ocr": ocr, "faces": faces, "labels": faces}
+    if included_insights:
+        # like Video Indexer's includedInsights filter
+        wanted = {name.strip().lower() for name in included_insights.split(",")}
+        insights = {name: value for name, value in insights.items() if name.lower() in wanted}
+    return {
+        "id": video_id,
+        "state": "Processed",
+        "summarizedInsights": {"duration": {"seconds": 60}, "faces": faces},
+        "videos": [{"processingProgress": "100%", "insights": insights}]
+    }
+
+
+def create_fake_app(vi_delay: float = 2.0, llm_delay: float = 0.5, embed_delay: float = 0.05,
+                    index_extra_faces: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake Azure services")
+    uploads: Dict[str, float] = {}
+    counters = {"uploads": 0, "url_uploads": 0, "polls": 0, "account_tokens": 0, "chat": 0, "embeddings": 0}
+
+    @app.post("/subscriptions/{sub}/resourceGroups/{rg}/providers/Microsoft.VideoIndexer/accounts/{name}/generateAccessToken")
+    async def generate_access_token(sub: str, rg: str, name: str):
+        counters["account_tokens"] += 1
+        return {"accessToken": f"fake-vi-token-{uuid.uuid4().hex}"}
+
+    @app.post("/{location}/Accounts/{account}/Videos")
+    async def upload(location: str, account: str, request: Request):
+        # drain the body so upload bytes are actually transferred
+        async for _ in request.stream():
+            pass
+        video_id = uuid.uuid4().hex[:10]
+        uploads[video_id] = time.time()
+        counters["uploads"] += 1
+        if request.query_params.get("videoUrl"):
+            counters["url_uploads"] += 1
+        return {"id": video_id}
+
+    @app.get("/{location}/Accounts/{account}/Videos/{video_id}/Index")
+    async def index(location: str, account: str, video_id: str, includedInsights: Optional[str] = None):
+        counters["polls"] += 1
+        started = uploads.get(video_id)
+        if started is None:
+            return {"id": video_id, "state": "Failed"}
+        if time.time() - started < vi_delay:
+            return {"id": video_id, "state": "Processing"}
+        return fake_index_payload(video_id, extra_faces=index_extra_faces, included_insights=includedInsights)
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat(deployment: str, request: Request):
+        body = await request.json()
+        counters["chat"] += 1
+        await asyncio.sleep(llm_delay)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(FAKE_VERDICT)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": 60,
+                      "total_tokens": prompt_chars // 4 + 60}
+        }
+
+    @app.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        body = await request.json()
+        counters["embeddings"] += 1
+        await asyncio.sleep(embed_delay)
+        inputs = body.get("input", [])
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        return {
+            "object": "list",
+            "model": deployment,
+            "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+                     for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": 8 * len(inputs), "total_tokens": 8 * len(inputs)}
+        }
+
+    @app.get("/_counters")
+    async def get_counters():
+        return counters
+
+    return app
+
+
+class BackgroundServer:
+    '''Runs an ASGI app with uvicorn on a daemon thread.'''
+
+    def __init__(self, app, port: int, host: str = "127.0.0.1"):
+        self.url = f"http://{host}:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def build_fake_rules_index(path: str, chunks: int = 200):
+    '''Writes a local rules index so retrieval runs without Azure AI Search.'''
+    documents = [
+        Document(page_content=f"Rule {i}: disclosures must be clear and conspicuous.", metadata={"source": "fake"})
+        for i in range(chunks)
+    ]
+    vectors = [fake_embedding(doc.page_content) for doc in documents]
+    export_local_index(path, vectors, documents)
+
+
+def fake_environment(fake_url: str, rules_index_path: str, poll_interval: float) -> Dict[str, str]:
+    '''Environment that points every Azure client at the fakes.'''
+    return {
+        "AZURE_OPENAI_ENDPOINT": fake_url,
+        "AZURE_OPENAI_API_KEY": "fake-key",
+        "AZURE_OPENAI_API_VERSION": "2024-02-01",
+        "AZURE_OPENAI_CHAT_MODEL": "gpt-4o",
+        "AZURE_OPENAI_EMBEDDING_MODEL": "text-embedding-3-small",
+        "AZURE_OPENAI_EMBEDDING_CHECK_CTX": "false",
+        "AZURE_VIDEO_INDEXER_API_URL": fake_url,
+        "AZURE_MANAGEMENT_URL": fake_url,
+        "AZURE_VIDEO_INDEXER_ACCOUNT_ID": "fake-account",
+        "AZURE_VIDEO_INDEXER_LOCATION": "trial",
+        "AZURE_VIDEO_INDEXER_SUBSCRIPTION_ID": "fake-sub",
+        "AZURE_RESOURCE_GROUP": "fake-rg",
+        "VIDEO_INDEXER_POLL_INTERVAL": str(poll_interval),
+        "RULES_RETRIEVER": "local",
+        "RULES_LOCAL_INDEX_PATH": rules_index_path,
+        "AUDIT_CACHE_BACKEND": "none",
+        "LLM_CACHE_BACKEND": "none",
+        "TELEMETRY_LOCAL_EXPORTER": "none",
+    }
+
+
+def install_download_stub(video_bytes: int, download_delay: float, chunk_size: int = 1024 * 1024):
+    '''Replaces the yt-dlp download with a local stand-in producing `video_bytes` bytes.'''
+    from backend.src.services.video_indexer import VideoIndexerService
+
+    def download_youtube_video(self, url, output_path="temp_video.mp4", format_selector="best"):
+        time.sleep(download_delay)
+        with open(output_path, "wb") as f:
+            remaining = video_bytes
+            while remaining > 0:
+                f.write(os.urandom(min(chunk_size, remaining)))
+                remaining -= chunk_size
+        return output_path
+
+    def stream_youtube_video(self, url, chunk_size: Optional[int] = chunk_size, buffer_chunks=None,
+                             format_selector="best"):
+        time.sleep(download_delay)
+        remaining = video_bytes
+        while remaining > 0:
+            yield os.urandom(min(chunk_size, remaining))
+            remaining -= chunk_size
+
+    def resolve_media_url(self, url, format_selector="best"):
+        return f"https://media.invalid/{url.rsplit('/', 1)[-1]}.mp4"
+
+    VideoIndexerService.download_youtube_video = download_youtube_video
+    VideoIndexerService.resolve_media_url = resolve_media_url
+    VideoIndexerService.stream_youtube_video = stream_youtube_video
@@ -0,0 +1,128 @@
+'''
+Cold-start benchmark : how long a fresh process takes to import the API,
+compile the graph and answer its first health check.
+
+Every measurement runs in a new interpreter (nothing cached in sys.modules)
+and is repeated; the median is reported. `--top` lists the slowest imports of
+the API module from `python -X importtime`.
+
+Usage:
+    uv run python -m backend.benchmarks.import_time --repeat 5 --top 15
+    uv run python -m backend.benchmarks.import_time --json cold_start.json
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+import httpx
+
+# name -> code timed inside a fresh interpreter
+STEPS = {
+    "import telemetry": "import backend.src.api.telemetry",
+    "import server": "import backend.src.api.server",
+    "import worker": "import backend.src.worker",
+    "import workflow": "import backend.src.graph.workflow",
+    "compile graph": "import backend.src.graph.workflow as w; w.get_graph()",
+}
+
+_TIMER = "import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+
+
+def _environment():
+    env = dict(os.environ)
+    env.setdefault("TELEMETRY_LOCAL_EXPORTER", "none")
+    env.setdefault("PYTHONPATH", os.getcwd())
+    return env
+
+
+def time_step(code, repeat):
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(code=code)],
+            capture_output=True, text=True, check=True, env=_environment()
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+
+def time_to_ready(repeat, port, timeout=60.0):
+    '''Seconds from spawning uvicorn until GET /health answers 200.'''
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.src.api.server:app", "--port", str(port), "--log-level", "warning"],
+            env=_environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                        samples.append(time.perf_counter() - started)
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.02)
+        finally:
+            server.terminate()
+            server.wait()
+    return samples
+
+
+def slowest_imports(module, top):
+    '''(cumulative seconds, module) of the `top` slowest imports, from -X importtime.'''
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_environment()
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start (import time) benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--steps", default=",".join(STEPS), help="comma-separated subset of: " + ", ".join(STEPS))
+    parser.add_argument("--no-ready", action="store_true", help="skip the uvicorn time-to-ready measurement")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports of the API module to list (0 = none)")
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for name in args.steps.split(","):
+        samples = time_step(STEPS[name], args.repeat)
+        rows.append({"step": name, "median_s": round(statistics.median(samples), 3),
+                     "max_s": round(max(samples), 3)})
+        print(f"{name:>20} | median {rows[-1]['median_s']:>7.3f}s | max {rows[-1]['max_s']:>7.3f}s")
+    if not args.no_ready:
+        samples = time_to_ready(args.repeat, args.port)
+        if samples:
+            rows.append({"step": "uvicorn ready", "median_s": round(statistics.median(samples), 3),
+                         "max_s": round(max(samples), 3)})
+            print(f"{'uvicorn ready':>20} | median {rows[-1]['median_s']:>7.3f}s | max {rows[-1]['max_s']:>7.3f}s")
+        else:
+            print(f"{'uvicorn ready':>20} | did not become ready")
+
+    if args.top:
+        print("\n=== SLOWEST IMPORTS (backend.src.api.server, cumulative) ===")
+        for seconds, module in slowest_imports("backend.src.api.server", args.top):
+            print(f"{seconds:>8.3f}s  {module}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
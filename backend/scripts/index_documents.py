@@ -1,6 +1,9 @@
 import os
+import sys
 import glob
+import argparse
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from sqlalchemy import exc
 load_dotenv(override=True)
@@ -13,6 +16,13 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from langchain_community.vectorstores import AzureSearch
 
+# make `backend.src...` importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from backend.src.services.retrievers import export_local_index, load_local_entries, DEFAULT_LOCAL_INDEX_PATH
+from backend.src.services.index_manifest import (
+    IndexManifest, file_sha256, chunk_id, version_of, azure_target, local_target
+)
+
 # setup logging
 logging.basicConfig(
     level = logging.INFO,
@@ -21,9 +31,71 @@ logging.basicConfig(
 
 logger = logging.getLogger("indexer")
 
-def index_docs():
+
+def load_and_split(pdf_path):
+    '''
+    Loads one PDF and splits it into chunks keyed by chunk id.
+    Module-level so it can run in a worker process.
+    '''
+    loader = PyPDFLoader(pdf_path)
+    raw_docs = loader.load()
+
+    # chunking strategy
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size = 1000,
+        chunk_overlap = 200
+    )
+    splits = text_splitter.split_documents(raw_docs)
+    chunks = {}
+    for split in splits:
+        split.metadata["source"] = os.path.basename(pdf_path)
+        split.metadata["chunk_id"] = chunk_id(split.metadata["source"], split.page_content)
+        chunks[split.metadata["chunk_id"]] = split
+    return chunks
+
+
+def azure_document_ids(vector_store):
+    '''Keys of every document currently in the Azure AI Search index (paged by the SDK).'''
+    from langchain_community.vectorstores.azuresearch import FIELDS_ID
+    return {doc[FIELDS_ID] for doc in vector_store.client.search(search_text="*", select=[FIELDS_ID])}
+
+
+def embed_in_batches(embeddings, docs, batch_size, concurrency, on_batch=None):
+    '''
+    Embeds {chunk id: Document} in batches of `batch_size` with at most
+    `concurrency` requests in flight. `on_batch(ids, docs, vectors)` is called
+    as each batch completes, so uploads can start before embedding finishes.
+    Returns {chunk id: vector}.
+    '''
+    items = list(docs.items())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    vectors = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(embeddings.embed_documents, [doc.page_content for _, doc in batch]): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            batch_vectors = future.result()
+            ids = [cid for cid, _ in batch]
+            vectors.update(zip(ids, batch_vectors))
+            if on_batch:
+                on_batch(ids, [doc for _, doc in batch], batch_vectors)
+    logger.info(f"Embedded {len(items)} chunks in {len(batches)} batches")
+    return vectors
+
+
+def index_docs(export_local=None, quantization="none", ann_lists=0, local_only=False, full=False,
+               workers=None, embed_batch_size=64, embed_concurrency=4, upload_concurrency=2):
     '''
     Read the PDFs, chunks them, and upload them to Azure AI Search
+    Optionally exports the same chunks to a local NumPy index (RULES_RETRIEVER=local)
+    Incremental : a hash manifest tracks indexed files and chunks, so only new or
+    changed chunks are embedded/uploaded and chunks that disappeared are deleted
+    (full=True re-indexes everything)
+    Throughput : PDFs are parsed in a process pool, embeddings are requested in
+    batches with bounded concurrency and each batch is uploaded as soon as it is embedded
     '''
 
     # define paths, we look for data folder
@@ -33,11 +105,14 @@ def index_docs():
     # validate the required environment variables
     required_vars = [
         "AZURE_OPENAI_ENDPOINT",
-        "AZURE_OPENAI_API_KEY",
-        "AZURE_AI_SEARCH_ENDPOINT",
-        "AZURE_AI_SEARCH_API_KEY",
-        "AZURE_AI_SEARCH_INDEX_NAME"
+        "AZURE_OPENAI_API_KEY"
     ]
+    if not local_only:
+        required_vars += [
+            "AZURE_AI_SEARCH_ENDPOINT",
+            "AZURE_AI_SEARCH_API_KEY",
+            "AZURE_AI_SEARCH_INDEX_NAME"
+        ]
 
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
@@ -60,20 +135,39 @@ def index_docs():
         logger.error("Please verify the Azure Open AI deployment name and endpoints")
 
     index_name = os.getenv("AZURE_AI_SEARCH_INDEX_NAME")
+    vector_store = None
     # initialize Azure Search
-    try:
-        logger.info("Initializing Azure AI Search vector store")
-        vector_store = AzureSearch(
-            azure_search_endpoint = os.getenv("AZURE_AI_SEARCH_ENDPOINT"),
-            azure_search_key = os.getenv("AZURE_AI_SEARCH_API_KEY"),
-            index_name = os.getenv("AZURE_AI_SEARCH_INDEX_NAME"),
-            embedding_function = embeddings.embed_query
-        )
-        logger.info(f"Vector store initialized for index : {index_name}")
-    except Exception as e:
-        logger.error(f"Failed to initialize the Azure Search : {e}")
-        logger.error("Please verify the Azure Search Endpoints, API key and index name.")
-        return
+    if local_only:
+        logger.info("Skipping Azure AI Search upload (--local-only)")
+    else:
+        try:
+            logger.info("Initializing Azure AI Search vector store")
+            vector_store = AzureSearch(
+                azure_search_endpoint = os.getenv("AZURE_AI_SEARCH_ENDPOINT"),
+                azure_search_key = os.getenv("AZURE_AI_SEARCH_API_KEY"),
+                index_name = os.getenv("AZURE_AI_SEARCH_INDEX_NAME"),
+                embedding_function = embeddings.embed_query
+            )
+            logger.info(f"Vector store initialized for index : {index_name}")
+        except Exception as e:
+            logger.error(f"Failed to initialize the Azure Search : {e}")
+            logger.error("Please verify the Azure Search Endpoints, API key and index name.")
+            return
+
+    # Index targets tracked in the manifest
+    manifest = IndexManifest()
+    targets = []
+    if vector_store is not None:
+        targets.append(azure_target(index_name))
+    if export_local:
+        targets.append(local_target(export_local))
+    local_entries = load_local_entries(export_local) if export_local else {}
+    # what each target held before this run : a full rebuild deletes whatever it no longer produces
+    previous_files = {target: dict(manifest.files(target)) for target in targets}
+    for target in targets:
+        # a missing local index means everything has to be re-exported
+        if full or (target.startswith("local:") and not local_entries):
+            manifest.reset(target)
 
     # Find PDF files
     pdf_files = glob.glob(os.path.join(data_folder, "*.pdf"))
@@ -81,46 +175,165 @@ def index_docs():
         logger.warning(f"No PDFs found in {data_folder}. Please add files")
     logger.info(f"Found {len(pdf_files)} PDFs to process : {[os.path.basename(f) for f in pdf_files]}")
 
-    all_splits = []
+    # only parse files whose hash differs from what some target has indexed
+    file_hashes = {os.path.basename(f): file_sha256(f) for f in pdf_files}
+    changed_files = [
+        f for f in pdf_files
+        if any(manifest.files(t).get(os.path.basename(f), {}).get("sha256") != file_hashes[os.path.basename(f)]
+               for t in targets)
+    ]
+    logger.info(f"Skipping {len(pdf_files) - len(changed_files)} unchanged PDFs")
 
-    for pdf_path in pdf_files:
-        try:
-            logger.info(f"Loading : {os.path.basename(pdf_path)}....")
-            loader = PyPDFLoader(pdf_path)
-            raw_docs = loader.load()
-
-            # chunking strategy
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size = 1000,
-                chunk_overlap = 200
-            )
-            splits = text_splitter.split_documents(raw_docs)
-            for split in splits:
-                split.metadata["source"] = os.path.basename(pdf_path)
+    # {file name: {chunk id: Document}}
+    parsed = {}
 
-            all_splits.extend(splits)
-            logger.info(f"Splits in {len(splits)} chunks.")
-        
-        except Exception as e:
-            logger.error(f"Failed to process {pdf_path} : {e}")
+    # parse + split in parallel processes
+    if changed_files:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(load_and_split, pdf_path): pdf_path for pdf_path in changed_files}
+            for future in as_completed(futures):
+                pdf_path = futures[future]
+                try:
+                    chunks = future.result()
+                    parsed[os.path.basename(pdf_path)] = chunks
+                    logger.info(f"Loaded {os.path.basename(pdf_path)} : split in {len(chunks)} chunks.")
+                except Exception as e:
+                    # the manifest keeps this file's previous state, so it is retried next run
+                    logger.error(f"Failed to process {pdf_path} : {e}")
+
+    # vectors embedded during this run, shared between targets
+    embedded = {}
 
-        
-        # Upload to Azure 
-        if  all_splits:
-            logger.info(f"Uploading {len(all_splits)} chunks to Azure AI Search index {index_name}")
+    for target in targets:
+        indexed_files = manifest.files(target)
+        to_add, to_delete, unchanged = {}, set(), 0
+        for name, chunks in parsed.items():
+            if indexed_files.get(name, {}).get("sha256") == file_hashes[name]:
+                continue
+            previous = set(indexed_files.get(name, {}).get("chunks", []))
+            to_add.update({cid: doc for cid, doc in chunks.items() if cid not in previous})
+            to_delete |= previous - set(chunks)
+            unchanged += len(previous & set(chunks))
+        removed_files = [name for name in indexed_files if name not in file_hashes]
+        for name in removed_files:
+            to_delete |= set(indexed_files[name]["chunks"])
+        if full:
+            # the reset manifest no longer lists deleted or renamed PDFs : drop every chunk the target
+            # holds that this run did not produce, keeping those of PDFs that failed to parse
+            existing = {cid for entry in previous_files[target].values() for cid in entry["chunks"]}
             try:
-                # azure search accepts batches automatically via this method
-                vector_store.add_documents(documents=all_splits)
-                logger.info("="*60)
-                logger.info("Indexing Complete! Knowledge base is  ready...")
-                logger.info(f"Total chunk indexed : {len(all_splits)}")
-                logger.info("="*60)
+                existing |= azure_document_ids(vector_store) if target.startswith("azure:") else set(local_entries)
             except Exception as e:
-                logger.error(f"Failed to upload the documents to Azure Search : {e}")
-                logger.error("Please check Azure Search configuration and try again")
-        
-        else:
-            logger.warning("No documents were processed.")
+                logger.warning(f"[{target}] Could not list indexed documents, deleting manifest chunks only : {e}")
+            keep = {cid for chunks in parsed.values() for cid in chunks}
+            keep |= {
+                cid for name, entry in previous_files[target].items()
+                if name in file_hashes and name not in parsed for cid in entry["chunks"]
+            }
+            to_delete |= existing - keep
+
+        logger.info(
+            f"[{target}] {len(to_add)} chunks to add, {len(to_delete)} to delete, "
+            f"{unchanged} unchanged in changed files, {len(removed_files)} removed files"
+        )
+        if not (to_add or to_delete):
+            logger.info(f"[{target}] Index is up to date.")
+            continue
+
+        try:
+            if target.startswith("azure:"):
+                # Upload to Azure 
+                if to_delete:
+                    vector_store.delete(ids=sorted(to_delete))
+                if to_add:
+                    logger.info(f"Uploading {len(to_add)} chunks to Azure AI Search index {index_name}")
+                    with ThreadPoolExecutor(max_workers=max(1, upload_concurrency)) as uploader:
+                        uploads = []
+
+                        def _upload(ids, docs, vectors):
+                            # vectors are precomputed, so the store does not embed row by row
+                            uploads.append(uploader.submit(
+                                vector_store.add_embeddings,
+                                zip([doc.page_content for doc in docs], vectors),
+                                [doc.metadata for doc in docs],
+                                keys=ids
+                            ))
+
+                        reused = {cid: to_add[cid] for cid in to_add if cid in embedded}
+                        if reused:
+                            _upload(list(reused), list(reused.values()), [embedded[cid] for cid in reused])
+                        pending = {cid: doc for cid, doc in to_add.items() if cid not in embedded}
+                        embedded.update(embed_in_batches(
+                            embeddings, pending, embed_batch_size, embed_concurrency, on_batch=_upload
+                        ))
+                        for upload in uploads:
+                            upload.result()
+            else:
+                # Export to the local in-process index : reuse stored vectors, embed only new chunks
+                entries = {cid: entry for cid, entry in local_entries.items() if cid not in to_delete}
+                if to_add:
+                    pending = {cid: doc for cid, doc in to_add.items() if cid not in embedded}
+                    logger.info(f"Embedding {len(pending)} chunks for the local index")
+                    embedded.update(embed_in_batches(embeddings, pending, embed_batch_size, embed_concurrency))
+                    entries.update({cid: (doc, embedded[cid]) for cid, doc in to_add.items()})
+                export_local_index(
+                    export_local,
+                    [vec for _, vec in entries.values()],
+                    [doc for doc, _ in entries.values()],
+                    quantization=quantization,
+                    ann_lists=ann_lists,
+                    embedding_model=os.getenv("AZURE_OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
+                    version=version_of(entries)
+                )
+        except Exception as e:
+            logger.error(f"Failed to update {target} : {e}")
+            logger.error("Please check the index configuration and try again")
+            continue
+
+        # record the new state only after the target accepted it
+        for name, chunks in parsed.items():
+            manifest.set_file(target, name, file_hashes[name], chunks.keys())
+        for name in removed_files:
+            manifest.remove_file(target, name)
+        manifest.save()
+
+        logger.info("="*60)
+        logger.info("Indexing Complete! Knowledge base is  ready...")
+        logger.info(f"[{target}] added {len(to_add)}, deleted {len(to_delete)}, version {manifest.version(target)}")
+        if target.startswith("azure:"):
+            # API and worker hosts have no manifest : this is how their caches learn the index changed
+            logger.info(f"Set RULES_INDEX_VERSION={manifest.version(target)} on every API and worker host")
+        logger.info("="*60)
 
 if __name__ == "__main__":
-    index_docs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index compliance PDFs into the rules knowledge base")
+    parser.add_argument("--export-local", nargs="?", const=DEFAULT_LOCAL_INDEX_PATH, default=None,
+                        help="also write a local NumPy index (default path: backend/data/rules_index)")
+    parser.add_argument("--quantization", choices=["none", "int8"], default="none",
+                        help="storage type of the local index")
+    parser.add_argument("--ann-lists", type=int, default=0,
+                        help="IVF lists for approximate search in the local index (0 = brute force)")
+    parser.add_argument("--local-only", action="store_true",
+                        help="skip the Azure AI Search upload and only export the local index")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the manifest and re-index every PDF")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes used to parse PDFs (default: CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64")),
+                        help="chunks per embedding request")
+    parser.add_argument("--embed-concurrency", type=int, default=int(os.getenv("INDEX_EMBED_CONCURRENCY", "4")),
+                        help="embedding requests in flight")
+    parser.add_argument("--upload-concurrency", type=int, default=int(os.getenv("INDEX_UPLOAD_CONCURRENCY", "2")),
+                        help="search index upload batches in flight")
+    args = parser.parse_args()
+    index_docs(
+        export_local=args.export_local or (DEFAULT_LOCAL_INDEX_PATH if args.local_only else None),
+        quantization=args.quantization,
+        ann_lists=args.ann_lists,
+        local_only=args.local_only,
+        full=args.full,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        upload_concurrency=args.upload_concurrency
+    )
\ No newline at end of file
@@ -0,0 +1,392 @@
+'''
+Durable audit queue shared by the API and separate worker processes
+(python -m backend.src.worker), so API and audit capacity scale separately.
+
+AUDIT_QUEUE_BACKEND =
+  inprocess (default) : the API runs audits itself (jobs.AuditJobManager)
+  sqlite              : single-host stand-in, AUDIT_QUEUE_PATH (default audit_queue.sqlite)
+  redis               : production, REDIS_URL
+
+Delivery is at-least-once with visibility timeouts : a reserved job carries a
+lease that the worker renews with heartbeats. If the worker dies, the lease
+expires after AUDIT_QUEUE_VISIBILITY_TIMEOUT seconds and the job is queued
+again, up to AUDIT_QUEUE_MAX_ATTEMPTS attempts. A worker whose lease was taken
+over can no longer complete the job.
+
+Job snapshots have the same shape as AuditJobManager's, plus "attempts".
+'''
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from backend.src.api.jobs import QUEUED, RUNNING, COMPLETED, FAILED, QueueFullError, queue_limits
+
+logger = logging.getLogger("audit-queue")
+
+
+def _settings():
+    return {
+        "visibility_timeout": int(os.getenv("AUDIT_QUEUE_VISIBILITY_TIMEOUT", "300")),
+        "max_attempts": int(os.getenv("AUDIT_QUEUE_MAX_ATTEMPTS", "3")),
+        "result_ttl": int(os.getenv("AUDIT_JOB_TTL_SECONDS", "3600")),
+    }
+
+
+class SqliteJobQueue:
+    '''
+    Queue in one SQLite file; safe across processes on the same host.
+    Reservations run in BEGIN IMMEDIATE transactions so two workers never take the same job.
+    '''
+
+    def __init__(self, path: str, max_depth: int, retry_after: int, visibility_timeout: int = 300,
+                 max_attempts: int = 3, result_ttl: int = 3600):
+        self.path = path
+        self.max_depth = max_depth
+        self.retry_after = retry_after
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit_jobs ("
+                " job_id TEXT PRIMARY KEY, video_id TEXT, payload TEXT NOT NULL, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, lease TEXT, visible_at REAL,"
+                " submitted_at REAL, started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS audit_jobs_status ON audit_jobs (status, submitted_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # one connection per thread; autocommit, with explicit transactions where it matters
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            depth = conn.execute("SELECT COUNT(*) FROM audit_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if depth >= self.max_depth:
+                raise QueueFullError(depth, self.retry_after)
+            conn.execute(
+                "INSERT OR REPLACE INTO audit_jobs (job_id, video_id, payload, status, attempts, submitted_at)"
+                " VALUES (?, ?, ?, ?, 0, ?)",
+                (job_id, payload.get("video_id"), json.dumps(payload), QUEUED, time.time())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id)
+
+    def reserve(self) -> Optional[Dict[str, Any]]:
+        '''Takes the oldest queued job (or one whose lease expired); returns {"job_id", "payload", "lease", "attempts"}.'''
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM audit_jobs WHERE status = ? ORDER BY submitted_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            lease = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE audit_jobs SET status = ?, attempts = attempts + 1, lease = ?, visible_at = ?,"
+                " started_at = ? WHERE job_id = ?",
+                (RUNNING, lease, now + self.visibility_timeout, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"job_id": row["job_id"], "payload": json.loads(row["payload"]), "lease": lease,
+                "attempts": row["attempts"] + 1}
+
+    def _expire_leases(self, conn, now):
+        # running jobs whose worker stopped heartbeating : retry, or give up after max_attempts
+        for row in conn.execute(
+            "SELECT job_id, attempts FROM audit_jobs WHERE status = ? AND visible_at < ?", (RUNNING, now)
+        ).fetchall():
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE audit_jobs SET status = ?, lease = NULL, finished_at = ?, error = ? WHERE job_id = ?",
+                    (FAILED, now, f"Worker lost after {row['attempts']} attempts", row["job_id"])
+                )
+            else:
+                logger.warning(f"Lease expired for job {row['job_id']}; queueing attempt {row['attempts'] + 1}")
+                conn.execute("UPDATE audit_jobs SET status = ?, lease = NULL WHERE job_id = ?", (QUEUED, row["job_id"]))
+
+    def heartbeat(self, job_id: str, lease: str) -> bool:
+        '''Extends the lease; False if the job was taken over or finished meanwhile.'''
+        cursor = self._connect().execute(
+            "UPDATE audit_jobs SET visible_at = ? WHERE job_id = ? AND lease = ? AND status = ?",
+            (time.time() + self.visibility_timeout, job_id, lease, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, lease: str, result: Dict[str, Any]) -> bool:
+        cursor = self._connect().execute(
+            "UPDATE audit_jobs SET status = ?, lease = NULL, finished_at = ?, result = ?, error = NULL"
+            " WHERE job_id = ? AND lease = ?",
+            (COMPLETED, time.time(), json.dumps(result), job_id, lease)
+        )
+        self._purge_finished()
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, lease: str, error: str) -> bool:
+        '''Queues the job again if it has attempts left, otherwise marks it FAILED.'''
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts FROM audit_jobs WHERE job_id = ? AND lease = ?", (job_id, lease)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            if row["attempts"] < self.max_attempts:
+                conn.execute(
+                    "UPDATE audit_jobs SET status = ?, lease = NULL, error = ? WHERE job_id = ?", (QUEUED, error, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE audit_jobs SET status = ?, lease = NULL, finished_at = ?, error = ? WHERE job_id = ?",
+                    (FAILED, time.time(), error, job_id)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM audit_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["job_id"],
+            "video_id": row["video_id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "submitted_at": row["submitted_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+    def depth(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM audit_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+    def _purge_finished(self):
+        self._connect().execute(
+            "DELETE FROM audit_jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (COMPLETED, FAILED, time.time() - self.result_ttl)
+        )
+
+
+# ---------- Redis ----------
+# Jobs are JSON strings at <prefix>job:<id>; results at <prefix>result:<id>;
+# <prefix>pending is a list (LPUSH new, RPOP oldest) and <prefix>inflight a
+# sorted set of lease deadlines. Every state change is one Lua script, so it
+# is atomic across API and worker processes.
+
+_ENQUEUE = """
+local depth = redis.call('LLEN', KEYS[1])
+if depth >= tonumber(ARGV[3]) then return -depth - 1 end
+redis.call('SET', ARGV[4] .. 'job:' .. ARGV[1], ARGV[2])
+redis.call('DEL', ARGV[4] .. 'result:' .. ARGV[1])
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return depth + 1
+"""
+
+_RESERVE = """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, id in ipairs(expired) do
+  redis.call('ZREM', KEYS[2], id)
+  local raw = redis.call('GET', ARGV[4] .. 'job:' .. id)
+  if raw then
+    local job = cjson.decode(raw)
+    job.lease = false
+    if job.attempts >= tonumber(ARGV[5]) then
+      job.status = 'FAILED'
+      job.finished_at = now
+      job.error = 'Worker lost after ' .. job.attempts .. ' attempts'
+      redis.call('SET', ARGV[4] .. 'job:' .. id, cjson.encode(job), 'EX', ARGV[6])
+    else
+      job.status = 'QUEUED'
+      redis.call('SET', ARGV[4] .. 'job:' .. id, cjson.encode(job))
+      redis.call('RPUSH', KEYS[1], id)
+    end
+  end
+end
+local id = redis.call('RPOP', KEYS[1])
+if not id then return false end
+local raw = redis.call('GET', ARGV[4] .. 'job:' .. id)
+if not raw then return false end
+local job = cjson.decode(raw)
+job.status = 'RUNNING'
+job.attempts = job.attempts + 1
+job.lease = ARGV[3]
+job.started_at = now
+redis.call('SET', ARGV[4] .. 'job:' .. id, cjson.encode(job))
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+return cjson.encode(job)
+"""
+
+_HEARTBEAT = """
+local raw = redis.call('GET', ARGV[4] .. 'job:' .. ARGV[1])
+if not raw then return 0 end
+local job = cjson.decode(raw)
+if job.lease ~= ARGV[2] then return 0 end
+redis.call('ZADD', KEYS[1], 'XX', tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+_FINISH = """
+local raw = redis.call('GET', ARGV[6] .. 'job:' .. ARGV[1])
+if not raw then return 0 end
+local job = cjson.decode(raw)
+if job.lease ~= ARGV[2] then return 0 end
+redis.call('ZREM', KEYS[2], ARGV[1])
+job.lease = false
+job.error = ARGV[4]
+if ARGV[3] == 'QUEUED' and job.attempts < tonumber(ARGV[7]) then
+  job.status = 'QUEUED'
+  redis.call('SET', ARGV[6] .. 'job:' .. ARGV[1], cjson.encode(job))
+  redis.call('RPUSH', KEYS[1], ARGV[1])
+  return 1
+end
+if ARGV[3] == 'QUEUED' then job.status = 'FAILED' else job.status = ARGV[3] end
+job.finished_at = tonumber(ARGV[5])
+redis.call('SET', ARGV[6] .. 'job:' .. ARGV[1], cjson.encode(job), 'EX', ARGV[8])
+return 1
+"""
+
+
+class RedisJobQueue:
+    '''Redis-backed queue for multi-host deployments (same semantics as SqliteJobQueue).'''
+
+    def __init__(self, url: str, max_depth: int, retry_after: int, visibility_timeout: int = 300,
+                 max_attempts: int = 3, result_ttl: int = 3600, prefix: str = "audit-queue:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_depth = max_depth
+        self.retry_after = retry_after
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self.prefix = prefix
+        self._pending = f"{prefix}pending"
+        self._inflight = f"{prefix}inflight"
+        self._enqueue = self.client.register_script(_ENQUEUE)
+        self._reserve = self.client.register_script(_RESERVE)
+        self._heartbeat = self.client.register_script(_HEARTBEAT)
+        self._finish = self.client.register_script(_FINISH)
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        job = {"job_id": job_id, "video_id": payload.get("video_id"), "payload": payload, "status": QUEUED,
+               "attempts": 0, "lease": False, "submitted_at": time.time(), "started_at": False,
+               "finished_at": False, "error": False}
+        depth = self._enqueue(keys=[self._pending], args=[job_id, json.dumps(job), self.max_depth, self.prefix])
+        if depth < 0:
+            raise QueueFullError(-depth - 1, self.retry_after)
+        return self.get(job_id)
+
+    def reserve(self) -> Optional[Dict[str, Any]]:
+        lease = uuid.uuid4().hex
+        raw = self._reserve(
+            keys=[self._pending, self._inflight],
+            args=[time.time(), self.visibility_timeout, lease, self.prefix, self.max_attempts, self.result_ttl]
+        )
+        if not raw:
+            return None
+        job = json.loads(raw)
+        return {"job_id": job["job_id"], "payload": job["payload"], "lease": lease, "attempts": job["attempts"]}
+
+    def heartbeat(self, job_id: str, lease: str) -> bool:
+        return bool(self._heartbeat(
+            keys=[self._inflight], args=[job_id, lease, time.time() + self.visibility_timeout, self.prefix]
+        ))
+
+    def complete(self, job_id: str, lease: str, result: Dict[str, Any]) -> bool:
+        # the result goes first, so a COMPLETED status is never seen without it
+        self.client.set(f"{self.prefix}result:{job_id}", json.dumps(result), ex=self.result_ttl)
+        return self._finish_job(job_id, lease, COMPLETED, "")
+
+    def fail(self, job_id: str, lease: str, error: str) -> bool:
+        return self._finish_job(job_id, lease, QUEUED, error)
+
+    def _finish_job(self, job_id, lease, status, error) -> bool:
+        return bool(self._finish(
+            keys=[self._pending, self._inflight],
+            args=[job_id, lease, status, error, time.time(), self.prefix, self.max_attempts, self.result_ttl]
+        ))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw, result = self.client.mget(f"{self.prefix}job:{job_id}", f"{self.prefix}result:{job_id}")
+        if raw is None:
+            return None
+        job = json.loads(raw)
+        return {
+            "job_id": job["job_id"],
+            "video_id": job["video_id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "submitted_at": job["submitted_at"],
+            # Lua cannot store nil in a table, so unset fields are false
+            "started_at": job["started_at"] or None,
+            "finished_at": job["finished_at"] or None,
+            "result": json.loads(result) if result and job["status"] == COMPLETED else None,
+            "error": job["error"] or None,
+        }
+
+    def depth(self) -> int:
+        return self.client.llen(self._pending)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    '''
+    Returns the shared SQLite/Redis queue for AUDIT_QUEUE_BACKEND, or None for
+    the in-process backend.
+    '''
+    global _job_queue
+    backend = os.getenv("AUDIT_QUEUE_BACKEND", "inprocess").lower()
+    if backend == "inprocess":
+        return None
+    with _job_queue_lock:
+        if _job_queue is None:
+            max_depth, retry_after = queue_limits()
+            if backend == "redis":
+                _job_queue = RedisJobQueue(
+                    os.getenv("REDIS_URL", "redis://localhost:6379/0"), max_depth, retry_after, **_settings()
+                )
+            elif backend == "sqlite":
+                _job_queue = SqliteJobQueue(
+                    os.getenv("AUDIT_QUEUE_PATH", "audit_queue.sqlite"), max_depth, retry_after, **_settings()
+                )
+            else:
+                raise ValueError(f"Unknown AUDIT_QUEUE_BACKEND : {backend}")
+            logger.info(f"Audit queue : {backend} (max depth {max_depth})")
+        return _job_queue
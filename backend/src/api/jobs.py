@@ -0,0 +1,124 @@
+'''
+In-process job tracking for audit requests.
+
+Graph invocations are blocking (download, upload, Video Indexer polling, LLM),
+so they run on a bounded thread pool instead of the event loop. The API only
+records the job and hands back its id; clients poll GET /audit/{job_id}.
+
+This is the in-process backend (AUDIT_QUEUE_BACKEND=inprocess). job_queue.py
+has the SQLite / Redis queues drained by separate worker processes.
+'''
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("audit-jobs")
+
+# job lifecycle states
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+
+
+class QueueFullError(Exception):
+    '''Raised on submit when AUDIT_QUEUE_MAX_DEPTH jobs are already waiting.'''
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"Audit queue is full ({depth} jobs waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+def queue_limits():
+    '''(max queued jobs, Retry-After seconds) shared by every queue backend.'''
+    return (
+        int(os.getenv("AUDIT_QUEUE_MAX_DEPTH", "1000")),
+        int(os.getenv("AUDIT_QUEUE_RETRY_AFTER_SECONDS", "30")),
+    )
+
+
+class AuditJobManager:
+    '''
+    Runs audit jobs on a bounded executor and keeps their status in memory.
+    Finished jobs are kept for `job_ttl_seconds` so clients can collect results.
+    '''
+
+    def __init__(self, max_workers: Optional[int] = None, job_ttl_seconds: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("AUDIT_MAX_WORKERS", "32"))
+        self.job_ttl_seconds = job_ttl_seconds or int(os.getenv("AUDIT_JOB_TTL_SECONDS", "3600"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="audit-job")
+        self.max_depth, self.retry_after = queue_limits()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: str, video_id: str, fn: Callable[[], Dict[str, Any]],
+               on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        '''
+        Registers the job and schedules `fn` on the executor.
+        `fn` returns the final graph state; `on_done` gets the finished job's snapshot.
+        '''
+        self._purge_expired()
+        job = {
+            "job_id": job_id,
+            "video_id": video_id,
+            "status": QUEUED,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            depth = sum(1 for j in self._jobs.values() if j["status"] == QUEUED)
+            if depth >= self.max_depth:
+                raise QueueFullError(depth, self.retry_after)
+            self._jobs[job_id] = job
+            snapshot = dict(job)
+        self._executor.submit(self._run, job_id, fn, on_done)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def depth(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j["status"] == QUEUED)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, fn: Callable[[], Dict[str, Any]], on_done=None):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            final_state = fn()
+            self._update(job_id, status=COMPLETED, result=final_state, finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Audit job {job_id} failed : {e}")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        if on_done:
+            try:
+                on_done(self.get(job_id))
+            except Exception as e:
+                logger.error(f"Completion callback for audit job {job_id} failed : {e}")
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.job_ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
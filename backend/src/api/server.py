@@ -1,19 +1,24 @@
+import os
+import json
 import uuid
+import asyncio
 import logging
+import time
 import threading
-import webbrowser
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-from backend.src.api.telemetry import setup_telemetry
+from backend.src.api.telemetry import setup_telemetry, histograms, counters
 setup_telemetry()
 
-from backend.src.graph.workflow import app as compliance_graph
+from backend.src.api.jobs import AuditJobManager, QueueFullError, QUEUED, RUNNING, COMPLETED, FAILED
+from backend.src.api.job_queue import get_job_queue
+from backend.src.services.clients import client_registry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("api-server")
@@ -24,13 +29,49 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# graph runs are blocking, so they go to a bounded thread pool,
+# or to separate worker processes when AUDIT_QUEUE_BACKEND is sqlite / redis
+job_manager = AuditJobManager()
+job_queue = get_job_queue()
+
+# LangGraph, LangChain, yt-dlp and the Azure SDKs are imported by the first audit
+# (or the warm-up below), so the API is ready to serve as soon as it starts
+_warm = threading.Event()
+
+
+def _graph():
+    from backend.src.graph.workflow import get_graph
+    return get_graph()
+
+
+def _warm_up():
+    started = time.perf_counter()
+    try:
+        _graph()
+        client_registry.get_chat_model()
+        client_registry.get_embeddings()
+        logger.info(f"Audit graph and clients warmed up in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        # the first audit builds whatever failed here
+        logger.warning(f"Warm-up failed : {e}")
+    _warm.set()
+
+
 @app.on_event("startup")
-async def open_browser():
-    def _open():
-        import time
-        time.sleep(1.5)  # Wait for server to fully start
-        webbrowser.open("http://127.0.0.1:8000/docs")
-    threading.Thread(target=_open, daemon=True).start()
+async def start_background_tasks():
+    # with the worker tier the graph runs elsewhere; only resumes need it here
+    if job_queue is None and os.getenv("AUDIT_WARMUP", "true").lower() == "true":
+        threading.Thread(target=_warm_up, name="audit-warmup", daemon=True).start()
+    if os.getenv("OPEN_BROWSER_ON_STARTUP", "false").lower() == "true":
+        def _open():
+            import webbrowser
+            time.sleep(1.5)  # Wait for server to fully start
+            webbrowser.open("http://127.0.0.1:8000/docs")
+        threading.Thread(target=_open, daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_job_manager():
+    job_manager.shutdown()
 
 @app.get("/", include_in_schema=False)
 def root():
@@ -46,6 +87,8 @@ class ComplianceIssue(BaseModel):
     category: str
     severity: str
     description: str
+    # where in the video ("1:05" or a segment range like "0:00-1:00"), when the audit can tell
+    timestamp: Optional[str] = None
 
 
 class AuditResponse(BaseModel):
@@ -56,42 +99,301 @@ class AuditResponse(BaseModel):
     compliance_results: List[ComplianceIssue]
 
 
-@app.post("/audit", response_model=AuditResponse)
-async def audit_video(request: AuditRequest):
-    session_id = str(uuid.uuid4())
-    video_id_short = f"vid_{session_id[:8]}"
+class AuditJobAccepted(BaseModel):
+    job_id: str
+    session_id: str
+    video_id: str
+    status: str
 
-    logger.info(f"Received Audit Request: {request.video_url} (Session: {session_id})")
 
-    initial_inputs = {
-        "video_url": request.video_url,
-        "video_id": video_id_short,
+class AuditJobStatus(BaseModel):
+    job_id: str
+    video_id: str
+    status: str  # QUEUED | RUNNING | COMPLETED | FAILED
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[AuditResponse] = None
+    error: Optional[str] = None
+
+
+def _run_graph(session_id: str, initial_inputs):
+    from backend.src.graph.checkpoint import session_config
+    return _graph().invoke(initial_inputs, session_config(session_id))
+
+
+def _initial_inputs(video_url: str, video_id: str):
+    return {
+        "video_url": video_url,
+        "video_id": video_id,
         "compliance_results": [],
         "errors": []
     }
 
+
+async def _submit(session_id: str, video_id: str, payload, fn, on_done=None):
+    '''
+    Hands the audit to the worker queue when one is configured, else to the
+    in-process job manager. A full queue is refused with 429 and Retry-After.
+    '''
     try:
-        final_state = compliance_graph.invoke(initial_inputs)
+        if job_queue is not None:
+            # SQLite / Redis I/O : off the event loop, so open SSE streams keep flowing
+            return await asyncio.to_thread(
+                job_queue.enqueue, session_id, {"session_id": session_id, "video_id": video_id, **payload}
+            )
+        return job_manager.submit(job_id=session_id, video_id=video_id, fn=fn, on_done=on_done)
+    except QueueFullError as e:
+        logger.warning(f"Rejected audit {session_id} : {e}")
+        counters.inc("audit_jobs_rejected_total", reason="queue_full")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _get_job(job_id: str):
+    return job_queue.get(job_id) if job_queue is not None else job_manager.get(job_id)
+
+
+@app.post("/audit", response_model=AuditJobAccepted, status_code=202)
+async def audit_video(request: AuditRequest):
+    session_id = str(uuid.uuid4())
+    video_id_short = f"vid_{session_id[:8]}"
+
+    logger.info(f"Received Audit Request: {request.video_url} (Session: {session_id})")
+
+    initial_inputs = _initial_inputs(request.video_url, video_id_short)
+
+    job = await _submit(
+        session_id,
+        video_id_short,
+        {"video_url": request.video_url},
+        fn=lambda: _run_graph(session_id, initial_inputs)
+    )
+
+    return AuditJobAccepted(
+        job_id=session_id,
+        session_id=session_id,
+        video_id=video_id_short,
+        status=job["status"]
+    )
+
+
+# seconds between SSE comment lines while nothing else is sent (keeps proxies from closing the connection)
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
 
-        return AuditResponse(
-            session_id=session_id,
-            video_id=final_state.get("video_id"),
+# how often a queued job's state is polled for /audit/stream when workers run the graph
+JOB_POLL_SECONDS = float(os.getenv("AUDIT_STREAM_POLL_SECONDS", "1"))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_graph(session_id: str, initial_inputs, publish: Callable[[Any], None]):
+    '''
+    Runs the graph in stream mode, forwarding node updates and custom progress
+    events to `publish`; returns the final state like invoke() would.
+    '''
+    from backend.src.graph.checkpoint import session_config
+
+    final_state = {}
+    for mode, payload in _graph().stream(initial_inputs, session_config(session_id),
+                                         stream_mode=["updates", "custom", "values"]):
+        if mode == "values":
+            final_state = payload
+        else:
+            publish((mode, payload))
+    return final_state
+
+
+def _event_publisher(events: asyncio.Queue) -> Callable[[Any], None]:
+    '''Thread-safe put into an asyncio queue : the graph runs in a worker thread, the SSE response on the loop.'''
+    loop = asyncio.get_running_loop()
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, item)
+        except RuntimeError:
+            pass  # the event loop is gone (server shutdown) : nobody is listening any more
+    return publish
+
+
+@app.post("/audit/stream")
+async def audit_video_stream(request: AuditRequest):
+    '''
+    Runs an audit and streams its progress as server-sent events :
+    accepted, progress (download / upload / indexing / retrieval / cache),
+    node (a graph node finished), violation (one per finding), then
+    complete or error carrying the same payload as GET /audit/{job_id}.
+    The job keeps running if the client disconnects.
+    With an external worker queue only status events (job state changes)
+    are sent between accepted and complete / error.
+    '''
+    session_id = str(uuid.uuid4())
+    video_id_short = f"vid_{session_id[:8]}"
+    logger.info(f"Received Streaming Audit Request: {request.video_url} (Session: {session_id})")
+
+    # an asyncio queue : a client waiting for events holds no executor thread
+    events: asyncio.Queue = asyncio.Queue()
+    publish = _event_publisher(events)
+    initial_inputs = _initial_inputs(request.video_url, video_id_short)
+    job = await _submit(
+        session_id,
+        video_id_short,
+        {"video_url": request.video_url},
+        fn=lambda: _stream_graph(session_id, initial_inputs, publish),
+        on_done=lambda finished: publish(("done", finished))  # also on failure
+    )
+
+    async def _events():
+        yield _sse("accepted", {"job_id": session_id, "video_id": video_id_short, "status": job["status"]})
+        if job_queue is not None:
+            async for line in _queued_job_events(session_id, job["status"]):
+                yield line
+            return
+        while True:
+            try:
+                item = await asyncio.wait_for(events.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            mode, payload = item
+            if mode == "done":
+                status = _job_status(session_id, payload)
+                yield _sse("complete" if status.status == "COMPLETED" else "error", status.model_dump())
+                break
+            if mode == "custom":
+                yield _sse("progress", payload)
+                continue
+            for node, update in payload.items():
+                update = update if isinstance(update, dict) else {}
+                yield _sse("node", {"node": node, "keys": sorted(update)})
+                for issue in update.get("compliance_results", []):
+                    yield _sse("violation", {"node": node, **issue})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _queued_job_events(job_id: str, status: str):
+    # the graph runs on a worker, so all the API can see is the job's state
+    waited = 0.0
+    while True:
+        await asyncio.sleep(JOB_POLL_SECONDS)
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            yield _sse("error", {"job_id": job_id, "error": "Job expired"})
+            return
+        if job["status"] in (COMPLETED, FAILED):
+            yield _sse("complete" if job["status"] == COMPLETED else "error", _job_status(job_id, job).model_dump())
+            return
+        if job["status"] != status:
+            status = job["status"]
+            waited = 0.0
+            yield _sse("status", {"job_id": job_id, "status": status, "attempts": job["attempts"]})
+        else:
+            waited += JOB_POLL_SECONDS
+            if waited >= SSE_KEEPALIVE_SECONDS:
+                waited = 0.0
+                yield ": keepalive\n\n"
+
+
+@app.get("/audit/stream")
+async def audit_video_stream_get(video_url: str):
+    # same stream for EventSource clients, which can only issue GET requests
+    return await audit_video_stream(AuditRequest(video_url=video_url))
+
+
+@app.post("/audit/{session_id}/resume", response_model=AuditJobAccepted, status_code=202)
+async def resume_audit_session(session_id: str):
+    '''
+    Resumes a checkpointed session from its last good node (needs AUDIT_CHECKPOINT_URL).
+    The resumed run is tracked as job `session_id`.
+    '''
+    from backend.src.graph.checkpoint import session_config, resume_audit
+
+    compliance_graph = await asyncio.to_thread(_graph)
+    if compliance_graph.checkpointer is None:
+        raise HTTPException(status_code=409, detail="Checkpointing is disabled (set AUDIT_CHECKPOINT_URL)")
+    job = await asyncio.to_thread(_get_job, session_id)
+    if job and job["status"] in (QUEUED, RUNNING):
+        raise HTTPException(status_code=409, detail=f"Session {session_id} is still {job['status']}")
+    snapshot = await asyncio.to_thread(compliance_graph.get_state, session_config(session_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"No checkpoints for session {session_id}")
+
+    video_id = snapshot.values.get("video_id", "")
+    logger.info(f"Resuming Audit Session: {session_id}")
+    job = await _submit(
+        session_id,
+        video_id,
+        {"video_url": snapshot.values.get("video_url", ""), "resume": True},
+        fn=lambda: resume_audit(compliance_graph, session_id)
+    )
+    return AuditJobAccepted(job_id=session_id, session_id=session_id, video_id=video_id, status=job["status"])
+
+
+@app.get("/audit/{job_id}", response_model=AuditJobStatus)
+async def get_audit_job(job_id: str):
+    job = await asyncio.to_thread(_get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Audit job {job_id} not found")
+    return _job_status(job_id, job)
+
+
+def _job_status(job_id: str, job) -> AuditJobStatus:
+    result = None
+    final_state = job["result"]
+    if final_state is not None:
+        result = AuditResponse(
+            session_id=job_id,
+            video_id=final_state.get("video_id", job["video_id"]),
             status=final_state.get("final_status", "UNKNOWN"),
             final_report=final_state.get("final_report", "No report generated."),
             compliance_results=final_state.get("compliance_results", [])
         )
 
-    except Exception as e:
-        logger.error(f"Audit Failed: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Workflow Execution Failed: {str(e)}"
-        )
+    return AuditJobStatus(
+        job_id=job_id,
+        video_id=job["video_id"],
+        status=job["status"],
+        submitted_at=job["submitted_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        result=result,
+        error=job["error"]
+    )
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "service": "Brand Guardian AI"}
+    # ready as soon as the app starts; `warm` turns true once the graph and clients are built
+    return {"status": "healthy", "service": "Brand Guardian AI", "warm": _warm.is_set()}
+
+
+@app.get("/health/queue")
+def queue_stats():
+    # waiting jobs vs the admission limit (scale workers on this)
+    source = job_queue if job_queue is not None else job_manager
+    return {
+        "backend": os.getenv("AUDIT_QUEUE_BACKEND", "inprocess").lower(),
+        "depth": source.depth(),
+        "max_depth": source.max_depth,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # per-node and per-dependency latency histograms and counters (Prometheus text format)
+    return histograms.render() + counters.render()
+
+
+@app.get("/health/clients")
+def client_stats():
+    # how often shared Azure clients were built vs reused
+    return client_registry.stats()
 
     
 '''
@@ -1,7 +1,14 @@
 import os           # Access environment variables (like API keys)
+import time         # Measures step latency
 import logging      # Python's built-in logging system
-from azure.monitor.opentelemetry import configure_azure_monitor  
-# ↑ Azure's OpenTelemetry integration - tracks app performance, errors, requests
+import threading    # Guards the in-process histograms
+import functools    # Keeps wrapped node names intact
+from bisect import bisect_left
+from contextlib import contextmanager
+from opentelemetry import trace, metrics
+# ↑ vendor-neutral API: spans/histograms go to whichever provider is configured (Azure or local)
+# Azure Monitor (azure.monitor.opentelemetry) and LangGraph's stream writer are imported
+# where they are used : both are slow to import and not needed to start serving
 
 # ========== CREATE A DEDICATED LOGGER ==========
 # Creates a named logger specifically for telemetry-related messages
@@ -29,17 +36,23 @@ def setup_telemetry():
     # Reads the Azure Monitor connection string from environment variables
     # Example: "InstrumentationKey=abc123;IngestionEndpoint=https://..."
     # This is like a "phone number" to send telemetry data to your Azure workspace
-    connection_string = os.getenv("APPLICATION_INSIGHTS_CONNECTION_STRING")
+    connection_string = (
+        os.getenv("APPLICATION_INSIGHTS_CONNECTION_STRING")
+        or os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+    )
     
     # ========== STEP 2: CHECK IF CONFIGURED ==========
     if not connection_string:
-        # If the environment variable is missing/empty, telemetry won't work
-        # 
-        logger.warning("No Instrumentation Key found. Telemetry is DISABLED.")
+        # No Azure workspace : keep spans locally instead (file or console)
+        logger.warning("No Instrumentation Key found. Azure Monitor is DISABLED.")
+        setup_local_telemetry()
         return  # Exit function early - don't try to configure Azure Monitor
 
     # ========== STEP 3: CONFIGURE AZURE MONITOR ==========
     try:
+        # Azure's OpenTelemetry integration - tracks app performance, errors, requests
+        from azure.monitor.opentelemetry import configure_azure_monitor
+
         # configure_azure_monitor() does the heavy lifting:
         # 1. Registers automatic instrumentation for:
         #    - HTTP requests (FastAPI endpoints)
@@ -58,4 +71,201 @@ def setup_telemetry():
         # If configuration fails (bad connection string, network issue, etc.)
         # 
         logger.error(f"Failed to initialize Azure Monitor: {e}")
-        # Note: Function doesn't raise the error - telemetry failure shouldn't crash the app
\ No newline at end of file
+        # Note: Function doesn't raise the error - telemetry failure shouldn't crash the app
+
+
+_local_telemetry_configured = False
+
+
+def setup_local_telemetry():
+    """
+    Local span exporter for when Azure Monitor isn't configured.
+    TELEMETRY_LOCAL_EXPORTER = file (default) | console | none
+    TELEMETRY_EXPORT_FILE    = JSON-lines span file (default: telemetry_spans.jsonl)
+    Latency histograms are always kept in-process and served at /metrics.
+    """
+    global _local_telemetry_configured
+    exporter_kind = os.getenv("TELEMETRY_LOCAL_EXPORTER", "file").lower()
+    if _local_telemetry_configured or exporter_kind == "none":
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if exporter_kind == "console":
+        exporter = ConsoleSpanExporter()
+        target = "console"
+    else:
+        target = os.getenv("TELEMETRY_EXPORT_FILE", "telemetry_spans.jsonl")
+        exporter = ConsoleSpanExporter(
+            out=open(target, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "brand-guardian"}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _local_telemetry_configured = True
+    logger.info(f"Local span exporter enabled ({target})")
+
+
+# ========== PER-STEP INSTRUMENTATION ==========
+# Upper bounds (seconds) of the latency buckets : from cache hits up to long Video Indexer runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class LatencyHistograms:
+    """
+    Minimal in-process histograms rendered in Prometheus text format.
+    Kept independent of the OpenTelemetry SDK so /metrics works without any exporter.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series = {}  # (metric, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, metric, seconds, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+        seen = set()
+        for (metric, labels), series in items:
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            base = ",".join(f'{k}="{v}"' for k, v in labels)
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], series[:-2]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{base + "," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{metric}_count{{{base}}} {series[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricCounters:
+    """
+    Monotonic counters (cache hits/misses and the like) in Prometheus text format,
+    rendered next to the latency histograms at /metrics.
+    """
+
+    def __init__(self):
+        self._series = {}  # (metric, labels) -> value
+        self._lock = threading.Lock()
+
+    def inc(self, metric, value=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+        _otel_counter(metric).add(value, labels)
+
+    def value(self, metric, **labels):
+        with self._lock:
+            return self._series.get((metric, tuple(sorted(labels.items()))), 0)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+        seen = set()
+        for (metric, labels), value in items:
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            base = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{base}}} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+histograms = LatencyHistograms()
+counters = MetricCounters()
+_tracer = trace.get_tracer("brand-guardian")
+_meter = metrics.get_meter("brand-guardian")
+_otel_counters = {}
+
+
+def _otel_counter(metric):
+    # one OpenTelemetry counter instrument per metric name, created on first use
+    counter = _otel_counters.get(metric)
+    if counter is None:
+        counter = _otel_counters.setdefault(metric, _meter.create_counter(metric))
+    return counter
+
+_otel_step_histogram = _meter.create_histogram(
+    "audit_step_duration", unit="s", description="Latency of graph nodes and external dependency calls"
+)
+
+
+@contextmanager
+def trace_step(name, kind="step", **attributes):
+    """
+    Span + latency histogram around one unit of work.
+    `kind` is "node" for graph nodes or "step" for external calls
+    (download, upload, poll, embedding, search, llm). Yields the span so callers
+    can attach counts discovered along the way, e.g. span.set_attribute("bytes", n).
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    with _tracer.start_as_current_span(f"{kind}:{name}") as span:
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+        try:
+            yield span
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            span.set_attribute("duration_seconds", elapsed)
+            histograms.observe(f"audit_{kind}_duration_seconds", elapsed, **{kind: name, "outcome": outcome})
+            _otel_step_histogram.record(elapsed, {"kind": kind, "name": name, "outcome": outcome})
+
+
+def traced_node(name):
+    """Decorator recording a span and latency histogram for a LangGraph node."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            with trace_step(name, kind="node") as span:
+                result = fn(state, *args, **kwargs)
+                if isinstance(result, dict) and result.get("errors"):
+                    span.set_attribute("errors", len(result["errors"]))
+                return result
+        return wrapper
+    return decorator
+
+
+def traced_embedding(embed_query):
+    """Wraps an embed_query function so every query embedding gets its own span."""
+    @functools.wraps(embed_query)
+    def wrapper(text):
+        with trace_step("embedding", chars=len(text)):
+            return embed_query(text)
+    return wrapper
+
+
+def emit_event(event, **data):
+    """
+    Sends a progress event ({"event": ..., **data}) to clients streaming the
+    current graph run (stream_mode "custom", served by /audit/stream).
+    A no-op outside a graph run, e.g. in worker threads or scripts.
+    """
+    # custom stream channel of the running graph, used for client-facing progress events
+    from langgraph.config import get_stream_writer
+
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, **data})
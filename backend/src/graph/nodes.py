@@ -2,24 +2,71 @@ import json
 import os
 import logging
 import re
+import shutil
+import hashlib
+import tempfile
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
 from typing import List, Any, Dict
 
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_community.vectorstores import AzureSearch
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
 
 # import state schema
 from backend.src.graph.state import VideoAuditState, ComplianceResult
 # import service
 from backend.src.services.video_indexer import VideoIndexerService
+from backend.src.services.clients import client_registry
+from backend.src.api.telemetry import trace_step, traced_node, emit_event
+from backend.src.services.retrievers import get_rules_retriever
+from backend.src.services.index_manifest import rules_index_version
+from backend.src.services.audit_cache import get_audit_cache, canonical_video_key, file_content_key
+from backend.src.services.prescreen import get_prescreen_engine
+from backend.src.services.llm_cache import get_llm_cache
+from backend.src.services.ingestion import get_ingestion_profile, transcode_for_upload
+from backend.src.services.prompt_builder import build_audit_prompt
+from backend.src.services.rate_limiter import call_with_retries, get_rate_limiter, OPENAI_CHAT, SEARCH
 
 # configure the logger
 logger = logging.getLogger("yt-ad-logging")
 logging.basicConfig(level=logging.INFO)
 
+def _verdict_version():
+    '''
+    Version a cached verdict is valid for : the rules index version, plus the
+    pre-screen rules version when the pre-screen is on.
+    '''
+    rules_version = rules_index_version()
+    engine = get_prescreen_engine() if _prescreen_policy() != "off" else None
+    if rules_version and engine:
+        return f"{rules_version}+{engine.version}"
+    return rules_version
+
+
+def _prescreen_policy() -> str:
+    return os.getenv("PRESCREEN_POLICY", "annotate").lower()
+
+
+def _from_cache(audit_cache, cached: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    '''
+    State update for an index-cache hit. If a verdict for this video under the
+    current rules index is cached too, it is included and the graph skips the auditors.
+    '''
+    result = {**cached["extracted"], "azure_video_id": cached["azure_video_id"], "cache_key": cache_key}
+    emit_event("cache", hit="index", cache_key=cache_key)
+    rules_version = _verdict_version()
+    cached_audit = audit_cache.get_audit(cache_key, rules_version)
+    if cached_audit:
+        logger.info(f"Audit cache hit for {cache_key} (rules {rules_version})")
+        emit_event("cache", hit="audit", cache_key=cache_key)
+        result.update({**cached_audit, "audit_cached": True})
+    return result
+
+
 # Node 1 : Indexer
 # function responsible for converting video to text
+@traced_node("indexer")
 def index_video_node(state:VideoAuditState) -> Dict[str, Any]:
     '''
     Downloads the youtube video from the url
@@ -31,29 +78,92 @@ def index_video_node(state:VideoAuditState) -> Dict[str, Any]:
 
     logger.info(f"-----[Node:Indexer] Processing : {video_url}")
 
-    local_filename = "temp_audit_video.mp4"
+    # spool : download to a per-session temp file, then upload it
+    # stream : pipe yt-dlp output straight into the upload body (falls back to spool on failure)
+    # url : resolve the direct media URL without downloading and let Video Indexer fetch it
+    #       (falls back to spool when resolving, submitting or indexing fails)
+    ingestion_mode = os.getenv("VIDEO_INGESTION_MODE", "spool").lower()
+    spool_dir = None
 
     try:
+        # which format to download and whether to re-encode it before upload (INGESTION_PROFILE)
+        profile = get_ingestion_profile()
+        if ingestion_mode in ("stream", "url") and profile["transcode"]:
+            logger.info(f"Ingestion profile '{profile['name']}' transcodes locally; using spool mode")
+            ingestion_mode = "spool"
         vi_service = VideoIndexerService()
-        # download : yt-dlp
-        if "youtube.com" in video_url or "youtu.be" in video_url:
-            local_path = vi_service.download_youtube_video(video_url, output_path=local_filename)
-        else:
+        audit_cache = get_audit_cache()
+        # cache lookup by canonical youtube id : skips download, upload and indexing
+        cache_key = canonical_video_key(video_url)
+        cached = audit_cache.get_index(cache_key) if audit_cache else None
+        if cached:
+            logger.info(f"Cache hit for {cache_key}. Azure ID : {cached['azure_video_id']}")
+            return _from_cache(audit_cache, cached, cache_key)
+
+        if not ("youtube.com" in video_url or "youtu.be" in video_url):
             raise Exception("Please provide a valid Youtube URL for this test.")
-        
-        # upload
-        azure_video_id = vi_service.upload_video(local_path, video_name= video_id_input)
+
+        azure_video_id = None
+        content_key = None
+        raw_insights = None
+        if ingestion_mode == "url":
+            try:
+                media_url = vi_service.resolve_media_url(video_url, format_selector=profile["format"])
+                azure_video_id = vi_service.upload_video_by_url(media_url, video_name= video_id_input)
+                # a URL Video Indexer cannot fetch (e.g. signed for another IP) only surfaces as a failed index
+                raw_insights = vi_service.wait_for_processing(azure_video_id)
+            except Exception as e:
+                logger.warning(f"URL ingestion failed, falling back to spool : {e}")
+                azure_video_id = None
+
+        if ingestion_mode == "stream":
+            try:
+                digest = hashlib.sha256()
+                # closed on the way out, so a failed upload stops yt-dlp before the spool fallback downloads again
+                with contextlib.closing(
+                    vi_service.stream_youtube_video(video_url, format_selector=profile["format"])
+                ) as source:
+                    azure_video_id = vi_service.upload_video_stream(
+                        _hash_chunks(source, digest), video_name= video_id_input
+                    )
+                content_key = f"sha256:{digest.hexdigest()}"
+            except Exception as e:
+                logger.warning(f"Streaming ingestion failed, falling back to spool : {e}")
+
+        if azure_video_id is None:
+            # download : yt-dlp into a temp dir owned by this session
+            spool_dir = tempfile.mkdtemp(prefix=f"audit_{video_id_input}_", dir=os.getenv("VIDEO_SPOOL_DIR"))
+            local_path = vi_service.download_youtube_video(
+                video_url, output_path=os.path.join(spool_dir, "video.mp4"), format_selector=profile["format"]
+            )
+
+            # second chance : same bytes submitted under a different url
+            content_key = file_content_key(local_path) if audit_cache else None
+            cached = audit_cache.get_index(content_key) if audit_cache else None
+            if cached:
+                logger.info(f"Cache hit for {content_key}. Azure ID : {cached['azure_video_id']}")
+                audit_cache.set_index(cache_key, cached["azure_video_id"], cached["extracted"])
+                return _from_cache(audit_cache, cached, cache_key or content_key)
+
+            # optional local re-encode (bytes saved are logged), then upload
+            upload_path = transcode_for_upload(local_path, profile)
+            azure_video_id = vi_service.upload_video(upload_path, video_name= video_id_input)
+
+            # cleanup now rather than holding the file for the whole polling loop
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            spool_dir = None
         logger.info(f"Upload Success. Azure ID : {azure_video_id}")
 
-        # cleanup
-        if os.path.exists(local_path):
-            os.remove(local_path)
         # wait (Pause the code and keep asking azure are you DONE every 30 seconds)
-        raw_insights = vi_service.wait_for_processing(azure_video_id)
+        if raw_insights is None:
+            raw_insights = vi_service.wait_for_processing(azure_video_id)
         #extract
         clean_data = vi_service.extract_data(raw_insights)
+        if audit_cache:
+            audit_cache.set_index(cache_key, azure_video_id, clean_data)
+            audit_cache.set_index(content_key, azure_video_id, clean_data)
         logger.info("--------[Node:Indexer] Extraction Completed---------")
-        return clean_data
+        return {**clean_data, "azure_video_id": azure_video_id, "cache_key": cache_key or content_key}
     
     except Exception as e:
         logger.error(f"Video Indexer Failed : {e}")
@@ -63,8 +173,61 @@ def index_video_node(state:VideoAuditState) -> Dict[str, Any]:
             "transcript" : "",
             "ocr_text" : []
         }
+    finally:
+        # runs even when a step fails
+        if spool_dir:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
 
+def _hash_chunks(chunks, digest):
+    # passes chunks through while hashing them for the content-addressed cache
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
 
+
+# Node 2 : Pre-screen
+# deterministic keyword/regex rules over the extracted text, before any LLM call
+@traced_node("prescreen")
+def prescreen_node(state:VideoAuditState) -> Dict[str, Any]:
+    '''
+    Runs the compiled pre-screen rules. PRESCREEN_POLICY decides what happens next :
+    off           : the node does nothing
+    annotate      : clear findings are added, the LLM always runs (default)
+    short_circuit : clear findings FAIL the audit without calling the LLM
+    escalate      : as short_circuit, and an ad with no findings at all PASSes
+                    without the LLM; only borderline matches reach it
+    '''
+    policy = _prescreen_policy()
+    engine = get_prescreen_engine() if policy != "off" else None
+    if engine is None or not state.get("transcript"):
+        return {}
+
+    findings, borderline = engine.scan(state)
+    logger.info(f"-----[Node: Pre-screen] {len(findings)} clear, {len(borderline)} borderline (rules {engine.version})-----")
+    update = {"compliance_results" : findings, "prescreen_flags" : borderline}
+
+    decided = None
+    if findings and policy in ("short_circuit", "escalate"):
+        decided = "FAIL"
+    elif not findings and not borderline and policy == "escalate":
+        decided = "PASS"
+    if decided:
+        audit = {
+            "final_status" : decided,
+            "final_report" : (
+                f"Decided by pre-screen rules {engine.version} without LLM review : "
+                + ("; ".join(f["description"] for f in findings) if findings else "no rule matched.")
+            )
+        }
+        audit_cache = get_audit_cache()
+        if audit_cache:
+            audit_cache.set_audit(state.get("cache_key"), _verdict_version(), {**audit, "compliance_results" : findings})
+        update.update({**audit, "prescreen_decided" : True})
+    return update
+
+
+@traced_node("auditor")
 def audit_content_node(state:VideoAuditState) -> Dict[str, Any]:
     '''
     Performs Retrieval Augmented Generation to audit the content - youtube video 
@@ -78,85 +241,329 @@ def audit_content_node(state:VideoAuditState) -> Dict[str, Any]:
             "final_report" : "Audit skipped because video processing failed (No transcript)."
         }
 
-    # initialize clients
+    audit_cache = get_audit_cache()
+    cache_key = state.get("cache_key")
+    rules_version = _verdict_version()
+
+    # shared clients
     # For LLM and Embeddings, the API key is automatically picked up from the environment variable AZURE_OPENAI_API_KEY behind the scenes — LangChain reads it automatically without you passing it explicitly.
     # For Vector Store (AzureSearch), the key is passed explicitly as azure_search_key because it's a different service (Azure AI Search) with a different API key than OpenAI. LangChain doesn't auto-read it, so you must pass it manually.
-    llm = AzureChatOpenAI(
-        azure_deployment = os.getenv("AZURE_OPENAI_CHAT_MODEL"),
-        openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION"),
-        temperature = 0.0
-    )
+    # The registry builds each client once per process and reuses it across audits.
+    llm = client_registry.get_chat_model(temperature = 0.0)
+    # rules retriever : Azure AI Search or the local in-process index (RULES_RETRIEVER)
+    vector_store = get_rules_retriever()
 
-    embeddings = AzureOpenAIEmbeddings(
-        azure_deployment = os.getenv("AZURE_OPENAI_EMBEDDING_MODEL"),
-        openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
-    )
+    # single : one prompt for the whole video
+    # segmented : one prompt per time window, run concurrently, merged afterwards
+    audit_mode = os.getenv("AUDIT_MODE", "single").lower()
+    try:
+        if audit_mode == "segmented" and state.get("transcript_segments"):
+            audit, errors = _segmented_audit(state, llm, vector_store)
+        else:
+            audit_data = _llm_audit(
+                llm, vector_store, transcript, state.get("ocr_text"), state.get('video_metadata',{}),
+                flags=state.get("prescreen_flags")
+            )
+            audit = {
+                "compliance_results" : audit_data.get("compliance_results",[]),
+                "final_status" : audit_data.get("status", "FAIL"),
+                "final_report" : audit_data.get("final_report", "No report generated")
+            }
+            errors = []
+        # clear pre-screen findings are already in state and count towards the verdict
+        prescreened = state.get("compliance_results", [])
+        if prescreened:
+            audit["final_status"] = "FAIL"
+        if audit_cache and not errors:
+            audit_cache.set_audit(
+                cache_key, rules_version, {**audit, "compliance_results" : prescreened + audit["compliance_results"]}
+            )
+        if errors:
+            audit["errors"] = errors
+        return audit
+    except Exception as e:
+        logger.error(f"System Error in Auditor Node : {str(e)}")
+        return{
+            "errors" : [str(e)],
+            "final_status" : "FAIL"
+        }
 
-    vector_store = AzureSearch(
-        azure_search_endpoint = os.getenv("AZURE_AI_SEARCH_ENDPOINT"),
-        azure_search_key = os.getenv("AZURE_AI_SEARCH_API_KEY"),
-        index_name = os.getenv("AZURE_AI_SEARCH_INDEX_NAME"),
-        embedding_function = embeddings.embed_query
-    )
 
+def _llm_audit(llm, vector_store, transcript=None, ocr_text=None, video_metadata=None,
+               segment_label=None, focus=None, retrieval_query=None, flags=None) -> Dict[str, Any]:
+    '''
+    One retrieval + LLM call over the given transcript, OCR and/or metadata.
+    Sections passed as None are left out of the prompt; `focus` narrows the
+    instruction for the specialised fan-out auditors; `flags` are borderline
+    pre-screen findings for the LLM to confirm or dismiss.
+    Returns the parsed JSON verdict.
+    '''
     # RAG Retrieval
-    ocr_text = state.get("ocr_text")
-    video_context = f"{transcript} {''.join(ocr_text)}"
-    docs = vector_store.similarity_search(video_context, k=3)
+    video_context = retrieval_query or f"{transcript or ''} {' '.join(ocr_text or [])}"
+    with trace_step("search", k=3, query_chars=len(video_context)):
+        docs = call_with_retries(SEARCH, lambda: vector_store.similarity_search(video_context, k=3))
     retrieved_rules = "\n\n".join(doc.page_content for doc in docs)
+    emit_event("retrieval", rules=len(docs), focus=focus, segment=segment_label,
+               sources=sorted({str(doc.metadata.get("source")) for doc in docs}))
+
+    # prompt held under the deployment's token budget (trims OCR, then low-ranked rules, then transcript)
+    system_prompt, user_message, tokens = build_audit_prompt(
+        [doc.page_content for doc in docs], transcript=transcript, ocr_text=ocr_text,
+        video_metadata=video_metadata, segment_label=segment_label, focus=focus, flags=flags,
+        model=llm.deployment_name
+    )
+    logger.info(
+        f"Prompt tokens : {tokens['total']}/{tokens['budget']} (rules {tokens['rules']}, transcript {tokens['transcript']}, "
+        f"ocr {tokens['ocr']}, metadata {tokens['metadata']}, instructions {tokens['instructions']}); "
+        f"dropped {tokens['ocr_lines_dropped']} OCR lines, {tokens['rules_dropped']} rules, "
+        f"transcript compressed : {tokens['transcript_compressed']}"
+    )
+    if tokens["over_budget"]:
+        logger.warning(f"Prompt still over budget after trimming : {tokens['total']}/{tokens['budget']} tokens")
+    emit_event("prompt_tokens", segment=segment_label, focus=focus,
+               **{k: v for k, v in tokens.items() if k != "original"})
 
-    system_prompt = f"""
-            You are a senior brand compliance auditor.
-            OFFICIAL REGULATORY RULES:
-            {retrieved_rules}
-            INSTRUCTION:
-            1. Analyze the transcript and OCR below.
-            2. Identify ANY violation rules.
-            3. Return strictly JSON in following format.
-                {{
-                    "compliance_results" : [
-                        {{
-                            "category" : "Claim Violation",
-                            "severity" : "CRITICAL",
-                            "description" : "Explanation of the violation.."
-                        }}
-                    ],
-                    "status" : "FAIL",
-                    "final_report" : "Summary of the findings...."
-                }}
-
-                If no violation are found set "status" to "PASS" and "compliance_results" to [].
-    """
-
-    user_message = f"""
-            VIDEO_METADATA : {state.get('video_metadata',{})}
-            TRANSCRIPT : {transcript}
-            ON-SCREEN TEXT (OCR) : {ocr_text}
-    """
+    # exact-match response cache : same prompt, rules and deployment -> same verdict at temperature 0
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        rules_version = rules_index_version()
+        cache_key = llm_cache.key(
+            rules_version, llm.deployment_name, llm.openai_api_version, llm.temperature,
+            system_prompt, retrieved_rules, user_message
+        )
+        cached = llm_cache.get(cache_key, rules_version)
+        if cached:
+            logger.info("LLM cache hit")
+            return json.loads(cached["content"])
 
-    try:
-        response = llm.invoke([
+    # tokens-per-minute quota is charged up front with room for the answer, then settled with the real usage
+    estimated_tokens = tokens["total"] + int(os.getenv("RATE_LIMIT_OPENAI_CHAT_COMPLETION_TOKENS", "1000"))
+    with trace_step("llm", prompt_chars=len(system_prompt) + len(user_message),
+                    prompt_tokens_estimate=tokens["total"], prompt_token_budget=tokens["budget"]) as span:
+        response = call_with_retries(OPENAI_CHAT, lambda: llm.invoke([
             SystemMessage(content=system_prompt), 
             HumanMessage(content=user_message)
-        ])
-        content = response.content
-        
+        ]), tokens=estimated_tokens)
+        usage = getattr(response, "usage_metadata", None) or {}
+        span.set_attribute("input_tokens", usage.get("input_tokens", 0))
+        span.set_attribute("output_tokens", usage.get("output_tokens", 0))
+    get_rate_limiter(OPENAI_CHAT).settle(estimated_tokens, usage.get("total_tokens", 0))
+    content = response.content
+    try:
         if "```" in content:
             content = re.search(r"```(?:json)?(.*?)```", content, re.DOTALL).group(1)
         audit_data = json.loads(content.strip())
-        return{
-            "compliance_results" : audit_data.get("compliance_results",[]),
-            "final_status" : audit_data.get("status", "FAIL"),
-            "final_report" : audit_data.get("final_report", "No report generated")
+    except Exception:
+        # logging the raw response
+        logger.error(f"RAW LLM Response : {response.content}")
+        raise
+    # only responses that parsed are worth replaying
+    if llm_cache:
+        llm_cache.set(cache_key, {"content" : content.strip(), "usage" : usage})
+    return audit_data
+
+
+# ---------- segmented (map-reduce) audit ----------
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+def _parse_timestamp(timestamp: str) -> float:
+    '''Inverse of _format_seconds ("1:05" -> 65.0).'''
+    seconds = 0.0
+    for part in str(timestamp).split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _split_windows(transcript_segments, ocr_segments, window_seconds: float) -> List[Dict[str, Any]]:
+    '''
+    Buckets timed transcript and OCR lines into fixed windows by start time.
+    Returns windows in time order : {"start", "end", "transcript", "ocr_text"}
+    '''
+    windows: Dict[int, Dict[str, Any]] = {}
+    for kind, segments in (("transcript", transcript_segments or []), ("ocr_text", ocr_segments or [])):
+        for seg in segments:
+            if not seg.get("text"):
+                continue
+            index = int(seg.get("start", 0.0) // window_seconds)
+            window = windows.setdefault(index, {
+                "start": index * window_seconds,
+                "end": (index + 1) * window_seconds,
+                "transcript": [],
+                "ocr_text": []
+            })
+            # OCR repeats the same caption for every frame window
+            if kind == "transcript" or seg["text"] not in window["ocr_text"]:
+                window[kind].append(seg["text"])
+            window["end"] = max(window["end"], seg.get("end", 0.0))
+    return [windows[i] for i in sorted(windows)]
+
+
+def _segmented_audit(state: VideoAuditState, llm, vector_store):
+    '''
+    Map : audit each time window concurrently (own retrieval + LLM call).
+    Reduce : merge duplicate violations across windows and attach timestamps.
+    Returns (audit, errors).
+    '''
+    window_seconds = float(os.getenv("AUDIT_SEGMENT_SECONDS", "60"))
+    concurrency = int(os.getenv("AUDIT_SEGMENT_CONCURRENCY", "4"))
+    windows = _split_windows(state.get("transcript_segments"), state.get("ocr_segments"), window_seconds)
+    logger.info(f"Segmented audit : {len(windows)} windows of {window_seconds}s, fan-out {concurrency}")
+    flags = state.get("prescreen_flags") or []
+
+    def _audit_window(window):
+        label = f"{_format_seconds(window['start'])}-{_format_seconds(window['end'])}"
+        # timed flags go to the window they were matched in, untimed ones (e.g. a missing disclosure) to every window
+        window_flags = [
+            f for f in flags
+            if f.get("timestamp") is None or window["start"] <= _parse_timestamp(f["timestamp"]) <= window["end"]
+        ]
+        audit_data = _llm_audit(
+            llm, vector_store, " ".join(window["transcript"]), window["ocr_text"],
+            state.get('video_metadata',{}), segment_label=label, flags=window_flags
+        )
+        return label, audit_data
+
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        # each window runs in a copy of this context, so progress events reach the graph's
+        # stream writer and spans keep their parent
+        futures = [executor.submit(contextvars.copy_context().run, _audit_window, w) for w in windows]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Segment audit failed : {e}")
+                errors.append(str(e))
+
+    merged: List[Dict[str, Any]] = []
+    reports = []
+    failed = bool(errors)
+    for label, audit_data in results:
+        if audit_data.get("status", "FAIL") != "PASS":
+            failed = True
+        if audit_data.get("final_report"):
+            reports.append(f"[{label}] {audit_data['final_report']}")
+        for issue in audit_data.get("compliance_results", []):
+            issue = {**issue, "timestamp": issue.get("timestamp") or label}
+            duplicate = _find_duplicate(merged, issue)
+            if duplicate is None:
+                merged.append(issue)
+            elif issue["timestamp"] not in duplicate["timestamp"]:
+                duplicate["timestamp"] = f"{duplicate['timestamp']}, {issue['timestamp']}"
+
+    summary = f"{len(merged)} violation(s) found across {len(windows)} segment(s)."
+    return {
+        "compliance_results" : merged,
+        "final_status" : "FAIL" if failed or merged else "PASS",
+        "final_report" : "\n".join([summary] + reports)
+    }, errors
+
+
+def _find_duplicate(merged: List[Dict[str, Any]], issue: Dict[str, Any]):
+    # same category and near-identical description => same violation seen in another window
+    description = str(issue.get("description", "")).lower().strip()
+    for existing in merged:
+        if str(existing.get("category", "")).lower() != str(issue.get("category", "")).lower():
+            continue
+        ratio = SequenceMatcher(None, str(existing.get("description", "")).lower().strip(), description).ratio()
+        if ratio >= 0.85:
+            return existing
+    return None
+
+
+
+# ---------- fan-out / fan-in audit ----------
+# Each branch audits one kind of evidence with its own retrieval and a smaller prompt.
+# Branches only append to reducer fields (compliance_results, errors, branch_reports);
+# the join node is the single writer of final_status / final_report.
+def _branch_audit(branch: str, state: VideoAuditState, focus: str, **sections) -> Dict[str, Any]:
+    logger.info(f"-----[Node: {branch}] auditing-----")
+    if not state.get("transcript"):
+        return {"branch_reports" : [{"branch" : branch, "status" : "SKIPPED", "report" : "No transcript."}]}
+    try:
+        audit_data = _llm_audit(
+            client_registry.get_chat_model(temperature = 0.0), get_rules_retriever(), focus=focus,
+            flags=state.get("prescreen_flags"), **sections
+        )
+        return {
+            "compliance_results" : audit_data.get("compliance_results", []),
+            "branch_reports" : [{
+                "branch" : branch,
+                "status" : audit_data.get("status", "FAIL"),
+                "report" : audit_data.get("final_report", "No report generated")
+            }]
         }
     except Exception as e:
-        logger.error(f"System Error in Auditor Node : {str(e)}")
-        # logging the raw response
-        logger.error(f"RAW LLM Response : {response.content if 'response' in locals() else 'None'}")
-        return{
-            "errors" : [str(e)],
-            "final_status" : "FAIL"
+        logger.error(f"System Error in {branch} : {str(e)}")
+        return {
+            "errors" : [f"{branch}: {e}"],
+            "branch_reports" : [{"branch" : branch, "status" : "FAIL", "report" : f"Branch failed : {e}"}]
         }
 
 
+@traced_node("claims_auditor")
+def audit_claims_node(state:VideoAuditState) -> Dict[str, Any]:
+    '''
+    Spoken claims : misleading, absolute, health/efficacy and comparative claims in the transcript
+    '''
+    return _branch_audit(
+        "claims_auditor", state,
+        focus="Spoken claims only: misleading, absolute, health/efficacy, comparative and trademark claims.",
+        transcript=state.get("transcript")
+    )
+
+
+@traced_node("disclosure_auditor")
+def audit_disclosures_node(state:VideoAuditState) -> Dict[str, Any]:
+    '''
+    On-screen text : sponsorship disclosures (#ad), required disclaimers, legibility of overlays
+    '''
+    ocr_text = state.get("ocr_text") or []
+    return _branch_audit(
+        "disclosure_auditor", state,
+        focus="On-screen text only: missing or unclear sponsorship disclosures (#ad, sponsored) and disclaimers.",
+        ocr_text=ocr_text,
+        retrieval_query=f"sponsorship disclosure on-screen text {' '.join(ocr_text)}"
+    )
+
+
+@traced_node("metadata_auditor")
+def audit_metadata_node(state:VideoAuditState) -> Dict[str, Any]:
+    '''
+    Video metadata : duration and format requirements from the platform ad specs
+    '''
+    video_metadata = state.get("video_metadata") or {}
+    return _branch_audit(
+        "metadata_auditor", state,
+        focus="Video metadata only: duration, format and platform ad specification requirements.",
+        video_metadata=video_metadata,
+        retrieval_query=f"video ad specifications duration format {video_metadata}"
+    )
+
 
+@traced_node("finalizer")
+def finalize_audit_node(state:VideoAuditState) -> Dict[str, Any]:
+    '''
+    Join : computes final_status and final_report from every branch
+    '''
+    if not state.get("transcript"):
+        return {
+            "final_status" : "FAIL",
+            "final_report" : "Audit skipped because video processing failed (No transcript)."
+        }
+    reports = state.get("branch_reports", [])
+    results = state.get("compliance_results", [])
+    failed = bool(results) or bool(state.get("errors")) or any(r["status"] == "FAIL" for r in reports)
+    audit = {
+        "final_status" : "FAIL" if failed else "PASS",
+        "final_report" : "\n".join(f"[{r['branch']}] {r['report']}" for r in reports) or "No report generated"
+    }
+    audit_cache = get_audit_cache()
+    if audit_cache and not state.get("errors"):
+        audit_cache.set_audit(
+            state.get("cache_key"), _verdict_version(), {**audit, "compliance_results" : results}
+        )
+    return audit
@@ -25,13 +25,25 @@ class VideoAuditState(TypedDict):
 
     # ingestion and extraction data
     local_video_path: Optional[str]
+    azure_video_id: Optional[str]  # id returned by Azure Video Indexer
+    cache_key: Optional[str]  # "yt:<id>" or "sha256:<hex>" used by the audit cache
+    audit_cached: bool  # True when the indexer found a cached verdict, so auditing is skipped
     video_metadata: Dict[str, Any]   # {"duration":15, "resolution":"1080p", "fps":30}
     transcript: Optional[str]  # fully extracted speech to text
     ocr_text: List[str]
+    # same text with time ranges in seconds : [{"text": "...", "start": 1.2, "end": 3.4}]
+    transcript_segments: List[Dict[str, Any]]
+    ocr_segments: List[Dict[str, Any]]
+
+    # pre-screen output
+    prescreen_flags: List[ComplianceResult]  # borderline rule matches handed to the LLM to confirm
+    prescreen_decided: bool  # True when the pre-screen alone decided the verdict
 
     # analysis output
     # Stores the list of all compliance violations found in the video by AI
     compliance_results: Annotated[List[ComplianceResult], operator.add] # cumulative list of compliance results
+    # per-branch verdicts from the fan-out auditors : {"branch", "status", "report"}
+    branch_reports: Annotated[List[Dict[str, Any]], operator.add]
 
     # final deliverables
     final_status: str  # PASS | FAIL
@@ -1,29 +1,100 @@
 '''
 This module defines the DAG: Directed Acyclic Graph that orchestrates the video compliance audit process.
 It connects the nodes using StateGraph from LangGraph
-START -> index_video_node -> audit_content_node -> END
+
+AUDIT_GRAPH_MODE=fanout (default) :
+START -> indexer -> prescreen -+-> claims_auditor -----+-> finalizer -> END
+                               +-> disclosure_auditor -+
+                               +-> metadata_auditor ---+
+AUDIT_GRAPH_MODE=single :
+START -> indexer -> prescreen -> auditor -> END
+
+In both modes a cached verdict (AUDIT_CACHE_RESULTS) routes the indexer straight to END,
+and a verdict decided by the pre-screen (PRESCREEN_POLICY) routes the prescreen to END.
+
+With AUDIT_CHECKPOINT_URL set, every superstep is checkpointed per session
+(see checkpoint.py) and runs must pass session_config(session_id).
+
+The module-level `app` is compiled on first access (get_graph()), not at import.
 '''
 
+import os
+import threading
+
 from langgraph.graph import StateGraph, END
 from backend.src.graph.state import VideoAuditState
+from backend.src.graph.checkpoint import get_checkpointer
+
+from backend.src.graph.nodes import (
+    index_video_node,
+    prescreen_node,
+    audit_content_node,
+    audit_claims_node,
+    audit_disclosures_node,
+    audit_metadata_node,
+    finalize_audit_node
+)
 
-from backend.src.graph.nodes import (index_video_node, audit_content_node)
+AUDIT_BRANCHES = {
+    "claims_auditor": audit_claims_node,
+    "disclosure_auditor": audit_disclosures_node,
+    "metadata_auditor": audit_metadata_node,
+}
+
+def create_graph(mode=None, checkpointer=None):
+    mode = (mode or os.getenv("AUDIT_GRAPH_MODE", "fanout")).lower()
 
-def create_graph():
-    
     workflow = StateGraph(VideoAuditState)
     # add nodes
     workflow.add_node("indexer", index_video_node)
-    workflow.add_node("auditor", audit_content_node)
+    workflow.add_node("prescreen", prescreen_node)
     # define entry point
     workflow.set_entry_point("indexer")
-    # define edges
-    workflow.add_edge("indexer", "auditor")
-    # end workflow
-    workflow.add_edge("auditor", END)
 
-    app = workflow.compile()
+    if mode == "single":
+        workflow.add_node("auditor", audit_content_node)
+        audit_targets = ["auditor"]
+        # end workflow
+        workflow.add_edge("auditor", END)
+    else:
+        for name, node in AUDIT_BRANCHES.items():
+            workflow.add_node(name, node)
+        workflow.add_node("finalizer", finalize_audit_node)
+        audit_targets = list(AUDIT_BRANCHES)
+        # fan-in : the finalizer runs once every branch has finished
+        workflow.add_edge(audit_targets, "finalizer")
+        workflow.add_edge("finalizer", END)
+
+    # skip auditing entirely when the indexer returned a cached verdict
+    def route_after_index(state):
+        return END if state.get("audit_cached") else "prescreen"
+
+    # skip the LLM auditors when the pre-screen already decided
+    def route_after_prescreen(state):
+        return END if state.get("prescreen_decided") else audit_targets
+
+    workflow.add_conditional_edges("indexer", route_after_index, ["prescreen", END])
+    workflow.add_conditional_edges("prescreen", route_after_prescreen, audit_targets + [END])
+
+    app = workflow.compile(checkpointer=checkpointer or get_checkpointer())
     return app
 
-# expose the runnable app
-app = create_graph()
\ No newline at end of file
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_graph():
+    '''The process-wide compiled graph, built on first use.'''
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_graph()
+    return _app
+
+
+def __getattr__(name):
+    # expose the runnable app : `from backend.src.graph.workflow import app` compiles it lazily
+    if name == "app":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
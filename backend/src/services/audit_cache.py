@@ -0,0 +1,207 @@
+'''
+Content-addressed cache for video indexing and audit results.
+
+Entries are keyed by the canonical YouTube video id ("yt:<id>") or by the
+SHA-256 of the downloaded file ("sha256:<hex>"). Each entry holds the Azure
+Video Indexer id and the `extract_data` output, so a resubmitted ad skips
+download, upload and indexing. Final audits can also be cached, keyed by the
+rules-index version so a rebuilt knowledge base never serves stale verdicts.
+'''
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger("audit-cache")
+
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def canonical_video_key(url: str) -> Optional[str]:
+    '''
+    Returns "yt:<video id>" for any common YouTube URL shape
+    (watch?v=, youtu.be/, shorts/, embed/, live/), or None if it can't be parsed.
+    '''
+    try:
+        parsed = urlparse(url.strip())
+    except Exception:
+        return None
+    host = (parsed.hostname or "").lower()
+    video_id = None
+    if host.endswith("youtu.be"):
+        video_id = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                video_id = parts[1]
+    if video_id and _YOUTUBE_ID.match(video_id):
+        return f"yt:{video_id}"
+    return None
+
+
+def file_content_key(path: str, chunk_size: int = 1024 * 1024) -> str:
+    '''Returns "sha256:<hex>" for the file at `path`.'''
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+class MemoryCacheBackend:
+    '''In-process LRU cache with per-entry TTL.'''
+
+    def __init__(self, max_entries: int = 1024, default_ttl: int = 86400):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        expires_at = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisCacheBackend:
+    '''
+    Redis-backed cache shared across processes.
+    TTL uses native key expiry; LRU is tracked in a sorted set of last-access
+    times and trimmed to `max_entries` on every write.
+    '''
+
+    def __init__(self, url: str, max_entries: int = 10000, default_ttl: int = 86400,
+                 prefix: str = "audit-cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._lru_key = f"{prefix}__lru__"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.client.zrem(self._lru_key, key)
+            return None
+        self.client.zadd(self._lru_key, {key: time.time()})
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, json.dumps(value), ex=ttl or self.default_ttl)
+        pipe.zadd(self._lru_key, {key: time.time()})
+        pipe.zcard(self._lru_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = self.client.zpopmin(self._lru_key, size - self.max_entries)
+            if evicted:
+                self.client.delete(*[self.prefix + k.decode() for k, _ in evicted])
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+        self.client.zrem(self._lru_key, key)
+
+
+class AuditCache:
+    '''
+    Facade over a cache backend with separate namespaces for indexing output
+    ("index:<key>") and final audits ("audit:<rules version>:<key>").
+    '''
+
+    def __init__(self, backend, cache_results: bool = False):
+        self.backend = backend
+        self.cache_results = cache_results
+
+    def get_index(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self._get(f"index:{key}") if key else None
+
+    def set_index(self, key: Optional[str], azure_video_id: str, extracted: Dict[str, Any]):
+        if key:
+            self._set(f"index:{key}", {"azure_video_id": azure_video_id, "extracted": extracted})
+
+    def get_audit(self, key: Optional[str], rules_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not (self.cache_results and key and rules_version):
+            return None
+        return self._get(f"audit:{rules_version}:{key}")
+
+    def set_audit(self, key: Optional[str], rules_version: Optional[str], audit: Dict[str, Any]):
+        if self.cache_results and key and rules_version:
+            self._set(f"audit:{rules_version}:{key}", audit)
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            # a broken cache must never fail an audit
+            logger.warning(f"Audit cache read failed for {key} : {e}")
+            return None
+
+    def _set(self, key: str, value: Dict[str, Any]):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Audit cache write failed for {key} : {e}")
+
+
+_audit_cache: Optional[AuditCache] = None
+_audit_cache_lock = threading.Lock()
+
+
+def get_audit_cache() -> Optional[AuditCache]:
+    '''
+    Returns the process-wide cache configured by environment:
+    AUDIT_CACHE_BACKEND = memory (default) | redis | none
+    AUDIT_CACHE_TTL_SECONDS, AUDIT_CACHE_MAX_ENTRIES, AUDIT_CACHE_RESULTS, REDIS_URL
+    '''
+    global _audit_cache
+    backend_name = os.getenv("AUDIT_CACHE_BACKEND", "memory").lower()
+    if backend_name == "none":
+        return None
+    if _audit_cache is None:
+        with _audit_cache_lock:
+            if _audit_cache is None:
+                ttl = int(os.getenv("AUDIT_CACHE_TTL_SECONDS", "604800"))
+                max_entries = int(os.getenv("AUDIT_CACHE_MAX_ENTRIES", "1024"))
+                if backend_name == "redis":
+                    backend = RedisCacheBackend(
+                        url=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                        max_entries=max_entries,
+                        default_ttl=ttl
+                    )
+                else:
+                    backend = MemoryCacheBackend(max_entries=max_entries, default_ttl=ttl)
+                cache_results = os.getenv("AUDIT_CACHE_RESULTS", "false").lower() == "true"
+                _audit_cache = AuditCache(backend, cache_results=cache_results)
+                logger.info(f"Audit cache enabled ({backend_name}, ttl={ttl}s, max_entries={max_entries})")
+    return _audit_cache
@@ -0,0 +1,154 @@
+'''
+Process-wide registry for the Azure OpenAI, embeddings and Azure AI Search clients.
+
+Building these clients costs a TLS handshake, a fresh HTTP connection pool and
+(for AzureSearch) an index-schema lookup. The registry builds each client once
+per distinct configuration, lazily, and hands the same instance to every node.
+The OpenAI clients share one keep-alive httpx pool. LangChain's OpenAI and
+Azure Search integrations are imported by the first build, not at import time.
+'''
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+
+from backend.src.api.telemetry import traced_embedding
+from backend.src.services.rate_limiter import limited_embedding
+
+logger = logging.getLogger("client-registry")
+
+
+class ClientRegistry:
+    '''
+    Lazily builds and caches clients keyed by (kind, settings).
+    Safe to use from many threads: each key is built at most once.
+    '''
+
+    def __init__(self):
+        self._clients: Dict[Tuple[Hashable, ...], Any] = {}
+        self._key_locks: Dict[Tuple[Hashable, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    # ---------- public accessors ----------
+    def get_chat_model(self, deployment: Optional[str] = None, api_version: Optional[str] = None,
+                       temperature: float = 0.0):
+        deployment = deployment or os.getenv("AZURE_OPENAI_CHAT_MODEL")
+        api_version = api_version or os.getenv("AZURE_OPENAI_API_VERSION")
+        from langchain_openai import AzureChatOpenAI
+
+        return self._get_or_create(
+            ("chat", deployment, api_version, temperature),
+            lambda: AzureChatOpenAI(
+                azure_deployment=deployment,
+                openai_api_version=api_version,
+                temperature=temperature,
+                http_client=self.http_client,
+                # throttling retries happen in services/rate_limiter.py, coordinated with the shared quota
+                max_retries=int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "0"))
+            )
+        )
+
+    def get_embeddings(self, deployment: Optional[str] = None, api_version: Optional[str] = None):
+        deployment = deployment or os.getenv("AZURE_OPENAI_EMBEDDING_MODEL")
+        api_version = api_version or os.getenv("AZURE_OPENAI_API_VERSION")
+        from langchain_openai import AzureOpenAIEmbeddings
+
+        return self._get_or_create(
+            ("embeddings", deployment, api_version),
+            lambda: AzureOpenAIEmbeddings(
+                azure_deployment=deployment,
+                openai_api_version=api_version,
+                http_client=self.http_client,
+                max_retries=int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "0")),
+                # the context-length check tokenizes locally with tiktoken (downloads its encoding once)
+                check_embedding_ctx_length=os.getenv("AZURE_OPENAI_EMBEDDING_CHECK_CTX", "true").lower() == "true"
+            )
+        )
+
+    def get_vector_store(self, endpoint: Optional[str] = None, index_name: Optional[str] = None,
+                         embedding_deployment: Optional[str] = None):
+        endpoint = endpoint or os.getenv("AZURE_AI_SEARCH_ENDPOINT")
+        index_name = index_name or os.getenv("AZURE_AI_SEARCH_INDEX_NAME")
+        embedding_deployment = embedding_deployment or os.getenv("AZURE_OPENAI_EMBEDDING_MODEL")
+
+        def _build():
+            # embeddings are resolved only when the store is built, so a cached store does not count as an embeddings reuse
+            from langchain_community.vectorstores import AzureSearch
+
+            embeddings = self.get_embeddings(deployment=embedding_deployment)
+            return AzureSearch(
+                azure_search_endpoint=endpoint,
+                azure_search_key=os.getenv("AZURE_AI_SEARCH_API_KEY"),
+                index_name=index_name,
+                embedding_function=traced_embedding(limited_embedding(embeddings.embed_query))
+            )
+
+        return self._get_or_create(("vector_store", endpoint, index_name, embedding_deployment), _build)
+
+    @property
+    def http_client(self) -> httpx.Client:
+        '''Shared keep-alive connection pool for the OpenAI clients.'''
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100")),
+                            max_keepalive_connections=int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE", "20")),
+                            keepalive_expiry=float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+                        ),
+                        timeout=httpx.Timeout(float(os.getenv("AZURE_OPENAI_TIMEOUT", "120")))
+                    )
+        return self._http_client
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        '''Returns {kind: {"created": n, "reused": m}} counters.'''
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._counters.items()}
+
+    def clear(self):
+        '''Drops every cached client (e.g. after rotating credentials).'''
+        with self._lock:
+            self._clients.clear()
+            self._key_locks.clear()
+            self._counters.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+    # ---------- internals ----------
+    def _get_or_create(self, key: Tuple[Hashable, ...], factory: Callable[[], Any]) -> Any:
+        kind = key[0]
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._count(kind, "reused")
+                return client
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # build outside the registry lock so slow constructors don't block other kinds
+        with key_lock:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is not None:
+                    self._count(kind, "reused")
+                    return client
+            logger.info(f"Creating {kind} client for {key[1:]}")
+            client = factory()
+            with self._lock:
+                self._clients[key] = client
+                self._count(kind, "created")
+            return client
+
+    def _count(self, kind: str, event: str):
+        counts = self._counters.setdefault(kind, {"created": 0, "reused": 0})
+        counts[event] += 1
+
+
+# shared by every node in the process
+client_registry = ClientRegistry()
@@ -0,0 +1,158 @@
+'''
+Hash manifest for incremental indexing of the rules knowledge base.
+
+The manifest records, per index target ("azure:<index name>" or
+"local:<path>"), the SHA-256 of every indexed PDF and the ids of the chunks
+it produced. Chunk ids are content hashes, so an unchanged chunk keeps its
+id across runs and only new or changed chunks are embedded and uploaded.
+
+The manifest also yields a rules-index version (a hash over all chunk ids)
+that caches use to invalidate results when the knowledge base changes. The
+manifest only exists where the indexer ran, so API hosts read the version
+from the local index metadata (RULES_RETRIEVER=local) or RULES_INDEX_VERSION.
+'''
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("index-manifest")
+
+DEFAULT_MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "index_manifest.json"
+)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, content: str) -> str:
+    '''Content hash of a chunk; valid as an Azure AI Search document key.'''
+    return hashlib.sha256(f"{source}\0{content}".encode("utf-8")).hexdigest()
+
+
+def version_of(chunk_ids) -> Optional[str]:
+    '''Rules-index version : a short hash over the sorted chunk ids (None for an empty index).'''
+    ids = sorted(chunk_ids)
+    if not ids:
+        return None
+    return hashlib.sha256("\n".join(ids).encode()).hexdigest()[:16]
+
+
+def azure_target(index_name: str) -> str:
+    return f"azure:{index_name}"
+
+
+def local_target(path: str) -> str:
+    return f"local:{os.path.abspath(path)}"
+
+
+class IndexManifest:
+    '''
+    {"targets": {target: {"files": {name: {"sha256": ..., "chunks": [ids]}}}}}
+    '''
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("INDEX_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        self.data: Dict[str, Any] = {"targets": {}}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.data = json.load(f)
+
+    def files(self, target: str) -> Dict[str, Dict[str, Any]]:
+        return self.data["targets"].setdefault(target, {"files": {}})["files"]
+
+    def reset(self, target: str):
+        self.data["targets"][target] = {"files": {}}
+
+    def set_file(self, target: str, name: str, sha256: str, chunk_ids):
+        self.files(target)[name] = {"sha256": sha256, "chunks": sorted(chunk_ids)}
+
+    def remove_file(self, target: str, name: str):
+        self.files(target).pop(name, None)
+
+    def version(self, target: str) -> Optional[str]:
+        files = self.data["targets"].get(target, {}).get("files") or {}
+        return version_of(cid for entry in files.values() for cid in entry["chunks"])
+
+    def save(self):
+        # write-then-rename so a crash never leaves a half-written manifest
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+_version_cache: Dict[Any, Any] = {}
+_version_lock = threading.Lock()
+_warned_targets = set()
+
+
+def _read_cached(path: str, key: str, read: Callable[[str], Optional[str]]) -> Optional[str]:
+    '''read(path), re-run only when the file's mtime changes; None if the file is missing or unreadable.'''
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _version_lock:
+        cached = _version_cache.get((path, key))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            version = read(path)
+        except Exception as e:
+            logger.warning(f"Could not read the rules index version from {path} : {e}")
+            return None
+        _version_cache[(path, key)] = (mtime, version)
+        return version
+
+
+def _local_index_version(path: str) -> Optional[str]:
+    with open(path) as f:
+        return json.load(f).get("version")
+
+
+def rules_index_version() -> Optional[str]:
+    '''
+    Version of the rules index the auditor is querying.
+    RULES_INDEX_VERSION wins when set. Otherwise the local index carries its own
+    version (RULES_RETRIEVER=local), and the manifest is the last resort : it only
+    exists on the host that ran the indexer, so Azure deployments must set
+    RULES_INDEX_VERSION (the indexer logs the value). Without a version the
+    verdict cache is off and LLM cache entries are never invalidated; that is
+    logged as an error once per target.
+    '''
+    explicit = os.getenv("RULES_INDEX_VERSION")
+    if explicit:
+        return explicit
+
+    version = None
+    if os.getenv("RULES_RETRIEVER", "azure").lower() == "local":
+        from backend.src.services.retrievers import DEFAULT_LOCAL_INDEX_PATH
+        index_path = os.getenv("RULES_LOCAL_INDEX_PATH", DEFAULT_LOCAL_INDEX_PATH)
+        target = local_target(index_path)
+        version = _read_cached(f"{index_path}.json", "local", _local_index_version)
+    else:
+        target = azure_target(os.getenv("AZURE_AI_SEARCH_INDEX_NAME", ""))
+
+    if version is None:
+        manifest_path = os.getenv("INDEX_MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+        version = _read_cached(manifest_path, target, lambda path: IndexManifest(path).version(target))
+
+    if version is None and target not in _warned_targets:
+        _warned_targets.add(target)
+        logger.error(
+            f"No rules index version for {target} : set RULES_INDEX_VERSION (logged by "
+            f"scripts/index_documents.py). Until then cached verdicts are disabled and "
+            f"LLM cache entries are not invalidated when the rules change."
+        )
+    return version
@@ -0,0 +1,127 @@
+'''
+Ingestion profiles : how much of the video we download and upload.
+
+Auditing needs intelligible speech and legible on-screen text, not the
+highest-bitrate stream, so the profile picks the cheapest sufficient yt-dlp
+format and can re-encode locally with ffmpeg before the upload.
+
+INGESTION_PROFILE =
+  best            : yt-dlp "best", no transcode (previous behaviour)
+  capped          : best stream under VIDEO_MAX_HEIGHT / VIDEO_MAX_TBR_KBPS (default)
+  transcode       : capped download, then H.264 at VIDEO_TRANSCODE_CRF + mono AAC audio
+  audio_keyframes : capped download, then mono speech-quality audio plus one frame every
+                    VIDEO_KEYFRAME_INTERVAL seconds (enough for transcript and OCR, same timeline)
+
+If ffmpeg (FFMPEG_BINARY) is missing or fails, the original download is uploaded.
+'''
+
+import os
+import time
+import shutil
+import logging
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from backend.src.api.telemetry import trace_step, emit_event
+
+logger = logging.getLogger("video-ingestion")
+
+PROFILES = ("best", "capped", "transcode", "audio_keyframes")
+
+
+def _capped_format(max_height: int, max_tbr: int) -> str:
+    # progressive (audio+video) streams only, so no merge step is needed; fall back to the smallest one
+    return f"best[height<={max_height}][tbr<={max_tbr}]/best[height<={max_height}]/worst"
+
+
+def get_ingestion_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    '''
+    Resolves a profile to {"name", "format", "transcode"} where "transcode" is
+    the ffmpeg output arguments, or None when the download is uploaded as-is.
+    '''
+    name = (name or os.getenv("INGESTION_PROFILE", "capped")).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown ingestion profile : {name} (expected one of {', '.join(PROFILES)})")
+
+    max_height = int(os.getenv("VIDEO_MAX_HEIGHT", "720"))
+    max_tbr = int(os.getenv("VIDEO_MAX_TBR_KBPS", "1500"))
+    audio_args = ["-c:a", "aac", "-b:a", os.getenv("VIDEO_AUDIO_BITRATE", "64k"), "-ac", "1"]
+
+    transcode: Optional[List[str]] = None
+    if name == "transcode":
+        transcode = [
+            "-vf", f"scale=-2:'min({max_height},ih)'",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", os.getenv("VIDEO_TRANSCODE_CRF", "28"),
+            *audio_args,
+        ]
+    elif name == "audio_keyframes":
+        interval = float(os.getenv("VIDEO_KEYFRAME_INTERVAL", "1"))
+        transcode = [
+            # one still per interval, held until the next one : OCR still sees every caption
+            "-vf", f"fps=1/{interval:g},scale=-2:'min({max_height},ih)'",
+            "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage", "-r", "1",
+            *audio_args,
+        ]
+
+    return {
+        "name": name,
+        "format": "best" if name == "best" else _capped_format(max_height, max_tbr),
+        "transcode": transcode,
+    }
+
+
+def estimate_best_size(info: Dict[str, Any]) -> Optional[int]:
+    '''Size in bytes of the largest progressive format yt-dlp offered, if it reported sizes.'''
+    sizes = [
+        f.get("filesize") or f.get("filesize_approx")
+        for f in info.get("formats") or []
+        if f.get("vcodec") not in (None, "none") and f.get("acodec") not in (None, "none")
+    ]
+    sizes = [s for s in sizes if s]
+    return max(sizes) if sizes else None
+
+
+def transcode_for_upload(input_path: str, profile: Dict[str, Any]) -> str:
+    '''
+    Re-encodes `input_path` with the profile's ffmpeg arguments next to the input
+    and returns the path to upload. Returns `input_path` unchanged when the
+    profile has no transcode step, ffmpeg is unavailable or the output is not smaller.
+    '''
+    if not profile.get("transcode"):
+        return input_path
+    ffmpeg = os.getenv("FFMPEG_BINARY", "ffmpeg")
+    if shutil.which(ffmpeg) is None:
+        logger.warning(f"ffmpeg not found ({ffmpeg}); uploading the download as-is")
+        return input_path
+
+    root, _ = os.path.splitext(input_path)
+    output_path = f"{root}.{profile['name']}.mp4"
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-i", input_path, *profile["transcode"],
+           "-movflags", "+faststart", output_path]
+    original_bytes = os.path.getsize(input_path)
+    started = time.perf_counter()
+    try:
+        with trace_step("transcode", profile=profile["name"], input_bytes=original_bytes) as span:
+            subprocess.run(cmd, check=True, capture_output=True)
+            output_bytes = os.path.getsize(output_path)
+            span.set_attribute("output_bytes", output_bytes)
+    except (subprocess.CalledProcessError, OSError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        logger.warning(f"Transcode failed, uploading the download as-is : {stderr.decode(errors='replace').strip() or e}")
+        return input_path
+
+    if output_bytes >= original_bytes:
+        logger.info(f"Transcode ({profile['name']}) did not shrink the video; uploading the original")
+        os.remove(output_path)
+        return input_path
+
+    saved = original_bytes - output_bytes
+    logger.info(
+        f"Transcoded ({profile['name']}) {original_bytes} -> {output_bytes} bytes, "
+        f"saved {saved} bytes ({saved / original_bytes:.0%}) in {time.perf_counter() - started:.1f}s"
+    )
+    emit_event("transcode", profile=profile["name"], input_bytes=original_bytes,
+               output_bytes=output_bytes, bytes_saved=saved)
+    # the original is no longer needed; free the spool space before the upload
+    os.remove(input_path)
+    return output_path
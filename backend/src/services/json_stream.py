@@ -0,0 +1,192 @@
+'''
+Incremental, selective JSON parsing.
+
+select_json() reads a JSON document from an iterator of byte chunks (e.g.
+requests' iter_content) and builds only the parts named by `paths`, skipping
+everything else without materialising it. Skipped values are scanned with
+regular expressions (strings and brackets only), so the cost of an unwanted
+subtree is a scan, not a tree of Python objects, and only the unread window
+of the stream is held in memory.
+
+Paths are tuples of object keys, with "*" for every element of an array :
+    ("videos", "*", "insights", "ocr")
+The result keeps the document's shape, pruned to the selected paths.
+'''
+
+import re
+import json
+import codecs
+from typing import Any, Dict, Iterable, Tuple
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+# everything up to the next bracket outside a string (complete strings are consumed whole)
+_TO_BRACKET = re.compile(r'(?:[^"\[\]{}]++|"[^"\\]*+(?:\\.[^"\\]*+)*+")*+')
+_SCALAR = re.compile(r"[^,\]}\s]+")
+
+# marks a fully selected subtree in the path trie
+_ALL = object()
+
+# consumed text is dropped from the buffer once this much has accumulated
+_COMPACT_CHARS = 1 << 16
+
+
+class _Reader:
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._done = False
+        self._pin = None  # start of a value being captured : kept through compaction
+        self.buf = ""
+        self.pos = 0
+        self.bytes_read = 0
+
+    def fill(self) -> bool:
+        '''Appends the next chunk to the buffer; False at the end of the stream.'''
+        if self._done:
+            return False
+        keep = self.pos if self._pin is None else min(self.pos, self._pin)
+        if keep > _COMPACT_CHARS:
+            self.buf = self.buf[keep:]
+            self.pos -= keep
+            if self._pin is not None:
+                self._pin -= keep
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            self.buf += self._decoder.decode(chunk)
+            return True
+        self.buf += self._decoder.decode(b"", final=True)
+        self._done = True
+        return False
+
+    def peek(self) -> str:
+        '''Skips whitespace and returns the next character.'''
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def skip_string(self):
+        while True:
+            match = _STRING.match(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return
+            if not self.fill():
+                raise ValueError("Unterminated string in JSON stream")
+
+    def skip(self):
+        '''Moves past one value without building it.'''
+        char = self.peek()
+        if char == '"':
+            self.skip_string()
+        elif char in "{[":
+            depth = 0
+            while True:
+                self.pos = _TO_BRACKET.match(self.buf, self.pos).end()
+                if self.pos == len(self.buf) or self.buf[self.pos] == '"':
+                    # end of the buffer, or a string it cuts off
+                    if not self.fill():
+                        raise ValueError("Unexpected end of JSON stream")
+                    continue
+                depth += 1 if self.buf[self.pos] in "{[" else -1
+                self.pos += 1
+                if depth == 0:
+                    return
+        else:
+            # number, true, false, null : may be cut by a chunk boundary
+            while True:
+                match = _SCALAR.match(self.buf, self.pos)
+                if match.end() < len(self.buf) or not self.fill():
+                    self.pos = match.end()
+                    return
+
+    def capture(self) -> Any:
+        '''Parses one value fully.'''
+        self.peek()
+        self._pin = self.pos
+        try:
+            self.skip()
+            return json.loads(self.buf[self._pin:self.pos])
+        finally:
+            self._pin = None
+
+    def read_key(self) -> str:
+        self._pin = self.pos
+        try:
+            self.skip_string()
+            return json.loads(self.buf[self._pin:self.pos])
+        finally:
+            self._pin = None
+
+
+def _trie(paths: Iterable[Tuple[str, ...]]) -> Dict[str, Any]:
+    root: Dict[str, Any] = {}
+    for path in paths:
+        node = root
+        for key in path[:-1]:
+            child = node.setdefault(key, {})
+            if child is _ALL:
+                break
+            node = child
+        else:
+            node[path[-1]] = _ALL
+    return root
+
+
+def _select(reader: _Reader, node) -> Any:
+    if node is _ALL:
+        return reader.capture()
+    char = reader.peek()
+    if char == "{":
+        reader.pos += 1
+        result = {}
+        while True:
+            char = reader.peek()
+            if char == "}":
+                reader.pos += 1
+                return result
+            if char == ",":
+                reader.pos += 1
+                continue
+            key = reader.read_key()
+            reader.expect(":")
+            child = node.get(key)
+            if child is None:
+                reader.skip()
+            else:
+                result[key] = _select(reader, child)
+    if char == "[" and "*" in node:
+        reader.pos += 1
+        items = []
+        while True:
+            char = reader.peek()
+            if char == "]":
+                reader.pos += 1
+                return items
+            if char == ",":
+                reader.pos += 1
+                continue
+            items.append(_select(reader, node["*"]))
+    # not the shape the paths expect (or an array whose items are not selected)
+    reader.skip()
+    return None
+
+
+def select_json(chunks: Iterable[bytes], paths: Iterable[Tuple[str, ...]]) -> Tuple[Any, int]:
+    '''
+    Returns (pruned document, bytes read). Values on the selected paths are
+    parsed with json.loads; everything else is skipped.
+    '''
+    reader = _Reader(chunks)
+    document = _select(reader, _trie(paths))
+    return document, reader.bytes_read
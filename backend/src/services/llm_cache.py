@@ -0,0 +1,169 @@
+'''
+Exact-match cache for auditor LLM responses.
+
+The auditor calls the chat model at temperature 0.0, so the same prompt
+against the same rules and deployment gives the same verdict. Retries,
+resubmissions and re-runs after a crash are served from here instead.
+
+The key is a SHA-256 over the deployment, API version, temperature, system
+prompt, retrieved rule chunks and user message. Keys are namespaced by the
+rules-index version, so rebuilding the knowledge base invalidates every
+entry : the SQLite backend deletes stale versions as soon as it sees a new
+one, Redis lets them age out through TTL and LRU trimming.
+'''
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from backend.src.api.telemetry import counters
+from backend.src.services.audit_cache import RedisCacheBackend
+
+logger = logging.getLogger("llm-cache")
+
+
+class SqliteCacheBackend:
+    '''
+    Persistent LRU cache in a single SQLite file, bounded to `max_entries`
+    and with per-entry TTL. One connection shared across threads under a lock.
+    '''
+
+    def __init__(self, path: str, max_entries: int = 5000, default_ttl: int = 604800):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + (ttl or self.default_ttl), now)
+            )
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if size > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                    (size - self.max_entries,)
+                )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_except(self, prefix: str) -> int:
+        '''Deletes every entry whose key does not start with `prefix`; returns how many.'''
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) != ?", (len(prefix), prefix))
+            return cursor.rowcount
+
+
+class LLMResponseCache:
+    '''
+    get/set of raw LLM response text by prompt. Hits and misses are counted in
+    `audit_llm_cache_requests_total{result="hit"|"miss"}` on /metrics.
+    '''
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._seen_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(rules_version: Optional[str], deployment: str, api_version: str, temperature: float,
+            system_prompt: str, rules: str, user_message: str) -> str:
+        digest = hashlib.sha256(
+            json.dumps([deployment, api_version, temperature, system_prompt, rules, user_message]).encode("utf-8")
+        ).hexdigest()
+        return f"llm:{rules_version or 'unversioned'}:{digest}"
+
+    def _invalidate_stale(self, rules_version: Optional[str]):
+        # first request under a new rules version drops every entry from older versions
+        with self._lock:
+            if rules_version == self._seen_version:
+                return
+            self._seen_version = rules_version
+        purge = getattr(self.backend, "purge_except", None)
+        if purge:
+            removed = purge(f"llm:{rules_version or 'unversioned'}:")
+            if removed:
+                logger.info(f"Rules index is now {rules_version} : dropped {removed} cached LLM responses")
+
+    def get(self, key: str, rules_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            self._invalidate_stale(rules_version)
+            value = self.backend.get(key)
+        except Exception as e:
+            # a broken cache must never fail an audit
+            logger.warning(f"LLM cache read failed : {e}")
+            value = None
+        counters.inc("audit_llm_cache_requests_total", result="hit" if value else "miss")
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed : {e}")
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    '''
+    Returns the process-wide LLM response cache configured by environment:
+    LLM_CACHE_BACKEND = sqlite (default) | redis | none
+    LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, REDIS_URL
+    '''
+    global _llm_cache
+    backend_name = os.getenv("LLM_CACHE_BACKEND", "sqlite").lower()
+    if backend_name == "none":
+        return None
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                ttl = int(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))
+                max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+                if backend_name == "redis":
+                    backend = RedisCacheBackend(
+                        url=os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                        max_entries=max_entries,
+                        default_ttl=ttl,
+                        prefix="llm-cache:"
+                    )
+                else:
+                    backend = SqliteCacheBackend(
+                        os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite"), max_entries=max_entries, default_ttl=ttl
+                    )
+                _llm_cache = LLMResponseCache(backend)
+                logger.info(f"LLM response cache enabled ({backend_name}, ttl={ttl}s, max_entries={max_entries})")
+    return _llm_cache
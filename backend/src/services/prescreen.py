@@ -0,0 +1,147 @@
+'''
+Deterministic pre-screen for audits, run before any LLM call.
+
+Rules live in a versioned JSON file (PRESCREEN_RULES_PATH, default
+backend/data/prescreen_rules.json). Each rule is either
+- "banned"   : any match in the rule's source is a finding
+- "required" : no match anywhere in the rule's source is a finding
+and carries a confidence : "clear" findings can decide an audit on their own,
+"borderline" findings are left for the LLM to judge.
+
+All patterns of a source (transcript / ocr) are compiled into ONE
+case-insensitive alternation regex with a named group per rule, so each text
+is scanned once however many rules there are.
+'''
+
+import os
+import re
+import json
+import bisect
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("prescreen")
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "prescreen_rules.json"
+)
+
+SOURCES = ("transcript", "ocr")
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+class PrescreenEngine:
+    '''
+    Compiled rule set. `scan(state)` returns (findings, borderline) where both
+    are lists of ComplianceResult-shaped dicts.
+    '''
+
+    def __init__(self, rules: List[Dict[str, Any]], version: str):
+        self.version = version
+        self.rules = {rule["id"]: rule for rule in rules}
+        self._patterns: Dict[str, Optional[re.Pattern]] = {}
+        self._groups: Dict[str, Dict[str, str]] = {}
+        for source in SOURCES:
+            alternatives, groups = [], {}
+            for i, rule in enumerate(rules):
+                if rule.get("source", "any") not in (source, "any"):
+                    continue
+                terms = rule["patterns"] if rule.get("regex") else [
+                    # literal phrase, whole words only where the phrase starts/ends with a word character
+                    (r"\b" if re.match(r"\w", p) else "") + re.escape(p) + (r"\b" if re.search(r"\w$", p) else "")
+                    for p in rule["patterns"]
+                ]
+                group = f"r{i}"
+                groups[group] = rule["id"]
+                alternatives.append(f"(?P<{group}>{'|'.join(terms)})")
+            self._patterns[source] = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+            self._groups[source] = groups
+
+    @classmethod
+    def from_file(cls, path: str) -> "PrescreenEngine":
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        # the declared version plus a content hash, so an edited file without a bump still invalidates caches
+        version = f"{data.get('version', '0')}-{hashlib.sha256(raw).hexdigest()[:8]}"
+        return cls(data.get("rules", []), version)
+
+    def _matches(self, source: str, segments: List[Dict[str, Any]], fallback: List[str]) -> Dict[str, Dict[str, Any]]:
+        '''First match per rule id : {"text", "start"} (start is None without timed segments).'''
+        pattern = self._patterns[source]
+        if pattern is None:
+            return {}
+        texts = [s["text"] for s in segments] if segments else fallback
+        starts = [s.get("start") for s in segments] if segments else [None] * len(texts)
+        # one pass over the joined text; offsets map each match back to its segment
+        offsets, position = [], 0
+        for text in texts:
+            offsets.append(position)
+            position += len(text) + 1
+        matches: Dict[str, Dict[str, Any]] = {}
+        for match in pattern.finditer("\n".join(texts)):
+            rule_id = self._groups[source][match.lastgroup]
+            if rule_id not in matches:
+                segment = bisect.bisect_right(offsets, match.start()) - 1
+                matches[rule_id] = {"text": match.group(), "start": starts[segment]}
+        return matches
+
+    def scan(self, state: Dict[str, Any]):
+        transcript = state.get("transcript") or ""
+        hits = {
+            "transcript": self._matches("transcript", state.get("transcript_segments") or [], [transcript]),
+            "ocr": self._matches("ocr", state.get("ocr_segments") or [], state.get("ocr_text") or []),
+        }
+
+        findings, borderline = [], []
+        for rule_id, rule in self.rules.items():
+            sources = SOURCES if rule.get("source", "any") == "any" else (rule["source"],)
+            found = [hits[s][rule_id] for s in sources if rule_id in hits[s]]
+            if rule.get("type", "banned") == "required":
+                if found:
+                    continue
+                description = f"{rule['description']} (pre-screen rule {rule_id} : none of {rule['patterns']} found)"
+                timestamp = None
+            else:
+                if not found:
+                    continue
+                description = f"{rule['description']} (pre-screen rule {rule_id} : matched '{found[0]['text']}')"
+                timestamp = _format_seconds(found[0]["start"]) if found[0]["start"] is not None else None
+            result = {
+                "category": rule["category"],
+                "severity": rule.get("severity", "MEDIUM"),
+                "description": description,
+                "timestamp": timestamp,
+            }
+            (findings if rule.get("confidence", "borderline") == "clear" else borderline).append(result)
+        return findings, borderline
+
+
+_engine: Optional[PrescreenEngine] = None
+_engine_key: Optional[tuple] = None
+_engine_lock = threading.Lock()
+
+
+def get_prescreen_engine() -> Optional[PrescreenEngine]:
+    '''
+    Returns the engine for PRESCREEN_RULES_PATH, recompiled only when the file
+    changes. None if the rules file does not exist.
+    '''
+    global _engine, _engine_key
+    path = os.getenv("PRESCREEN_RULES_PATH", DEFAULT_RULES_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _engine_lock:
+        if _engine is None or _engine_key != (path, mtime):
+            _engine = PrescreenEngine.from_file(path)
+            _engine_key = (path, mtime)
+            logger.info(f"Loaded {len(_engine.rules)} pre-screen rules from {path} (version {_engine.version})")
+        return _engine
@@ -0,0 +1,236 @@
+'''
+Token-budgeted prompt assembly for the auditor.
+
+Every section of the audit prompt (instructions, retrieved rules, transcript,
+OCR, metadata, pre-screen flags) is counted with a local tokenizer, and the
+whole prompt is held under a per-model input budget. When it does not fit,
+sections are cut in this order until it does :
+  1. OCR lines, latest first (they are already deduplicated)
+  2. retrieved rule chunks, lowest-ranked first (the top chunk is always kept)
+  3. transcript : repeated sentences are removed, then the middle is elided
+     so the opening and the closing (where offers and disclaimers sit) remain
+
+Budgets : AUDIT_PROMPT_TOKEN_BUDGET overrides; otherwise MODEL_TOKEN_BUDGETS by
+deployment name, falling back to DEFAULT_TOKEN_BUDGET.
+'''
+
+import os
+import re
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("prompt-builder")
+
+# input-token budgets per chat deployment : well under each context window, to bound cost and latency
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o": 16000,
+    "gpt-4o-mini": 16000,
+    "gpt-4.1": 16000,
+    "gpt-4.1-mini": 16000,
+    "gpt-4": 6000,
+    "gpt-35-turbo": 3000,
+}
+DEFAULT_TOKEN_BUDGET = 8000
+
+# tokens kept back for the JSON answer's framing and chat-message overhead
+RESPONSE_OVERHEAD_TOKENS = 64
+
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+_tokenizer_failed = False
+
+
+def _encoding(model: Optional[str]):
+    '''
+    The model's tiktoken encoding, loaded once per process under a lock, so
+    concurrent first prompts do not each download it. A failed load is
+    remembered : every later count falls back to the estimate, with one warning.
+    '''
+    global _tokenizer_failed
+    key = model or ""
+    if key in _encodings:
+        return _encodings[key]
+    with _encodings_lock:
+        if key in _encodings:
+            return _encodings[key]
+        encoding = None
+        if not _tokenizer_failed:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(key)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # tiktoken downloads its encoding files once; without them, estimate
+                _tokenizer_failed = True
+                logger.warning(f"Tokenizer unavailable ({e}); estimating 4 characters per token")
+        _encodings[key] = encoding
+        return encoding
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def token_budget(model: Optional[str]) -> int:
+    explicit = os.getenv("AUDIT_PROMPT_TOKEN_BUDGET")
+    if explicit:
+        return int(explicit)
+    return MODEL_TOKEN_BUDGETS.get((model or "").lower(), DEFAULT_TOKEN_BUDGET)
+
+
+def _system_prompt(rules: List[str], subjects: List[str], focus: Optional[str]) -> str:
+    focus_line = f"\n            FOCUS: {focus}" if focus else ""
+    retrieved_rules = "\n\n".join(rules)
+    return f"""
+            You are a senior brand compliance auditor.{focus_line}
+            OFFICIAL REGULATORY RULES:
+            {retrieved_rules}
+            INSTRUCTION:
+            1. Analyze the {' and '.join(subjects)} below.
+            2. Identify ANY violation rules.
+            3. Return strictly JSON in following format.
+                {{
+                    "compliance_results" : [
+                        {{
+                            "category" : "Claim Violation",
+                            "severity" : "CRITICAL",
+                            "description" : "Explanation of the violation.."
+                        }}
+                    ],
+                    "status" : "FAIL",
+                    "final_report" : "Summary of the findings...."
+                }}
+
+                If no violation are found set "status" to "PASS" and "compliance_results" to [].
+    """
+
+
+def _user_message(transcript, ocr_text, video_metadata, segment_label, flags) -> str:
+    user_message = ""
+    if video_metadata is not None:
+        user_message += f"""
+            VIDEO_METADATA : {video_metadata}"""
+    if transcript is not None:
+        user_message += f"""
+            TRANSCRIPT : {transcript}"""
+    if ocr_text is not None:
+        user_message += f"""
+            ON-SCREEN TEXT (OCR) : {ocr_text}"""
+    if segment_label:
+        user_message += f"""
+            SEGMENT : {segment_label} (only this part of the video is shown)"""
+    if flags:
+        user_message += f"""
+            PRE-SCREEN FLAGS (keyword matches, confirm or dismiss each) : {[f["description"] for f in flags]}"""
+    user_message += "\n    "
+    return user_message
+
+
+def _dedupe_sentences(text: str) -> str:
+    '''Drops sentences already said earlier (ads repeat taglines); keeps first occurrences in order.'''
+    seen, kept = set(), []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        key = " ".join(sentence.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            kept.append(sentence)
+    return " ".join(kept)
+
+
+def _elide_middle(text: str, max_tokens: int, model: Optional[str]) -> str:
+    '''Keeps the start and end of `text` within roughly `max_tokens`, marking what was cut.'''
+    if max_tokens <= 0:
+        return ""
+    words = text.split()
+    low, high = 0, len(words)
+    # binary search on the number of words kept, split evenly between head and tail
+    while low < high:
+        mid = (low + high + 1) // 2
+        head, tail = words[:(mid + 1) // 2], words[len(words) - mid // 2:]
+        candidate = f"{' '.join(head)} [... {len(words) - mid} words omitted ...] {' '.join(tail)}"
+        if count_tokens(candidate, model) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    head, tail = words[:(low + 1) // 2], words[len(words) - low // 2:]
+    return f"{' '.join(head)} [... {len(words) - low} words omitted ...] {' '.join(tail)}"
+
+
+def build_audit_prompt(rules: List[str], transcript: Optional[str] = None, ocr_text: Optional[List[str]] = None,
+                       video_metadata: Optional[Dict[str, Any]] = None, segment_label: Optional[str] = None,
+                       focus: Optional[str] = None, flags: Optional[List[Dict[str, Any]]] = None,
+                       model: Optional[str] = None, budget: Optional[int] = None) -> Tuple[str, str, Dict[str, Any]]:
+    '''
+    Returns (system_prompt, user_message, breakdown). `rules` are ordered best
+    match first. The breakdown has per-section token counts, what was trimmed
+    and the final total.
+    '''
+    budget = budget or token_budget(model)
+    subjects = [name for name, value in (("transcript", transcript), ("OCR", ocr_text), ("metadata", video_metadata))
+                if value is not None]
+    rules = list(rules)
+    ocr_lines = list(ocr_text) if ocr_text is not None else None
+
+    def _total() -> int:
+        return (count_tokens(_system_prompt(rules, subjects, focus), model)
+                + count_tokens(_user_message(transcript, ocr_lines, video_metadata, segment_label, flags), model)
+                + RESPONSE_OVERHEAD_TOKENS)
+
+    original = {
+        "rules": count_tokens("\n\n".join(rules), model),
+        "transcript": count_tokens(transcript or "", model),
+        "ocr": count_tokens(str(ocr_lines) if ocr_lines is not None else "", model),
+    }
+    trimmed = {"ocr_lines_dropped": 0, "rules_dropped": 0, "transcript_compressed": False}
+
+    total = _total()
+    # 1. OCR : drop lines from the end, by the share of tokens that has to go
+    while total > budget and ocr_lines:
+        excess_share = (total - budget) / max(count_tokens(str(ocr_lines), model), 1)
+        drop = min(len(ocr_lines), max(1, int(len(ocr_lines) * excess_share)))
+        ocr_lines = ocr_lines[:-drop]
+        trimmed["ocr_lines_dropped"] += drop
+        total = _total()
+
+    # 2. rules : drop the lowest-ranked chunks, always keeping the best match
+    while total > budget and len(rules) > 1:
+        rules.pop()
+        trimmed["rules_dropped"] += 1
+        total = _total()
+
+    # 3. transcript : remove repeated sentences, then elide the middle to what is left of the budget
+    if total > budget and transcript:
+        trimmed["transcript_compressed"] = True
+        transcript = _dedupe_sentences(transcript)
+        total = _total()
+        if total > budget:
+            available = count_tokens(transcript, model) - (total - budget)
+            transcript = _elide_middle(transcript, available, model)
+            total = _total()
+
+    system_prompt = _system_prompt(rules, subjects, focus)
+    user_message = _user_message(transcript, ocr_lines, video_metadata, segment_label, flags)
+    breakdown = {
+        "budget": budget,
+        "total": total,
+        "instructions": count_tokens(_system_prompt([], subjects, focus), model),
+        "rules": count_tokens("\n\n".join(rules), model),
+        "transcript": count_tokens(transcript or "", model),
+        "ocr": count_tokens(str(ocr_lines) if ocr_lines is not None else "", model),
+        "metadata": count_tokens(str(video_metadata) if video_metadata is not None else "", model),
+        "flags": count_tokens(str([f["description"] for f in flags]) if flags else "", model),
+        "original": original,
+        **trimmed,
+        "over_budget": total > budget,
+    }
+    return system_prompt, user_message, breakdown
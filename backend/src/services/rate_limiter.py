@@ -0,0 +1,379 @@
+'''
+Quota-aware rate limiting and throttling retries for Azure OpenAI, Azure AI
+Search and Video Indexer.
+
+Each endpoint has up to two token buckets : requests per minute and tokens
+per minute. A call waits until both have room, so every process together
+stays at (not under) the quota. The buckets live in Redis when
+RATE_LIMIT_BACKEND=redis, so API processes and workers share one budget;
+the default keeps them per process.
+
+Throttled (429) and transient (5xx, connection) failures are retried with
+full-jitter exponential backoff. A Retry-After (or retry-after-ms) header
+wins over the backoff and also pauses the endpoint's shared bucket, so other
+callers stop hammering the service for that long too.
+
+Per-endpoint configuration (0 or unset = unlimited) :
+  RATE_LIMIT_<ENDPOINT>_RPM, RATE_LIMIT_<ENDPOINT>_TPM
+for ENDPOINT in OPENAI_CHAT, OPENAI_EMBEDDINGS, SEARCH, VIDEO_INDEXER.
+'''
+
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.src.api.telemetry import counters
+
+logger = logging.getLogger("rate-limiter")
+
+OPENAI_CHAT = "openai_chat"
+OPENAI_EMBEDDINGS = "openai_embeddings"
+SEARCH = "search"
+VIDEO_INDEXER = "video_indexer"
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# connection-level failures worth retrying (requests, httpx/openai and azure-core names)
+RETRYABLE_ERRORS = {"ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "APIConnectionError",
+                    "APITimeoutError", "ServiceRequestError", "ServiceResponseError"}
+# for calls that must not run twice (e.g. an upload that creates a video) : only failures where the
+# server cannot have acted on the request. A 5xx or read timeout may follow an accepted upload.
+UNSENT_STATUS = {429}
+UNSENT_ERRORS = {"ConnectionError", "ConnectTimeout", "APIConnectionError", "ServiceRequestError"}
+
+
+class LocalBuckets:
+    '''In-process token buckets (one process, many threads).'''
+
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}  # key -> (level, updated_at)
+        self._paused_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def take(self, endpoint: str, buckets: List[Tuple[str, float, float, float]]) -> float:
+        '''
+        Takes `cost` from every (name, capacity, refill_per_second, cost) bucket
+        if all of them have room; otherwise takes nothing and returns the seconds to wait.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            paused = self._paused_until.get(endpoint, 0.0) - now
+            if paused > 0:
+                return paused
+            levels, wait = {}, 0.0
+            for name, capacity, rate, cost in buckets:
+                key = f"{endpoint}:{name}"
+                level, updated = self._state.get(key, (capacity, now))
+                level = min(capacity, level + (now - updated) * rate)
+                levels[key] = level
+                if level < cost:
+                    wait = max(wait, (cost - level) / rate)
+            if wait == 0.0:
+                for name, _, _, cost in buckets:
+                    key = f"{endpoint}:{name}"
+                    levels[key] -= cost
+            for key, level in levels.items():
+                self._state[key] = (level, now)
+            return wait
+
+    def settle(self, endpoint: str, name: str, capacity: float, rate: float, delta: float):
+        '''Charges (delta > 0) or refunds (delta < 0) a bucket once the real cost is known.'''
+        now = time.monotonic()
+        key = f"{endpoint}:{name}"
+        with self._lock:
+            level, updated = self._state.get(key, (capacity, now))
+            level = min(capacity, level + (now - updated) * rate)
+            # may go negative : callers then wait until the debt is paid back
+            self._state[key] = (min(capacity, level - delta), now)
+
+    def pause(self, endpoint: str, seconds: float):
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[endpoint] = max(self._paused_until.get(endpoint, 0.0), until)
+
+
+# KEYS : pause key, then one hash per bucket. ARGV : capacity, rate, cost per bucket.
+# Uses the server clock, so every host sees the same refill.
+_TAKE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local paused = tonumber(redis.call('GET', KEYS[1]) or '0') - now
+if paused > 0 then return tostring(paused) end
+local levels, wait = {}, 0
+for i = 2, #KEYS do
+  local capacity, rate, cost = tonumber(ARGV[i*3-5]), tonumber(ARGV[i*3-4]), tonumber(ARGV[i*3-3])
+  local state = redis.call('HMGET', KEYS[i], 'level', 'updated')
+  local level = tonumber(state[1]) or capacity
+  local updated = tonumber(state[2]) or now
+  level = math.min(capacity, level + (now - updated) * rate)
+  levels[i] = level
+  if level < cost then wait = math.max(wait, (cost - level) / rate) end
+end
+for i = 2, #KEYS do
+  local capacity, rate, cost = tonumber(ARGV[i*3-5]), tonumber(ARGV[i*3-4]), tonumber(ARGV[i*3-3])
+  local level = levels[i]
+  if wait == 0 then level = level - cost end
+  redis.call('HSET', KEYS[i], 'level', tostring(level), 'updated', tostring(now))
+  redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 60)
+end
+return tostring(wait)
+"""
+
+_SETTLE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity, rate, delta = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'level', 'updated')
+local level = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+level = math.min(capacity, math.min(capacity, level + (now - updated) * rate) - delta)
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return 1
+"""
+
+_PAUSE = """
+local t = redis.call('TIME')
+local until_ = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+if until_ > tonumber(redis.call('GET', KEYS[1]) or '0') then
+  redis.call('SET', KEYS[1], tostring(until_), 'PX', math.ceil(tonumber(ARGV[1]) * 1000) + 1000)
+end
+return 1
+"""
+
+
+class RedisBuckets:
+    '''Token buckets in Redis, shared by every API and worker process.'''
+
+    def __init__(self, url: str, prefix: str = "rate-limit:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE)
+        self._settle = self.client.register_script(_SETTLE)
+        self._pause = self.client.register_script(_PAUSE)
+
+    def take(self, endpoint: str, buckets: List[Tuple[str, float, float, float]]) -> float:
+        keys = [f"{self.prefix}{endpoint}:pause"] + [f"{self.prefix}{endpoint}:{name}" for name, *_ in buckets]
+        args = [value for _, capacity, rate, cost in buckets for value in (capacity, rate, cost)]
+        return float(self._take(keys=keys, args=args))
+
+    def settle(self, endpoint: str, name: str, capacity: float, rate: float, delta: float):
+        self._settle(keys=[f"{self.prefix}{endpoint}:{name}"], args=[capacity, rate, delta])
+
+    def pause(self, endpoint: str, seconds: float):
+        self._pause(keys=[f"{self.prefix}{endpoint}:pause"], args=[seconds])
+
+
+class RateLimiter:
+    '''
+    Requests-per-minute and tokens-per-minute limits for one endpoint.
+    Buckets hold RATE_LIMIT_BURST_SECONDS worth of quota, so short bursts
+    pass immediately and sustained load settles at the configured rate.
+    '''
+
+    def __init__(self, endpoint: str, buckets, rpm: float = 0, tpm: float = 0, burst_seconds: float = 10):
+        self.endpoint = endpoint
+        self.buckets = buckets
+        self.limits = {name: limit for name, limit in (("requests", rpm), ("tokens", tpm)) if limit}
+        self.burst_seconds = burst_seconds
+
+    def _shape(self, name: str) -> Tuple[float, float]:
+        limit = self.limits[name]
+        return max(1.0, limit * self.burst_seconds / 60.0), limit / 60.0  # (capacity, refill per second)
+
+    def acquire(self, tokens: int = 0) -> float:
+        '''Blocks until one request (and `tokens` tokens) fit in the quota; returns seconds waited.'''
+        if not self.limits:
+            return 0.0
+        waited = 0.0
+        while True:
+            request = []
+            for name in self.limits:
+                capacity, rate = self._shape(name)
+                cost = 1 if name == "requests" else tokens
+                # a single call larger than the bucket would never fit; let it through at full capacity
+                request.append((name, capacity, rate, min(cost, capacity)))
+            try:
+                wait = self.buckets.take(self.endpoint, request)
+            except Exception as e:
+                # an unreachable limiter must not stop audits; the retries still handle 429s
+                logger.warning(f"Rate limiter unavailable for {self.endpoint} : {e}")
+                return waited
+            if wait <= 0:
+                if waited:
+                    counters.inc("rate_limit_delayed_total", endpoint=self.endpoint)
+                return waited
+            wait = min(wait, 60.0)
+            time.sleep(wait)
+            waited += wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        '''Corrects the tokens bucket once the response reports what the call really cost.'''
+        if "tokens" not in self.limits or not actual_tokens or actual_tokens == estimated_tokens:
+            return
+        capacity, rate = self._shape("tokens")
+        try:
+            self.buckets.settle(self.endpoint, "tokens", capacity, rate, actual_tokens - estimated_tokens)
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable for {self.endpoint} : {e}")
+
+    def pause(self, seconds: float):
+        try:
+            self.buckets.pause(self.endpoint, seconds)
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable for {self.endpoint} : {e}")
+
+
+def _headers_of(outcome) -> Dict[str, str]:
+    response = outcome if hasattr(outcome, "status_code") and hasattr(outcome, "headers") else None
+    response = response or getattr(outcome, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return {str(k).lower(): v for k, v in dict(headers).items()}
+
+
+def _status_of(outcome) -> Optional[int]:
+    status = getattr(outcome, "status_code", None)
+    if status is None:
+        status = getattr(getattr(outcome, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(outcome) -> Optional[float]:
+    '''Retry-After of a response or exception (seconds, HTTP date or Azure's retry-after-ms), if any.'''
+    headers = _headers_of(outcome)
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        if headers.get(name):
+            try:
+                return float(headers[name]) / 1000.0
+            except ValueError:
+                pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_retryable(outcome, idempotent: bool = True) -> bool:
+    '''
+    True for throttling / transient server responses and connection-level exceptions.
+    With idempotent=False only throttling and failures to reach the server count.
+    '''
+    if getattr(outcome, "retries_exhausted", False):
+        # already retried by an inner call (e.g. the embedding inside a search) : don't multiply retries
+        return False
+    retry_status, retry_errors = (RETRYABLE_STATUS, RETRYABLE_ERRORS) if idempotent else (UNSENT_STATUS, UNSENT_ERRORS)
+    status = _status_of(outcome)
+    if status is not None:
+        return status in retry_status
+    return isinstance(outcome, BaseException) and any(
+        cls.__name__ in retry_errors for cls in type(outcome).__mro__
+    )
+
+
+def call_with_retries(endpoint: str, call: Callable[[], Any], tokens: int = 0,
+                      max_retries: Optional[int] = None, idempotent: bool = True) -> Any:
+    '''
+    Runs `call` under the endpoint's rate limit, retrying throttled and transient
+    failures. `call` may return an HTTP response (retried on 429 / 5xx status)
+    or raise (retried on throttling status or connection errors). The last
+    response is returned, or the last exception raised, once retries run out.
+    `call` must be safe to repeat; pass max_retries=0 for one-shot bodies and
+    idempotent=False for calls with side effects (only 429s and connection
+    failures are retried then). Responses of discarded attempts are closed.
+    '''
+    limiter = get_rate_limiter(endpoint)
+    if max_retries is None:
+        max_retries = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "6"))
+    base = float(os.getenv("RATE_LIMIT_BACKOFF_BASE_SECONDS", "1"))
+    cap = float(os.getenv("RATE_LIMIT_BACKOFF_MAX_SECONDS", "60"))
+
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            outcome = call()
+            error = None
+        except Exception as e:
+            outcome, error = e, e
+        if not is_retryable(outcome, idempotent):
+            if error is not None:
+                raise error
+            return outcome
+
+        status = _status_of(outcome)
+        counters.inc("rate_limit_retryable_total", endpoint=endpoint, status=str(status or type(outcome).__name__))
+        if attempt >= max_retries:
+            logger.warning(f"{endpoint} : giving up after {attempt + 1} attempts ({status or type(outcome).__name__})")
+            if error is not None:
+                error.retries_exhausted = True
+                raise error
+            return outcome
+
+        retry_after = retry_after_seconds(outcome)
+        if error is None and hasattr(outcome, "close"):
+            # a discarded (possibly streamed) response would otherwise hold its pooled connection
+            outcome.close()
+        if retry_after is not None:
+            # the service said when : everyone sharing the bucket waits that long, plus a little jitter
+            limiter.pause(retry_after)
+            delay = retry_after + random.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+        else:
+            # full jitter : spread the retries of concurrent callers across the whole window
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+        attempt += 1
+        logger.info(f"{endpoint} : {status or type(outcome).__name__}, retry {attempt}/{max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def limited_embedding(embed_query):
+    '''Wraps an embed_query function with the embeddings rate limit and retries.'''
+    from backend.src.services.prompt_builder import count_tokens
+
+    def wrapper(text):
+        return call_with_retries(OPENAI_EMBEDDINGS, lambda: embed_query(text), tokens=count_tokens(text))
+    return wrapper
+
+
+_buckets = None
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(endpoint: str) -> RateLimiter:
+    '''
+    Returns the process-wide limiter for `endpoint`, configured by environment:
+    RATE_LIMIT_BACKEND = memory (default) | redis, REDIS_URL,
+    RATE_LIMIT_<ENDPOINT>_RPM / _TPM, RATE_LIMIT_BURST_SECONDS (default 10).
+    '''
+    global _buckets
+    limiter = _limiters.get(endpoint)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        if endpoint not in _limiters:
+            if _buckets is None:
+                if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "redis":
+                    _buckets = RedisBuckets(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+                else:
+                    _buckets = LocalBuckets()
+            name = endpoint.upper()
+            rpm = float(os.getenv(f"RATE_LIMIT_{name}_RPM", "0") or 0)
+            tpm = float(os.getenv(f"RATE_LIMIT_{name}_TPM", "0") or 0)
+            _limiters[endpoint] = RateLimiter(
+                endpoint, _buckets, rpm=rpm, tpm=tpm,
+                burst_seconds=float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+            )
+            if rpm or tpm:
+                logger.info(f"Rate limit for {endpoint} : {rpm:g} requests/min, {tpm:g} tokens/min")
+        return _limiters[endpoint]
@@ -0,0 +1,250 @@
+'''
+Pluggable retrievers for the rules knowledge base.
+
+Both backends expose `similarity_search(query, k)` returning LangChain
+Documents, so the auditor does not care where the rules live:
+- azure : Azure AI Search (the shared AzureSearch client)
+- local : an in-process NumPy index exported by scripts/index_documents.py,
+          memory-mapped from disk, with brute-force or IVF (ANN) top-k and
+          optional int8 quantisation; reloaded when the indexer re-exports it
+
+Local index layout for a base path P:
+  P.npy          float32 or int8 embedding matrix (rows L2-normalised)
+  P.scales.npy   per-row dequantisation scales (int8 only)
+  P.ivf.npz      IVF centroids and row assignments (ANN only)
+  P.json         documents, dimensions and index options
+'''
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.src.services.clients import client_registry
+from backend.src.api.telemetry import traced_embedding
+from backend.src.services.rate_limiter import limited_embedding
+
+logger = logging.getLogger("rules-retriever")
+
+DEFAULT_LOCAL_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "rules_index"
+)
+
+
+# rows of an int8 index converted to float32 at a time while scoring
+INT8_BLOCK_ROWS = 4096
+
+
+def _normalise(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    '''Spherical k-means; returns unit-length centroids.'''
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = vectors[assignments == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalise(centroids)
+    return centroids
+
+
+def _replace(path: str, write: Callable[[Any], None]):
+    '''
+    Writes via a temporary file and renames it over `path` : a running API keeps
+    its memory map of the old file instead of seeing it truncated mid-query.
+    '''
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def export_local_index(path: str, vectors, documents: List[Document], quantization: str = "none",
+                       ann_lists: int = 0, embedding_model: Optional[str] = None, version: Optional[str] = None):
+    '''
+    Writes embeddings and their documents to the local index layout.
+    quantization : "none" (float32) or "int8"
+    ann_lists : number of IVF lists to build (0 = brute force only)
+    version : rules-index version stored with the index, read by the caches at query time
+    '''
+    vectors = _normalise(np.asarray(vectors, dtype=np.float32))
+    if len(vectors) != len(documents):
+        raise ValueError(f"{len(vectors)} vectors for {len(documents)} documents")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        _replace(f"{path}.npy", lambda f: np.save(f, np.round(vectors / scales[:, None]).astype(np.int8)))
+        _replace(f"{path}.scales.npy", lambda f: np.save(f, scales.astype(np.float32)))
+    elif quantization == "none":
+        _replace(f"{path}.npy", lambda f: np.save(f, vectors))
+    else:
+        raise ValueError(f"Unknown quantization : {quantization}")
+
+    ann_lists = min(ann_lists, len(vectors))
+    if ann_lists > 0:
+        centroids = _kmeans(vectors, ann_lists)
+        assignments = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+        _replace(f"{path}.ivf.npz", lambda f: np.savez(f, centroids=centroids, assignments=assignments))
+    elif os.path.exists(f"{path}.ivf.npz"):
+        os.remove(f"{path}.ivf.npz")
+
+    # written last : its mtime is what running retrievers watch to reload (see get_rules_retriever)
+    _replace(f"{path}.json", lambda f: f.write(json.dumps({
+            "dimensions": int(vectors.shape[1]) if len(vectors) else 0,
+            "count": len(documents),
+            "quantization": quantization,
+            "ann_lists": ann_lists,
+            "embedding_model": embedding_model,
+            "version": version,
+            "documents": [{"page_content": d.page_content, "metadata": d.metadata} for d in documents],
+        }).encode("utf-8")))
+    logger.info(f"Exported local rules index : {len(documents)} chunks to {path} ({quantization}, ivf={ann_lists})")
+
+
+def load_local_entries(path: str) -> Dict[str, Any]:
+    '''
+    Reads an exported index back as {chunk_id: (Document, float32 vector)} so an
+    incremental export only has to embed new chunks. Empty if no index exists.
+    '''
+    if not (os.path.exists(f"{path}.json") and os.path.exists(f"{path}.npy")):
+        return {}
+    with open(f"{path}.json") as f:
+        meta = json.load(f)
+    matrix = np.load(f"{path}.npy").astype(np.float32)
+    if meta["quantization"] == "int8":
+        matrix *= np.load(f"{path}.scales.npy")[:, None]
+    entries = {}
+    for row, d in enumerate(meta["documents"]):
+        cid = d["metadata"].get("chunk_id")
+        if cid:
+            entries[cid] = (Document(page_content=d["page_content"], metadata=d["metadata"]), matrix[row])
+    return entries
+
+
+def _index_signature(path: str):
+    '''Changes whenever the indexer re-exports the index (the metadata file is replaced last).'''
+    stat = os.stat(f"{path}.json")
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LocalVectorIndex:
+    '''
+    Memory-mapped local index. Scores are cosine similarities
+    (rows are normalised at export time).
+    '''
+
+    def __init__(self, path: str, embedding_function: Callable[[str], List[float]], nprobe: int = 4):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        # taken before reading, so a re-export that lands during the load triggers another reload
+        self.signature = _index_signature(path)
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        self.quantization = meta["quantization"]
+        self.documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in meta["documents"]]
+        self.matrix = np.load(f"{path}.npy", mmap_mode="r")
+        if len(self.matrix) != len(self.documents):
+            raise ValueError(f"{path}.npy has {len(self.matrix)} rows for {len(self.documents)} documents")
+        # per-row float32 scales : int8 rows are scored as (row . query) * scale, never dequantised as a whole
+        self.scales = np.load(f"{path}.scales.npy").astype(np.float32) if self.quantization == "int8" else None
+        self.centroids = None
+        self.lists: Optional[List[np.ndarray]] = None
+        if meta.get("ann_lists") and os.path.exists(f"{path}.ivf.npz"):
+            ivf = np.load(f"{path}.ivf.npz")
+            self.centroids = ivf["centroids"]
+            assignments = ivf["assignments"]
+            self.lists = [np.flatnonzero(assignments == c) for c in range(len(self.centroids))]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4):
+        return self.search_vector(self.embedding_function(query), k=k)
+
+    def search_vector(self, vector, k: int = 4):
+        '''Top-k (Document, score) for an already-embedded query.'''
+        if not self.documents:
+            return []
+        query = _normalise(np.asarray(vector, dtype=np.float32))
+        rows = self._candidate_rows(query)
+        scores = self._scores(query, rows)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[int(rows[i])], float(scores[i])) for i in top]
+
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.arange(len(self.documents))
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.sort(np.concatenate([self.lists[c] for c in probes]))
+
+    def _scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        full = len(rows) == len(self.documents)
+        if self.scales is None:
+            matrix = self.matrix if full else self.matrix[rows]
+            return np.asarray(matrix @ query, dtype=np.float32)
+        # int8 : converted block by block, so a query never materialises a float32 copy of the matrix
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), INT8_BLOCK_ROWS):
+            block = slice(start, start + INT8_BLOCK_ROWS)
+            matrix = self.matrix[block] if full else self.matrix[rows[block]]
+            scores[block] = matrix.astype(np.float32) @ query
+        return scores * (self.scales if full else self.scales[rows])
+
+
+_retrievers: Dict[Any, Any] = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_rules_retriever():
+    '''
+    Returns the retriever selected by RULES_RETRIEVER (azure | local).
+    The local index is loaded from RULES_LOCAL_INDEX_PATH and reloaded when the
+    indexer exports a new version; until the new one loads, the old one serves.
+    '''
+    backend = os.getenv("RULES_RETRIEVER", "azure").lower()
+    if backend != "local":
+        return client_registry.get_vector_store()
+
+    path = os.getenv("RULES_LOCAL_INDEX_PATH", DEFAULT_LOCAL_INDEX_PATH)
+    key = ("local", path)
+    with _retrievers_lock:
+        retriever = _retrievers.get(key)
+        try:
+            signature = _index_signature(path)
+        except OSError:
+            signature = None
+        if retriever is None or (signature is not None and signature != retriever.signature):
+            try:
+                loaded = LocalVectorIndex(
+                    path,
+                    embedding_function=traced_embedding(limited_embedding(client_registry.get_embeddings().embed_query)),
+                    nprobe=int(os.getenv("RULES_LOCAL_NPROBE", "4"))
+                )
+            except Exception as e:
+                if retriever is None:
+                    raise
+                # caught mid-export : keep serving the loaded version, retry on the next call
+                logger.warning(f"Could not reload local rules index {path} ({e}); keeping the loaded version")
+                return retriever
+            logger.info(
+                f"{'Reloaded' if retriever else 'Loaded'} local rules index from {path} ({len(loaded.documents)} chunks)"
+            )
+            retriever = _retrievers[key] = loaded
+    return retriever
@@ -1,12 +1,106 @@
 import os
+import re
+import sys
+import json
 import time
+import uuid
+import queue
+import base64
 import logging
+import tempfile
+import threading
+import subprocess
 import requests
-import yt_dlp  
-from azure.identity import DefaultAzureCredential
+from difflib import SequenceMatcher
+# yt_dlp and azure.identity are imported on first use : together they add seconds to a cold start
+
+from backend.src.api.telemetry import trace_step, emit_event
+from backend.src.services.ingestion import estimate_best_size
+from backend.src.services.rate_limiter import call_with_retries, VIDEO_INDEXER
+from backend.src.services.json_stream import select_json
 
 logger = logging.getLogger("video-indexer")
 
+# Video Indexer account tokens are valid for one hour
+DEFAULT_ACCOUNT_TOKEN_TTL = 3600
+
+YOUTUBE_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# the only parts of a /Index payload that polling and extract_data read; faces, labels,
+# keyframes etc. are skipped while the response streams in
+INDEX_PATHS = (
+    ("state",),
+    ("videos", "*", "processingProgress"),
+    ("videos", "*", "insights", "transcript"),
+    ("videos", "*", "insights", "ocr"),
+    ("summarizedInsights", "duration"),
+)
+INDEX_CHUNK_SIZE = 64 * 1024
+
+# token refreshes allowed per poll when /Index keeps answering 401 (wrong account or role, clock skew)
+AUTH_REFRESH_LIMIT = 2
+
+
+class TokenCache:
+    """
+    Process-wide cache for ARM and Video Indexer account tokens.
+    Tokens are reused until `refresh_margin` seconds before they expire, and
+    each key is refreshed by a single caller while concurrent callers wait.
+    """
+
+    def __init__(self, refresh_margin=None):
+        self.refresh_margin = refresh_margin if refresh_margin is not None else int(
+            os.getenv("VIDEO_INDEXER_TOKEN_REFRESH_MARGIN", "300")
+        )
+        self._tokens = {}  # key -> (token, expires_on)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """Returns a cached token for `key`, calling `fetch() -> (token, expires_on)` when stale."""
+        token = self._fresh(key)
+        if token:
+            return token
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # another caller may have refreshed it while we waited
+            token = self._fresh(key)
+            if token:
+                return token
+            token, expires_on = fetch()
+            with self._lock:
+                self._tokens[key] = (token, expires_on)
+            return token
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(key, None)
+
+    def _fresh(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+        if entry and entry[1] - self.refresh_margin > time.time():
+            return entry[0]
+        return None
+
+
+def _jwt_expiry(token, default_ttl=DEFAULT_ACCOUNT_TOKEN_TTL):
+    """Reads the `exp` claim of a JWT without verifying it; falls back to now + default_ttl."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return int(time.time()) + default_ttl
+
+
+# shared by every VideoIndexerService instance in the process
+token_cache = TokenCache()
+
 class VideoIndexerService:
     def __init__(self):
         self.account_id = os.getenv("AZURE_VIDEO_INDEXER_ACCOUNT_ID")
@@ -14,97 +108,352 @@ class VideoIndexerService:
         self.subscription_id = os.getenv("AZURE_VIDEO_INDEXER_SUBSCRIPTION_ID")
         self.resource_group = os.getenv("AZURE_RESOURCE_GROUP")
         self.vi_name = os.getenv("AZURE_VIDEO_INDEXER_NAME", "brand-project-yt")
-        self.credential = DefaultAzureCredential()
+        # overridable so the benchmark suite can point the service at local fakes
+        self.api_url = os.getenv("AZURE_VIDEO_INDEXER_API_URL", "https://api.videoindexer.ai").rstrip("/")
+        self.management_url = os.getenv("AZURE_MANAGEMENT_URL", "https://management.azure.com").rstrip("/")
+        self.poll_interval = float(os.getenv("VIDEO_INDEXER_POLL_INTERVAL", "30"))
+        self.included_insights = os.getenv("VIDEO_INDEXER_INCLUDED_INSIGHTS", "Transcript,Ocr")
+        self._credential = None
+
+    @property
+    def credential(self):
+        # only needed when the ARM token is not cached yet
+        if self._credential is None:
+            from azure.identity import DefaultAzureCredential
+
+            self._credential = DefaultAzureCredential()
+        return self._credential
 
     def get_access_token(self):
+        """Returns an ARM Access Token, cached until shortly before it expires."""
+        return token_cache.get(("arm",), self._fetch_access_token)
+
+    def get_account_token(self, arm_access_token=None):
+        """Returns a Video Indexer Account Token, cached until shortly before it expires."""
+        return token_cache.get(
+            self._account_token_key(), lambda: self._fetch_account_token(arm_access_token or self.get_access_token())
+        )
+
+    def _account_token_key(self):
+        return ("vi", self.subscription_id, self.resource_group, self.vi_name)
+
+    def _fetch_access_token(self):
         """Generates an ARM Access Token."""
         try:
-            token_object = self.credential.get_token("https://management.azure.com/.default")
-            return token_object.token
+            with trace_step("arm_token"):
+                token_object = self.credential.get_token("https://management.azure.com/.default")
+            return token_object.token, token_object.expires_on
         except Exception as e:
             logger.error(f"Failed to get Azure Token: {e}")
             raise
 
-    def get_account_token(self, arm_access_token):
+    def _fetch_account_token(self, arm_access_token):
         """Exchanges ARM token for Video Indexer Account Token."""
         url = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}"
+            f"{self.management_url}/subscriptions/{self.subscription_id}"
             f"/resourceGroups/{self.resource_group}"
             f"/providers/Microsoft.VideoIndexer/accounts/{self.vi_name}"
             f"/generateAccessToken?api-version=2024-01-01"
         )
         headers = {"Authorization": f"Bearer {arm_access_token}"}
         payload = {"permissionType": "Contributor", "scope": "Account"}
-        response = requests.post(url, headers=headers, json=payload)
+        with trace_step("account_token"):
+            response = call_with_retries(VIDEO_INDEXER, lambda: requests.post(url, headers=headers, json=payload))
         if response.status_code != 200:
             raise Exception(f"Failed to get VI Account Token: {response.text}")
-        return response.json().get("accessToken")
+        access_token = response.json().get("accessToken")
+        return access_token, _jwt_expiry(access_token)
 
     # --- NEW FUNCTION: Download from YouTube ---
-    def download_youtube_video(self, url, output_path="temp_video.mp4"):
-        """Downloads a YouTube video to a local file."""
+    def download_youtube_video(self, url, output_path="temp_video.mp4", format_selector="best"):
+        """Downloads a YouTube video to a local file in the given yt-dlp format (see services/ingestion.py)."""
         logger.info(f"Downloading YouTube video: {url}")
         
         ydl_opts = {
-         'format': 'best',
+         'format': format_selector,
          'outtmpl': output_path, # output template
          'quiet': False,
          'no_warnings': False,
     # Add these options:
          'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
          'http_headers': {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        'User-Agent': YOUTUBE_USER_AGENT
             }
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            emit_event("download", status="started", url=url)
+            with trace_step("download", url=url, format=format_selector) as span:
+                import yt_dlp
+
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=True)
+                downloaded = os.path.getsize(output_path)
+                span.set_attribute("bytes", downloaded)
+                best = estimate_best_size(info or {})
+                if best and best > downloaded:
+                    span.set_attribute("bytes_saved", best - downloaded)
+                    logger.info(f"Format '{format_selector}' : {downloaded} bytes instead of ~{best} for 'best' "
+                                f"(saved ~{best - downloaded} bytes)")
+            emit_event("download", status="finished", bytes=downloaded)
             logger.info("Download complete.")
             return output_path
         except Exception as e:
             raise Exception(f"YouTube Download Failed: {str(e)}")
 
-    # --- UPDATED FUNCTION: Upload Local File ---
-    def upload_video(self, video_path, video_name):
-        """Uploads a LOCAL FILE to Azure Video Indexer."""
-        arm_token = self.get_access_token()
-        vi_token = self.get_account_token(arm_token)
+    def resolve_media_url(self, url, format_selector="best"):
+        """
+        Resolves the direct media URL of the selected format with yt-dlp's
+        metadata extraction only : nothing is downloaded. Only single-file
+        http(s) formats qualify (no separate audio/video streams, no HLS/DASH manifests).
+        """
+        ydl_opts = {
+            'format': format_selector,
+            'quiet': True,
+            'no_warnings': True,
+            'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
+            'http_headers': {'User-Agent': YOUTUBE_USER_AGENT},
+        }
+        with trace_step("resolve_url", url=url, format=format_selector) as span:
+            import yt_dlp
 
-        api_url = f"https://api.videoindexer.ai/{self.location}/Accounts/{self.account_id}/Videos"
-        
-        params = {
-            "accessToken": vi_token,
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            if info.get("requested_formats"):
+                raise Exception(f"Format '{format_selector}' needs separate audio and video streams")
+            media_url = info.get("url")
+            if not media_url or info.get("protocol", "https") not in ("http", "https"):
+                raise Exception(f"No direct media URL for format '{format_selector}' (protocol {info.get('protocol')})")
+            span.set_attribute("format_id", str(info.get("format_id")))
+            span.set_attribute("bytes", info.get("filesize") or info.get("filesize_approx") or 0)
+        logger.info(f"Resolved media URL for {url} (format {info.get('format_id')})")
+        return media_url
+
+    def stream_youtube_video(self, url, chunk_size=None, buffer_chunks=None, format_selector="best"):
+        """
+        Streams a YouTube video from yt-dlp's stdout as an iterator of byte chunks.
+        The download runs in a background thread and at most `buffer_chunks`
+        chunks are held in memory, so nothing touches the local disk.
+        """
+        chunk_size = chunk_size or int(os.getenv("VIDEO_STREAM_CHUNK_SIZE", str(1024 * 1024)))
+        buffer_chunks = buffer_chunks or int(os.getenv("VIDEO_STREAM_BUFFER_CHUNKS", "16"))
+        logger.info(f"Streaming YouTube video: {url}")
+        emit_event("download", status="started", url=url, mode="stream")
+
+        cmd = [
+            sys.executable, "-m", "yt_dlp",
+            "--format", format_selector,
+            "--output", "-",
+            "--quiet", "--no-warnings", "--no-part",
+            "--extractor-args", "youtube:player_client=android,web",
+            "--user-agent", YOUTUBE_USER_AGENT,
+            url,
+        ]
+        stderr_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        buffer = queue.Queue(maxsize=buffer_chunks)
+        stop = threading.Event()
+
+        def _reader():
+            try:
+                while not stop.is_set():
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    while not stop.is_set():
+                        try:
+                            buffer.put(chunk, timeout=1)
+                            break
+                        except queue.Full:
+                            continue
+            finally:
+                # end-of-stream marker; dropped if the consumer already went away
+                while True:
+                    try:
+                        buffer.put(None, timeout=1)
+                        break
+                    except queue.Full:
+                        if stop.is_set():
+                            break
+
+        reader = threading.Thread(target=_reader, daemon=True)
+        reader.start()
+        try:
+            while True:
+                chunk = buffer.get()
+                if chunk is None:
+                    break
+                yield chunk
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                error = stderr_file.read().decode(errors="replace").strip()
+                raise Exception(f"YouTube Download Failed: {error}")
+            emit_event("download", status="finished", mode="stream")
+            logger.info("Download stream complete.")
+        finally:
+            # runs on success, failure and when the consumer stops early
+            stop.set()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            reader.join(timeout=5)
+            process.stdout.close()
+            stderr_file.close()
+
+    def _upload_params(self, video_name):
+        return {
+            "accessToken": self.get_account_token(),
             "name": video_name,
             "privacy": "Private",
             "indexingPreset": "Default",
         }
+
+    def _upload_url(self):
+        return f"{self.api_url}/{self.location}/Accounts/{self.account_id}/Videos"
+
+    # --- UPDATED FUNCTION: Upload Local File ---
+    def upload_video(self, video_path, video_name):
+        """Uploads a LOCAL FILE to Azure Video Indexer."""
+        api_url = self._upload_url()
+        params = self._upload_params(video_name)
         
         logger.info(f"Uploading file {video_path} to Azure...")
         
         # Open the file in binary mode and stream it to Azure
-        with open(video_path, 'rb') as video_file:
-            files = {'file': video_file}
-            response = requests.post(api_url, params=params, files=files)
+        emit_event("upload", status="started", bytes=os.path.getsize(video_path))
+        def _post():
+            # reopened on every attempt, so a throttled upload can be retried from the start
+            with open(video_path, 'rb') as video_file:
+                files = {'file': video_file}
+                return requests.post(api_url, params=params, files=files)
+
+        with trace_step("upload", mode="file", bytes=os.path.getsize(video_path)):
+            # not idempotent : a 5xx may follow an accepted upload, and a retry would index the video twice
+            response = call_with_retries(VIDEO_INDEXER, _post, idempotent=False)
         
         if response.status_code != 200:
             raise Exception(f"Azure Upload Failed: {response.text}")
             
-        return response.json().get("id")
+        azure_video_id = response.json().get("id")
+        emit_event("upload", status="finished", azure_video_id=azure_video_id)
+        return azure_video_id
+
+    def upload_video_by_url(self, media_url, video_name):
+        """Asks Azure Video Indexer to fetch the video itself from `media_url` (no bytes pass through us)."""
+        api_url = self._upload_url()
+        params = {**self._upload_params(video_name), "videoUrl": media_url}
+
+        logger.info(f"Submitting {video_name} to Azure by URL...")
+        emit_event("upload", status="started", mode="url")
+        with trace_step("upload", mode="url"):
+            response = call_with_retries(VIDEO_INDEXER, lambda: requests.post(api_url, params=params), idempotent=False)
+
+        if response.status_code != 200:
+            raise Exception(f"Azure Upload By URL Failed: {response.text}")
+
+        azure_video_id = response.json().get("id")
+        emit_event("upload", status="finished", azure_video_id=azure_video_id, bytes=0)
+        return azure_video_id
+
+    def upload_video_stream(self, chunks, video_name):
+        """Uploads an iterator of byte chunks to Azure Video Indexer as a chunked multipart body."""
+        api_url = self._upload_url()
+        params = self._upload_params(video_name)
+        boundary = uuid.uuid4().hex
+        sent = {"bytes": 0}
+
+        def _counted(chunks):
+            for chunk in chunks:
+                sent["bytes"] += len(chunk)
+                yield chunk
+
+        def _multipart_body():
+            yield (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{video_name}.mp4"\r\n'
+                f"Content-Type: video/mp4\r\n\r\n"
+            ).encode()
+            yield from _counted(chunks)
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+        logger.info(f"Streaming upload of {video_name} to Azure...")
+        emit_event("upload", status="started", mode="stream")
+        with trace_step("upload", mode="stream") as span:
+            # rate limited, but a consumed stream cannot be replayed : no retries
+            response = call_with_retries(VIDEO_INDEXER, lambda: requests.post(
+                api_url,
+                params=params,
+                data=_multipart_body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+            ), max_retries=0)
+            span.set_attribute("bytes", sent["bytes"])
+
+        if response.status_code != 200:
+            raise Exception(f"Azure Upload Failed: {response.text}")
+
+        azure_video_id = response.json().get("id")
+        emit_event("upload", status="finished", azure_video_id=azure_video_id, bytes=sent["bytes"])
+        return azure_video_id
+
+    def _index_params(self, vi_token):
+        params = {"accessToken": vi_token, "includeStreamingUrls": "false"}
+        # server-side filter : only the insight types we read (VIDEO_INDEXER_INCLUDED_INSIGHTS, empty = all)
+        if self.included_insights:
+            params["includedInsights"] = self.included_insights
+        return params
 
     def wait_for_processing(self, video_id):
-        """Polls status until complete."""
+        """
+        Polls status every VIDEO_INDEXER_POLL_INTERVAL seconds (default 30) until complete.
+        Each /Index response is parsed as it streams in, keeping only INDEX_PATHS,
+        so a long video's full index is never held in memory.
+        """
         logger.info(f"Waiting for video {video_id} to process...")
+        last_state = None
+        auth_refreshes = 0
         while True:
-            arm_token = self.get_access_token()
-            vi_token = self.get_account_token(arm_token)
+            vi_token = self.get_account_token()
             
-            url = f"https://api.videoindexer.ai/{self.location}/Accounts/{self.account_id}/Videos/{video_id}/Index"
-            params = {"accessToken": vi_token}
-            response = requests.get(url, params=params)
-            data = response.json()
+            url = f"{self.api_url}/{self.location}/Accounts/{self.account_id}/Videos/{video_id}/Index"
+            params = self._index_params(vi_token)
+            with trace_step("poll", video_id=video_id) as span:
+                response = call_with_retries(VIDEO_INDEXER, lambda: requests.get(url, params=params, stream=True))
+                with response:
+                    span.set_attribute("http_status", response.status_code)
+                    if response.status_code == 200:
+                        data, received = select_json(response.iter_content(INDEX_CHUNK_SIZE), INDEX_PATHS)
+                        data = data or {}
+                    else:
+                        received = len(response.content)
+                        data = {}
+                span.set_attribute("bytes", received)
+                span.set_attribute("state", str(data.get("state")))
+            if response.status_code == 401:
+                # token revoked or expired early: drop it and retry with a fresh one, a bounded number of times
+                auth_refreshes += 1
+                if auth_refreshes > AUTH_REFRESH_LIMIT:
+                    raise Exception(
+                        f"Video Indexer rejected {auth_refreshes} fresh account tokens (401): {response.text[:500]}"
+                    )
+                token_cache.invalidate(self._account_token_key())
+                time.sleep(min(2 ** auth_refreshes, self.poll_interval))
+                continue
+            auth_refreshes = 0
+            if response.status_code == 400 and "includedInsights" in params:
+                # an API version without insight filtering : ask for the full index from now on
+                logger.warning(f"Video Indexer rejected includedInsights ({response.text[:200]}); requesting all insights")
+                self.included_insights = ""
+                continue
+            if response.status_code != 200:
+                raise Exception(f"Video Indexer Index request failed ({response.status_code}): {response.text[:500]}")
             
             state = data.get("state")
+            if state != last_state:
+                # only state changes reach streaming clients, not every poll
+                videos = data.get("videos") or [{}]
+                emit_event("indexing", state=state, azure_video_id=video_id,
+                           progress=videos[0].get("processingProgress"))
+                last_state = state
             if state == "Processed":
                 return data
             elif state == "Failed":
@@ -112,26 +461,123 @@ class VideoIndexerService:
             elif state == "Quarantined":
                 raise Exception("Video Quarantined (Copyright/Content Policy Violation).")
             
-            logger.info(f"Status: {state}... waiting 30s")
-            time.sleep(30)
+            logger.info(f"Status: {state}... waiting {self.poll_interval:g}s")
+            time.sleep(self.poll_interval)
 
     def extract_data(self, vi_json):
-        """Parses the JSON into our State format."""
+        """
+        Parses the JSON into our State format in a single pass over the videos.
+        Repeated OCR captions (one per frame window in Video Indexer output) are
+        merged into one line that keeps every time instance; see dedup_ocr.
+        """
         transcript_lines = []
+        transcript_segments = []
+        raw_ocr = []
         for v in vi_json.get("videos", []):
-            for insight in v.get("insights", {}).get("transcript", []):
+            insights = v.get("insights", {})
+            for insight in insights.get("transcript", []):
                 transcript_lines.append(insight.get("text"))
-        
-        ocr_lines = []
-        for v in vi_json.get("videos", []):
-            for insight in v.get("insights", {}).get("ocr", []):
-                ocr_lines.append(insight.get("text"))
-                
+                transcript_segments.extend(_timed_segments(insight))
+            raw_ocr.extend(insights.get("ocr", []))
+
+        ocr_lines, ocr_segments, stats = dedup_ocr(raw_ocr)
+        if stats["raw_lines"]:
+            logger.info(
+                f"OCR dedup : {stats['raw_lines']} -> {stats['unique_lines']} lines, "
+                f"{stats['raw_chars']} -> {stats['unique_chars']} chars "
+                f"({1 - stats['unique_chars'] / max(stats['raw_chars'], 1):.0%} smaller)"
+            )
+            emit_event("ocr_dedup", **stats)
+
         return {
             "transcript": " ".join(transcript_lines),
             "ocr_text": ocr_lines,
+            "transcript_segments": transcript_segments,
+            "ocr_segments": ocr_segments,
             "video_metadata": {
                 "duration": vi_json.get("summarizedInsights", {}).get("duration", {}).get("seconds"),
                 "platform": "youtube"
             }
-        }
\ No newline at end of file
+        }
+
+
+_DIGITS = re.compile(r"\d+")
+
+
+def normalise_ocr_text(text):
+    """Lower-cased, punctuation-trimmed, whitespace-collapsed form used to compare OCR lines."""
+    return " ".join(re.sub(r"[^\w#%$@&+]+", " ", str(text or "").lower()).split())
+
+
+def dedup_ocr(insights, threshold=None):
+    """
+    Merges OCR insights whose normalised text is identical, or at least
+    `threshold` similar (OCR_DEDUP_THRESHOLD, default 0.9; 1.0 = exact only).
+    Fuzzy merges only happen between lines with exactly the same numbers, so
+    "save 20% today" and "save 30% today" always stay separate claims.
+    The longest variant is kept as the line's text, since misreads usually drop characters.
+    Returns (lines, segments sorted by start time, size stats).
+    """
+    threshold = threshold if threshold is not None else float(os.getenv("OCR_DEDUP_THRESHOLD", "0.9"))
+    groups = []  # {"text", "norm", "instances"}
+    by_norm = {}
+    by_digits = {}  # digit tokens -> groups, the only fuzzy-match candidates
+    raw_chars = 0
+    for insight in insights:
+        text = insight.get("text")
+        if not text:
+            continue
+        raw_chars += len(text)
+        norm = normalise_ocr_text(text)
+        group = by_norm.get(norm)
+        if group is None and threshold < 1.0:
+            digits = tuple(_DIGITS.findall(norm))
+            for candidate in by_digits.get(digits, ()):
+                # cheap upper bounds first; ratio() only for plausible matches
+                matcher = SequenceMatcher(None, norm, candidate["norm"])
+                if (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+                        and matcher.ratio() >= threshold):
+                    group = candidate
+                    break
+        if group is None:
+            group = {"text": text, "norm": norm, "instances": []}
+            groups.append(group)
+            if threshold < 1.0:
+                by_digits.setdefault(tuple(_DIGITS.findall(norm)), []).append(group)
+        elif len(text) > len(group["text"]):
+            group["text"] = text
+        by_norm[norm] = group
+        group["instances"].extend(insight.get("instances") or [{}])
+
+    lines = [g["text"] for g in groups]
+    segments = sorted(
+        (seg for g in groups for seg in _timed_segments({"text": g["text"], "instances": g["instances"]})),
+        key=lambda seg: seg["start"]
+    )
+    stats = {
+        "raw_lines": sum(1 for i in insights if i.get("text")),
+        "unique_lines": len(lines),
+        "raw_chars": raw_chars,
+        "unique_chars": sum(len(line) for line in lines),
+    }
+    return lines, segments, stats
+
+
+def parse_vi_time(value):
+    """Converts a Video Indexer time string ("0:01:02.5") to seconds."""
+    if not value:
+        return 0.0
+    seconds = 0.0
+    for part in str(value).split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _timed_segments(insight):
+    """One {"text", "start", "end"} entry (in seconds) per instance of a transcript/OCR insight."""
+    text = insight.get("text")
+    instances = insight.get("instances") or [{}]
+    return [
+        {"text": text, "start": parse_vi_time(i.get("start")), "end": parse_vi_time(i.get("end"))}
+        for i in instances
+    ]
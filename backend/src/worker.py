@@ -0,0 +1,157 @@
+'''
+Audit worker : drains the shared audit queue (AUDIT_QUEUE_BACKEND=sqlite|redis)
+so the API tier only accepts requests and workers scale on their own.
+
+Each worker runs up to --concurrency audits at a time and renews the lease of
+every running job every AUDIT_QUEUE_HEARTBEAT_SECONDS. A job retried after a
+lost worker resumes from its durable checkpoint when AUDIT_CHECKPOINT_URL is
+set, so the download and Video Indexer upload are not repeated.
+
+To run:
+uv run python -m backend.src.worker --concurrency 4
+'''
+
+import os
+import time
+import signal
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+load_dotenv(override=True)
+
+from backend.src.api.telemetry import setup_telemetry
+setup_telemetry()
+
+from backend.src.graph.workflow import app as compliance_graph
+from backend.src.graph.checkpoint import session_config, resume_audit
+from backend.src.api.job_queue import get_job_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("audit-worker")
+
+# final-state keys kept as the job result (the rest is large and only useful to the graph)
+RESULT_KEYS = ("video_id", "final_status", "final_report", "compliance_results", "errors")
+
+
+def execute_audit(payload: Dict[str, Any]) -> Dict[str, Any]:
+    '''Runs (or resumes) one queued audit and returns its trimmed final state.'''
+    session_id = payload["session_id"]
+    config = session_config(session_id)
+    has_checkpoint = (
+        compliance_graph.checkpointer is not None
+        and bool(compliance_graph.get_state(config).values)
+    )
+    if has_checkpoint:
+        # an explicit resume request, or a retry after a lost worker
+        logger.info(f"Resuming session {session_id} from its checkpoint")
+        final_state = resume_audit(compliance_graph, session_id)
+    else:
+        final_state = compliance_graph.invoke({
+            "video_url": payload["video_url"],
+            "video_id": payload["video_id"],
+            "compliance_results": [],
+            "errors": []
+        }, config)
+    return {key: final_state.get(key) for key in RESULT_KEYS if key in final_state}
+
+
+class _Heartbeat:
+    '''Renews the leases of the jobs this worker is running.'''
+
+    def __init__(self, job_queue, interval: float):
+        self.job_queue = job_queue
+        self.interval = interval
+        self._leases: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="audit-heartbeat", daemon=True)
+        self._thread.start()
+
+    def add(self, job_id: str, lease: str):
+        with self._lock:
+            self._leases[job_id] = lease
+
+    def remove(self, job_id: str):
+        with self._lock:
+            self._leases.pop(job_id, None)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                leases = list(self._leases.items())
+            for job_id, lease in leases:
+                try:
+                    if not self.job_queue.heartbeat(job_id, lease):
+                        logger.warning(f"Lost the lease on job {job_id}; its result will be discarded")
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {job_id} failed : {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def _process(job_queue, heartbeat: _Heartbeat, job: Dict[str, Any], slots: threading.Semaphore):
+    job_id, lease = job["job_id"], job["lease"]
+    heartbeat.add(job_id, lease)
+    started = time.perf_counter()
+    try:
+        logger.info(f"Running audit job {job_id} (attempt {job['attempts']})")
+        result = execute_audit(job["payload"])
+        if job_queue.complete(job_id, lease, result):
+            logger.info(f"Audit job {job_id} completed in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"Audit job {job_id} failed : {e}")
+        job_queue.fail(job_id, lease, str(e))
+    finally:
+        heartbeat.remove(job_id)
+        slots.release()
+
+
+def run_worker(concurrency: int, poll_interval: float = 1.0):
+    job_queue = get_job_queue()
+    if job_queue is None:
+        raise SystemExit("AUDIT_QUEUE_BACKEND is inprocess; set it to sqlite or redis to run workers")
+
+    stopping = threading.Event()
+
+    def _graceful(signum, _frame):
+        # stop taking jobs; running ones finish (or their leases expire and another worker retries them)
+        logger.info(f"Signal {signum} received, draining {concurrency} slot(s)")
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _graceful)
+    signal.signal(signal.SIGINT, _graceful)
+
+    heartbeat = _Heartbeat(job_queue, float(os.getenv("AUDIT_QUEUE_HEARTBEAT_SECONDS", "30")))
+    slots = threading.Semaphore(concurrency)
+    logger.info(f"Audit worker started (concurrency {concurrency})")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="audit-worker") as executor:
+        while not stopping.is_set():
+            if not slots.acquire(timeout=poll_interval):
+                continue
+            try:
+                job = job_queue.reserve()
+            except Exception as e:
+                logger.error(f"Could not reserve a job : {e}")
+                job = None
+            if job is None:
+                slots.release()
+                stopping.wait(poll_interval)
+                continue
+            executor.submit(_process, job_queue, heartbeat, job, slots)
+    heartbeat.stop()
+    logger.info("Audit worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brand Guardian audit worker")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("AUDIT_WORKER_CONCURRENCY", "4")),
+                        help="audits run at the same time by this worker")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+    run_worker(args.concurrency, args.poll_interval)
@@ -9,9 +9,15 @@ compliance audit workflow. Think of it as the master switch that:
 """
 
 # Standard library imports for basic Python functionality
+import os        # File checks for resuming batch runs
+import sys       # stdin/stdout/stderr streams for batch mode
+import time      # Measures latency and throughput
 import uuid      # Generates unique IDs (like session tracking numbers)
 import json      # Handles JSON data formatting (converts Python dicts to readable text)
+import argparse  # Command line options (single run vs batch mode)
 import logging   # Records what happens during execution (like a flight recorder)
+import threading # Bounds concurrency and serialises output writes in batch mode
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint  # Pretty-prints data structures (unused here, but available)
 
 
@@ -20,8 +26,14 @@ from pprint import pprint  # Pretty-prints data structures (unused here, but ava
 from dotenv import load_dotenv
 load_dotenv(override=True)  # override=True means .env values take priority over system variables
 
+# Spans + latency histograms for every node and external call (Azure Monitor or local exporter)
+from backend.src.api.telemetry import setup_telemetry
+setup_telemetry()
+
 # Import the main workflow graph (the "brain" of your compliance system)
 from backend.src.graph.workflow import app
+# Per-session run config and resume (durable checkpoints, when AUDIT_CHECKPOINT_URL is set)
+from backend.src.graph.checkpoint import session_config, resume_audit
 
 # Configure logging - sets up the "flight recorder" for your application
 logging.basicConfig(
@@ -33,7 +45,7 @@ logging.basicConfig(
 logger = logging.getLogger("brand-guardian-runner")  # Creates a named logger for this module
 
 
-def run_cli_simulation():
+def run_cli_simulation(video_url="https://youtu.be/dT7S75eYhcQ", resume_session=None):
     """
     Simulates a Video Compliance Audit request.
     
@@ -42,15 +54,18 @@ def run_cli_simulation():
     - Prepares the video URL and metadata
     - Runs it through the AI workflow
     - Displays the compliance results
+
+    With `resume_session`, a checkpointed session is continued from its last
+    good node instead (see backend/src/graph/checkpoint.py).
     """
     
-    session_id = str(uuid.uuid4())  # uuid4() generates random UUID
-    logger.info(f"Starting Audit Session: {session_id}")
+    session_id = resume_session or str(uuid.uuid4())  # uuid4() generates random UUID
+    logger.info(f"{'Resuming' if resume_session else 'Starting'} Audit Session: {session_id}")
 
     # This dictionary contains all the input data for the workflow
     initial_inputs = {
         # The YouTube video to audit
-        "video_url": "https://youtu.be/dT7S75eYhcQ",
+        "video_url": video_url,
         
         # Shortened video ID for easier tracking (first 8 chars of session ID)
         "video_id": f"vid_{session_id[:8]}",
@@ -65,15 +80,19 @@ def run_cli_simulation():
     }
 
     # ========== DISPLAY SECTION: INPUT SUMMARY ==========
-    print("\n--- 1.nput Payload: INITIALIZING WORKFLOW ---")
-    # json.dumps() converts Python dict to formatted JSON string
-    print(f"I {json.dumps(initial_inputs, indent=2)}")
+    if not resume_session:
+        print("\n--- 1.nput Payload: INITIALIZING WORKFLOW ---")
+        # json.dumps() converts Python dict to formatted JSON string
+        print(f"I {json.dumps(initial_inputs, indent=2)}")
 
     try:
         # app.invoke() triggers the LangGraph workflow
-        # It passes through: START → Indexer → Auditor → END
+        # It passes through: START → Indexer → Pre-screen → Auditors → END
         # Returns the final state with all results
-        final_state = app.invoke(initial_inputs)
+        if resume_session:
+            final_state = resume_audit(app, session_id)
+        else:
+            final_state = app.invoke(initial_inputs, session_config(session_id))
         
         print("\n--- 2. WORKFLOW EXECUTION COMPLETE ---")
         
@@ -81,6 +100,7 @@ def run_cli_simulation():
         print("\n=== COMPLIANCE AUDIT REPORT ===")
         
         # .get() safely retrieves values (returns None if key doesn't exist)
+        print(f"Session ID:  {session_id}")
         print(f"Video ID:    {final_state.get('video_id')}")
         
         # Shows PASS or FAIL status
@@ -111,5 +131,145 @@ def run_cli_simulation():
         raise e
 
 
+# ================= BATCH MODE =================
+def read_batch_inputs(source):
+    """
+    Yields {"video_url": ..., "id": ...} for every line of a file (or stdin when source is "-").
+    A line is either a bare URL or a JSON object with "video_url" (or "url") and an optional "id".
+    """
+    stream = sys.stdin if source == "-" else open(source)
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                url = record.get("video_url") or record.get("url")
+                if not url:
+                    logger.warning(f"Skipping line without video_url: {line[:80]}")
+                    continue
+                yield {"video_url": url, "id": record.get("id") or record.get("request_id")}
+            else:
+                yield {"video_url": line, "id": None}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def completed_urls(output_path):
+    """URLs that already have a clean result line (no error, no node errors) in a previous output file (for --resume)."""
+    done = set()
+    if not output_path or not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line from an interrupted run
+            # a record with node errors (e.g. a failed indexer) is retried, not skipped
+            if record.get("error") is None and not record.get("errors"):
+                done.add(record.get("video_url"))
+    return done
+
+
+def audit_one(item):
+    """Runs the graph for a single video and returns one JSONL-ready result record."""
+    session_id = str(uuid.uuid4())
+    video_id = item["id"] or f"vid_{session_id[:8]}"
+    started = time.perf_counter()
+    record = {"video_url": item["video_url"], "video_id": video_id, "session_id": session_id}
+    try:
+        final_state = app.invoke({
+            "video_url": item["video_url"],
+            "video_id": video_id,
+            "compliance_results": [],
+            "errors": []
+        }, session_config(session_id))
+        errors = final_state.get("errors") or []
+        record.update({
+            "status": final_state.get("final_status"),
+            "compliance_results": final_state.get("compliance_results", []),
+            "final_report": final_state.get("final_report"),
+            "errors": errors,
+            # nodes report failures in state instead of raising; count them as failed audits
+            "error": "; ".join(str(error) for error in errors) or None
+        })
+    except Exception as e:
+        logger.error(f"Audit failed for {item['video_url']}: {e}")
+        record.update({"status": "ERROR", "error": str(e)})
+    record["latency_seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(source, output_path=None, concurrency=4, resume=False):
+    """
+    Audits every URL from `source` with at most `concurrency` graph runs in flight.
+    One JSONL line is written per video as soon as it finishes; a throughput and
+    latency summary goes to stderr at the end.
+    """
+    skip = completed_urls(output_path) if resume else set()
+    if skip:
+        logger.info(f"Resuming: {len(skip)} videos already audited in {output_path}")
+
+    out = open(output_path, "a" if resume else "w") if output_path else sys.stdout
+    write_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency)  # keeps memory flat for very large inputs
+    latencies, failures, skipped = [], 0, 0
+    started = time.perf_counter()
+
+    def _done(future):
+        nonlocal failures
+        try:
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                latencies.append(record["latency_seconds"])
+                if record["error"] is not None:
+                    failures += 1
+        finally:
+            # a failed write must not leak the slot, or the batch hangs once every slot is gone
+            slots.release()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="audit") as executor:
+            for item in read_batch_inputs(source):
+                if item["video_url"] in skip:
+                    skipped += 1
+                    continue
+                slots.acquire()
+                executor.submit(audit_one, item).add_done_callback(_done)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    # ========== SUMMARY ==========
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    def _pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] if ordered else 0.0
+    print(
+        f"\n[ BATCH SUMMARY ] videos={len(ordered)} failed={failures} skipped={skipped} "
+        f"wall={elapsed:.1f}s throughput={len(ordered) / elapsed * 60 if elapsed else 0:.2f}/min "
+        f"latency p50={_pct(50):.1f}s p95={_pct(95):.1f}s max={_pct(100):.1f}s",
+        file=sys.stderr
+    )
+
+
 if __name__ == "__main__":
-    run_cli_simulation()  # Start the compliance audit simulation
+    parser = argparse.ArgumentParser(description="Brand Guardian AI - compliance audit runner")
+    parser.add_argument("--url", default="https://youtu.be/dT7S75eYhcQ", help="video to audit in single mode")
+    parser.add_argument("--batch", metavar="FILE", help="file of URLs or JSONL records ('-' for stdin)")
+    parser.add_argument("--output", metavar="FILE", help="JSONL results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=4, help="graph runs in flight in batch mode")
+    parser.add_argument("--resume", action="store_true", help="skip URLs already audited in --output")
+    parser.add_argument("--resume-session", metavar="SESSION_ID",
+                        help="continue a checkpointed session from its last good node (needs AUDIT_CHECKPOINT_URL)")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, output_path=args.output, concurrency=args.concurrency, resume=args.resume)
+    else:
+        run_cli_simulation(args.url, resume_session=args.resume_session)  # Start the compliance audit simulation
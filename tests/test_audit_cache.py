@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from backend.src.services.audit_cache import (
+    AuditCache, MemoryCacheBackend, canonical_video_key, file_content_key
+)
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dT7S75eYhcQ",
+    "https://youtube.com/watch?v=dT7S75eYhcQ&t=42s",
+    "https://youtu.be/dT7S75eYhcQ",
+    "https://youtu.be/dT7S75eYhcQ?si=share",
+    "https://www.youtube.com/shorts/dT7S75eYhcQ",
+    "https://www.youtube.com/embed/dT7S75eYhcQ",
+    " https://m.youtube.com/live/dT7S75eYhcQ ",
+])
+def test_canonical_video_key_accepts_every_url_shape(url):
+    assert canonical_video_key(url) == "yt:dT7S75eYhcQ"
+
+
+@pytest.mark.parametrize("url", [
+    "https://vimeo.com/12345",
+    "https://www.youtube.com/watch?v=short",
+    "https://www.youtube.com/channel/UC123",
+    "not a url",
+])
+def test_canonical_video_key_rejects_other_urls(url):
+    assert canonical_video_key(url) is None
+
+
+def test_file_content_key_hashes_bytes(tmp_path):
+    first, second = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    assert file_content_key(str(first)) == file_content_key(str(second))
+    assert file_content_key(str(first)).startswith("sha256:")
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.get("a")
+    backend.set("c", {"v": 3})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+    assert backend.get("c") == {"v": 3}
+
+
+def test_memory_backend_expires_entries(monkeypatch):
+    backend = MemoryCacheBackend()
+    backend.set("a", {"v": 1}, ttl=10)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert backend.get("a") is None
+
+
+def test_audit_results_are_keyed_by_rules_version():
+    cache = AuditCache(MemoryCacheBackend(), cache_results=True)
+    cache.set_audit("yt:dT7S75eYhcQ", "v1", {"final_status": "PASS"})
+    assert cache.get_audit("yt:dT7S75eYhcQ", "v1") == {"final_status": "PASS"}
+    # a rebuilt knowledge base never serves the old verdict
+    assert cache.get_audit("yt:dT7S75eYhcQ", "v2") is None
+
+
+def test_audit_results_need_a_rules_version_and_the_flag():
+    unversioned = AuditCache(MemoryCacheBackend(), cache_results=True)
+    unversioned.set_audit("yt:dT7S75eYhcQ", None, {"final_status": "PASS"})
+    assert unversioned.get_audit("yt:dT7S75eYhcQ", None) is None
+
+    disabled = AuditCache(MemoryCacheBackend(), cache_results=False)
+    disabled.set_audit("yt:dT7S75eYhcQ", "v1", {"final_status": "PASS"})
+    assert disabled.get_audit("yt:dT7S75eYhcQ", "v1") is None
+
+
+def test_index_entries_survive_audit_namespace():
+    cache = AuditCache(MemoryCacheBackend())
+    cache.set_index("yt:dT7S75eYhcQ", "azure-1", {"transcript": "hello"})
+    assert cache.get_index("yt:dT7S75eYhcQ") == {"azure_video_id": "azure-1", "extracted": {"transcript": "hello"}}
+    assert cache.get_index(None) is None
+
+
+def test_broken_backend_never_fails_an_audit():
+    class Broken:
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ttl=None):
+            raise ConnectionError("down")
+
+    cache = AuditCache(Broken(), cache_results=True)
+    cache.set_index("yt:dT7S75eYhcQ", "azure-1", {})
+    assert cache.get_index("yt:dT7S75eYhcQ") is None
@@ -0,0 +1,126 @@
+import types
+
+import pytest
+
+from backend.src.api import job_queue
+from backend.src.api.job_queue import SqliteJobQueue
+from backend.src.api.jobs import QUEUED, RUNNING, COMPLETED, FAILED, QueueFullError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue, "time", types.SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return SqliteJobQueue(str(tmp_path / "queue.sqlite"), max_depth=3, retry_after=7,
+                          visibility_timeout=60, max_attempts=2, result_ttl=3600)
+
+
+def _submit(queue, clock, job_id):
+    clock.now += 1
+    return queue.enqueue(job_id, {"video_id": f"vid-{job_id}", "video_url": "https://youtu.be/x"})
+
+
+def test_reserve_takes_oldest_and_leases_it(queue, clock):
+    assert _submit(queue, clock, "a")["status"] == QUEUED
+    _submit(queue, clock, "b")
+    job = queue.reserve()
+    assert job["job_id"] == "a" and job["attempts"] == 1 and job["lease"]
+    assert job["payload"]["video_id"] == "vid-a"
+    assert queue.get("a")["status"] == RUNNING
+    assert queue.reserve()["job_id"] == "b"
+    assert queue.reserve() is None
+    assert queue.depth() == 0
+
+
+def test_complete_stores_result(queue, clock):
+    _submit(queue, clock, "a")
+    job = queue.reserve()
+    assert queue.heartbeat("a", job["lease"])
+    assert queue.complete("a", job["lease"], {"status": "PASS"})
+    snapshot = queue.get("a")
+    assert snapshot["status"] == COMPLETED and snapshot["result"] == {"status": "PASS"}
+    assert not queue.heartbeat("a", job["lease"])
+
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    _submit(queue, clock, "a")
+    job = queue.reserve()
+    clock.now += 50
+    assert queue.heartbeat("a", job["lease"])
+    clock.now += 50
+    assert queue.reserve() is None
+    assert queue.get("a")["status"] == RUNNING
+
+
+def test_expired_lease_is_requeued_and_old_worker_is_fenced(queue, clock):
+    _submit(queue, clock, "a")
+    first = queue.reserve()
+    clock.now += 61
+    second = queue.reserve()
+    assert second["job_id"] == "a" and second["attempts"] == 2
+    assert second["lease"] != first["lease"]
+    assert not queue.heartbeat("a", first["lease"])
+    assert not queue.complete("a", first["lease"], {"status": "STALE"})
+    assert not queue.fail("a", first["lease"], "stale")
+    assert queue.complete("a", second["lease"], {"status": "PASS"})
+    assert queue.get("a")["result"] == {"status": "PASS"}
+
+
+def test_lost_worker_fails_job_after_max_attempts(queue, clock):
+    _submit(queue, clock, "a")
+    queue.reserve()
+    clock.now += 61
+    queue.reserve()
+    clock.now += 61
+    assert queue.reserve() is None
+    snapshot = queue.get("a")
+    assert snapshot["status"] == FAILED and snapshot["attempts"] == 2
+    assert "Worker lost" in snapshot["error"]
+
+
+def test_fail_retries_until_max_attempts(queue, clock):
+    _submit(queue, clock, "a")
+    job = queue.reserve()
+    assert queue.fail("a", job["lease"], "boom")
+    assert queue.get("a")["status"] == QUEUED
+    job = queue.reserve()
+    assert job["attempts"] == 2
+    assert queue.fail("a", job["lease"], "boom again")
+    snapshot = queue.get("a")
+    assert snapshot["status"] == FAILED and snapshot["error"] == "boom again"
+
+
+def test_admission_control(queue, clock):
+    for job_id in "abc":
+        _submit(queue, clock, job_id)
+    with pytest.raises(QueueFullError) as excinfo:
+        _submit(queue, clock, "d")
+    assert excinfo.value.depth == 3 and excinfo.value.retry_after == 7
+    assert queue.get("d") is None
+    queue.reserve()
+    assert _submit(queue, clock, "d")["status"] == QUEUED
+
+
+def test_finished_jobs_are_purged_after_ttl(queue, clock):
+    _submit(queue, clock, "a")
+    job = queue.reserve()
+    queue.complete("a", job["lease"], {})
+    clock.now += 3601
+    _submit(queue, clock, "b")
+    job = queue.reserve()
+    queue.complete("b", job["lease"], {})
+    assert queue.get("a") is None
+    assert queue.get("b")["status"] == COMPLETED
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from backend.src.services.json_stream import select_json
+
+DOCUMENT = {
+    "accountId": "acc",
+    "summarizedInsights": {"faces": [{"name": "skip {me} [please]"}], "duration": {"seconds": 31.5}},
+    "videos": [
+        {
+            "id": "v1",
+            "insights": {
+                "transcript": [{"text": "Héllo \"quoted\" wörld 🎉", "confidence": 0.91}],
+                "ocr": [{"text": "50% OFF }]", "confidence": 1}],
+                "faces": [{"thumbnails": [{"id": "t\\1"}] * 5}],
+            },
+            "state": "Processed",
+        },
+        {"id": "v2", "insights": {"transcript": [], "ocr": None}, "state": None},
+    ],
+    "trailing": [True, False, None, -1.25e3, " "],
+}
+
+PATHS = [("videos", "*", "insights", "transcript"), ("videos", "*", "insights", "ocr"), ("videos", "*", "id")]
+
+
+def _prune(value, paths):
+    # reference : what select_json should return, computed from the fully parsed document
+    selected = {}
+    for path in paths:
+        head, rest = path[0], path[1:]
+        if head == "*":
+            if not isinstance(value, list):
+                return None
+            return [_prune(item, [p[1:] for p in paths if p[0] == "*"]) if rest else item for item in value]
+        if isinstance(value, dict) and head in value:
+            children = [p[1:] for p in paths if p[0] == head]
+            selected[head] = value[head] if any(not c for c in children) else _prune(value[head], children)
+    return selected if isinstance(value, dict) else None
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 20])
+def test_matches_pruned_json_loads_for_any_chunking(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8")
+    document, bytes_read = select_json(_chunks(data, size), PATHS)
+    assert document == _prune(DOCUMENT, PATHS)
+    assert document["videos"][0]["insights"]["transcript"][0]["text"] == "Héllo \"quoted\" wörld 🎉"
+    assert document["videos"][1] == {"id": "v2", "insights": {"transcript": [], "ocr": None}}
+    assert bytes_read == len(data)
+
+
+def test_whole_subtree_and_top_level_scalars():
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    document, _ = select_json(_chunks(data, 5), [("summarizedInsights",), ("trailing",), ("accountId",)])
+    assert document == {key: DOCUMENT[key] for key in ("summarizedInsights", "trailing", "accountId")}
+
+
+def test_unexpected_shapes_are_skipped():
+    data = b'{"videos": {"id": 1}, "other": [1, {"videos": []}]}'
+    document, _ = select_json(_chunks(data, 3), [("videos", "*", "id"), ("other", "x")])
+    # an object where an array was expected has no "*" key to match, so nothing of it is kept
+    assert document == {"videos": {}, "other": None}
+
+
+def test_large_skipped_values_stream_through():
+    skipped = [{"text": "x" * 100, "nested": [[{"k": "]"}]]} for _ in range(2000)]
+    data = json.dumps({"faces": skipped, "keep": {"ok": True}, "tail": skipped}).encode("utf-8")
+    document, bytes_read = select_json(_chunks(data, 4096), [("keep",)])
+    assert document == {"keep": {"ok": True}}
+    assert bytes_read == len(data)
+
+
+@pytest.mark.parametrize("data", [b'{"videos": [', b'{"a": "unterminated', b'{"a": [1, 2}'])
+def test_truncated_documents_raise(data):
+    with pytest.raises(ValueError):
+        select_json(_chunks(data, 2), [("videos", "*", "id")])
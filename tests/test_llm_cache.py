@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from backend.src.services.audit_cache import MemoryCacheBackend
+from backend.src.services.llm_cache import LLMResponseCache, SqliteCacheBackend
+
+PROMPT = ("gpt-4o", "2024-02-01", 0.0, "system", "rules", "user")
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SqliteCacheBackend(str(tmp_path / "llm_cache.sqlite"), max_entries=3)
+
+
+def test_key_depends_on_every_input():
+    base = LLMResponseCache.key("v1", *PROMPT)
+    assert base == LLMResponseCache.key("v1", *PROMPT)
+    assert base.startswith("llm:v1:")
+    for i in range(len(PROMPT)):
+        changed = list(PROMPT)
+        changed[i] = changed[i] + 1 if isinstance(changed[i], float) else f"{changed[i]}!"
+        assert LLMResponseCache.key("v1", *changed) != base
+    assert LLMResponseCache.key("v2", *PROMPT) != base
+    assert LLMResponseCache.key(None, *PROMPT).startswith("llm:unversioned:")
+
+
+def test_round_trip(backend):
+    cache = LLMResponseCache(backend)
+    key = LLMResponseCache.key("v1", *PROMPT)
+    assert cache.get(key, "v1") is None
+    cache.set(key, {"content": "{}"})
+    assert cache.get(key, "v1") == {"content": "{}"}
+
+
+def test_new_rules_version_purges_older_entries(backend):
+    cache = LLMResponseCache(backend)
+    old = LLMResponseCache.key("v1", *PROMPT)
+    cache.get(old, "v1")
+    cache.set(old, {"content": "old"})
+
+    new = LLMResponseCache.key("v2", *PROMPT)
+    assert cache.get(new, "v2") is None
+    # the first lookup under v2 dropped every v1 entry
+    assert backend.get(old) is None
+
+
+def test_sqlite_backend_is_bounded_lru(backend):
+    for key in ("a", "b", "c"):
+        backend.set(key, {"v": key})
+        time.sleep(0.01)
+    backend.get("a")
+    backend.set("d", {"v": "d"})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": "a"}
+
+
+def test_sqlite_backend_expires_entries(backend):
+    backend.set("a", {"v": 1}, ttl=-1)
+    assert backend.get("a") is None
+
+
+def test_sqlite_backend_persists_across_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    SqliteCacheBackend(path).set("a", {"v": 1})
+    assert SqliteCacheBackend(path).get("a") == {"v": 1}
+
+
+def test_backends_without_purge_still_work():
+    cache = LLMResponseCache(MemoryCacheBackend())
+    key = LLMResponseCache.key("v1", *PROMPT)
+    cache.set(key, {"content": "x"})
+    assert cache.get(key, "v1") == {"content": "x"}
+    assert cache.get(key, "v2") == {"content": "x"}  # stale keys are never asked for, they age out
+
+
+def test_broken_backend_is_a_miss():
+    class Broken:
+        def get(self, key):
+            raise OSError("disk full")
+
+        def set(self, key, value, ttl=None):
+            raise OSError("disk full")
+
+    cache = LLMResponseCache(Broken())
+    cache.set("k", {"content": "x"})
+    assert cache.get("k", "v1") is None
@@ -0,0 +1,64 @@
+from backend.src.services.video_indexer import VideoIndexerService, dedup_ocr, normalise_ocr_text
+
+
+def _ocr(text, start="0:00:01", end="0:00:02"):
+    return {"text": text, "instances": [{"start": start, "end": end}]}
+
+
+def test_normalisation():
+    assert normalise_ocr_text("  SAVE 20%  Today!! ") == "save 20% today"
+    assert normalise_ocr_text("#Ad - Sponsored") == "#ad sponsored"
+
+
+def test_exact_duplicates_merge_and_keep_every_instance():
+    lines, segments, stats = dedup_ocr([
+        _ocr("Buy now!", "0:00:01", "0:00:02"), _ocr("BUY NOW", "0:00:05", "0:00:06"),
+    ])
+    assert lines == ["Buy now!"]
+    assert [s["start"] for s in segments] == [1.0, 5.0]
+    assert stats["raw_lines"] == 2 and stats["unique_lines"] == 1
+
+
+def test_fuzzy_merge_is_the_default_and_keeps_the_longest_variant():
+    lines, _, _ = dedup_ocr([_ocr("Limted offer"), _ocr("Limited offer")])
+    assert lines == ["Limited offer"]
+
+
+def test_lines_with_different_numbers_never_merge():
+    lines, _, _ = dedup_ocr([_ocr("save 20% today"), _ocr("save 30% today")], threshold=0.5)
+    assert lines == ["save 20% today", "save 30% today"]
+
+
+def test_threshold_one_is_exact_only():
+    lines, _, _ = dedup_ocr([_ocr("Limted offer"), _ocr("Limited offer")], threshold=1.0)
+    assert lines == ["Limted offer", "Limited offer"]
+
+
+def test_threshold_from_environment(monkeypatch):
+    monkeypatch.setenv("OCR_DEDUP_THRESHOLD", "1.0")
+    lines, _, _ = dedup_ocr([_ocr("Limted offer"), _ocr("Limited offer")])
+    assert len(lines) == 2
+
+
+def test_empty_lines_are_ignored():
+    lines, segments, stats = dedup_ocr([{"text": ""}, {"text": None}, _ocr("ok")])
+    assert lines == ["ok"] and len(segments) == 1 and stats["raw_lines"] == 1
+
+
+def test_segments_sorted_by_start():
+    _, segments, _ = dedup_ocr([_ocr("b", "0:00:09", "0:00:10"), _ocr("a", "0:00:01", "0:00:02")])
+    assert [s["text"] for s in segments] == ["a", "b"]
+
+
+def test_extract_data_uses_dedup():
+    extracted = VideoIndexerService().extract_data({
+        "videos": [{"insights": {
+            "transcript": [{"text": "hello", "instances": [{"start": "0:00:00", "end": "0:00:01.5"}]}],
+            "ocr": [_ocr("#ad"), _ocr("#AD", "0:00:03", "0:00:04")],
+        }}],
+        "summarizedInsights": {"duration": {"seconds": 30}},
+    })
+    assert extracted["ocr_text"] == ["#ad"]
+    assert len(extracted["ocr_segments"]) == 2
+    assert extracted["transcript_segments"] == [{"text": "hello", "start": 0.0, "end": 1.5}]
+    assert extracted["video_metadata"]["duration"] == 30
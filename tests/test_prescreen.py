@@ -0,0 +1,106 @@
+import os
+import json
+
+import pytest
+
+from backend.src.services import prescreen
+from backend.src.services.prescreen import PrescreenEngine
+
+RULES = [
+    {"id": "guarantee", "type": "banned", "source": "any", "confidence": "clear",
+     "category": "Claim Violation", "severity": "HIGH", "description": "Absolute guarantee.",
+     "patterns": ["guaranteed results", "100% guaranteed"]},
+    {"id": "risk-free", "type": "banned", "source": "transcript", "confidence": "borderline",
+     "category": "Claim Violation", "severity": "MEDIUM", "description": "Risk-free claim.",
+     "patterns": ["risk free"]},
+    {"id": "disclosure", "type": "required", "source": "ocr", "confidence": "clear",
+     "category": "Disclosure", "severity": "HIGH", "description": "Missing #ad disclosure.",
+     "patterns": ["#ad", "sponsored"]},
+    {"id": "percent-off", "type": "banned", "source": "any", "regex": True, "confidence": "borderline",
+     "category": "Pricing", "severity": "LOW", "description": "Discount claim.",
+     "patterns": [r"\b\d{2}% off\b"]},
+]
+
+
+def _engine():
+    return PrescreenEngine(RULES, "test")
+
+
+def _ids(results):
+    return sorted(r["description"].split("pre-screen rule ")[1].split(" ")[0] for r in results)
+
+
+def test_clear_and_borderline_findings_are_split():
+    findings, borderline = _engine().scan({
+        "transcript": "GUARANTEED RESULTS and it is risk free", "ocr_text": ["#ad", "now 50% off"]
+    })
+    assert _ids(findings) == ["guarantee"]
+    assert _ids(borderline) == ["percent-off", "risk-free"]
+
+
+def test_literal_patterns_match_whole_words_only():
+    findings, borderline = _engine().scan({"transcript": "guaranteed resultsmith, riskfree", "ocr_text": ["#ad"]})
+    assert findings == [] and borderline == []
+
+
+def test_source_restriction():
+    # risk-free only applies to the transcript
+    _, borderline = _engine().scan({"transcript": "hello", "ocr_text": ["risk free", "sponsored"]})
+    assert borderline == []
+
+
+def test_required_rule_fires_when_nothing_matches():
+    findings, _ = _engine().scan({"transcript": "hello", "ocr_text": ["buy now"]})
+    assert _ids(findings) == ["disclosure"]
+    assert findings[0]["timestamp"] is None
+
+
+def test_timestamps_come_from_the_matching_segment():
+    findings, _ = _engine().scan({
+        "transcript": "intro. 100% guaranteed!",
+        "transcript_segments": [{"text": "intro.", "start": 1.0}, {"text": "100% guaranteed!", "start": 65.4}],
+        "ocr_text": ["sponsored"],
+    })
+    assert findings[0]["timestamp"] == "1:05"
+    assert "matched '100% guaranteed'" in findings[0]["description"]
+
+
+def test_version_changes_with_file_content(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"version": "3", "rules": RULES}))
+    monkeypatch.setenv("PRESCREEN_RULES_PATH", str(path))
+    monkeypatch.setattr(prescreen, "_engine", None)
+    first = prescreen.get_prescreen_engine()
+    assert first.version.startswith("3-")
+    assert prescreen.get_prescreen_engine() is first
+
+    path.write_text(json.dumps({"version": "3", "rules": RULES[:1]}))
+    later = os.path.getmtime(path) + 5  # the engine is recompiled on an mtime change
+    os.utime(path, (later, later))
+    second = prescreen.get_prescreen_engine()
+    # same declared version, different content : a new version string
+    assert second.version != first.version
+    assert list(second.rules) == ["guarantee"]
+
+
+def test_missing_rules_file_disables_the_prescreen(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRESCREEN_RULES_PATH", str(tmp_path / "missing.json"))
+    assert prescreen.get_prescreen_engine() is None
+
+
+@pytest.mark.parametrize("policy, state, decided", [
+    ("annotate", {"transcript": "100% guaranteed", "ocr_text": ["#ad"]}, None),
+    ("short_circuit", {"transcript": "100% guaranteed", "ocr_text": ["#ad"]}, "FAIL"),
+    ("short_circuit", {"transcript": "hello", "ocr_text": ["#ad"]}, None),
+    ("escalate", {"transcript": "hello", "ocr_text": ["#ad"]}, "PASS"),
+    ("escalate", {"transcript": "risk free", "ocr_text": ["#ad"]}, None),
+])
+def test_policies(monkeypatch, policy, state, decided):
+    from backend.src.graph import nodes
+
+    monkeypatch.setenv("PRESCREEN_POLICY", policy)
+    monkeypatch.setenv("AUDIT_CACHE_BACKEND", "none")
+    monkeypatch.setattr(nodes, "get_prescreen_engine", _engine)
+    update = nodes.prescreen_node(state)
+    assert update.get("final_status") == decided
+    assert update.get("prescreen_decided", False) == (decided is not None)
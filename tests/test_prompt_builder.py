@@ -0,0 +1,90 @@
+import sys
+import logging
+
+import pytest
+
+from backend.src.services import prompt_builder
+from backend.src.services.prompt_builder import build_audit_prompt, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # deterministic counts (4 characters per token) whether or not tiktoken can load its files here
+    monkeypatch.setattr(prompt_builder, "_encodings", {})
+    monkeypatch.setattr(prompt_builder, "_tokenizer_failed", True)
+
+
+RULES = [f"RULE-{i} " + "rule text " * 40 for i in range(4)]
+OCR = [f"caption {i} " + "words " * 10 for i in range(20)]
+TRANSCRIPT = " ".join(f"Sentence number {i} about the product." for i in range(200))
+
+
+def _build(budget, **overrides):
+    kwargs = dict(rules=RULES, transcript=TRANSCRIPT, ocr_text=OCR, video_metadata={"duration": 30})
+    kwargs.update(overrides)
+    return build_audit_prompt(budget=budget, **kwargs)
+
+
+def test_fits_without_trimming():
+    system, user, breakdown = _build(100000)
+    assert breakdown["ocr_lines_dropped"] == 0 and breakdown["rules_dropped"] == 0
+    assert not breakdown["transcript_compressed"] and not breakdown["over_budget"]
+    assert all(rule in system for rule in RULES)
+    assert TRANSCRIPT in user
+
+
+def test_ocr_is_trimmed_first_latest_lines_first():
+    budget = _build(100000)[2]["total"] - 50
+    _, user, breakdown = _build(budget)
+    assert 0 < breakdown["ocr_lines_dropped"] < len(OCR)
+    assert breakdown["rules_dropped"] == 0 and not breakdown["transcript_compressed"]
+    assert "caption 0 " in user and "caption 19 " not in user
+    assert breakdown["total"] <= budget
+
+
+def test_rules_are_trimmed_after_ocr_keeping_the_best_match():
+    without_ocr = _build(100000, ocr_text=[])[2]["total"]
+    budget = without_ocr - count_tokens(RULES[-1]) // 2
+    system, _, breakdown = _build(budget)
+    assert breakdown["ocr_lines_dropped"] == len(OCR)
+    assert breakdown["rules_dropped"] >= 1 and not breakdown["transcript_compressed"]
+    assert RULES[0] in system and RULES[-1] not in system
+
+
+def test_transcript_is_compressed_last_keeping_start_and_end():
+    budget = 600
+    system, user, breakdown = _build(budget)
+    assert breakdown["ocr_lines_dropped"] == len(OCR)
+    assert breakdown["rules_dropped"] == len(RULES) - 1
+    assert breakdown["transcript_compressed"]
+    assert RULES[0] in system
+    assert "Sentence number 0 " in user and "Sentence number 199 " in user
+    assert "words omitted" in user
+    assert breakdown["total"] <= budget
+
+
+def test_repeated_sentences_are_removed_before_eliding():
+    repeated = "Buy it now. " * 300 + "Terms apply."
+    kwargs = dict(rules=RULES[:1], ocr_text=None, transcript=repeated)
+    budget = _build(100000, **kwargs)[2]["total"] - 200
+    _, user, breakdown = _build(budget, **kwargs)
+    assert breakdown["transcript_compressed"]
+    assert user.count("Buy it now.") == 1 and "Terms apply." in user
+    assert "words omitted" not in user
+
+
+def test_budget_per_model(monkeypatch):
+    monkeypatch.delenv("AUDIT_PROMPT_TOKEN_BUDGET", raising=False)
+    assert prompt_builder.token_budget("gpt-35-turbo") == 3000
+    assert prompt_builder.token_budget("unknown") == prompt_builder.DEFAULT_TOKEN_BUDGET
+    monkeypatch.setenv("AUDIT_PROMPT_TOKEN_BUDGET", "1234")
+    assert prompt_builder.token_budget("gpt-4o") == 1234
+
+
+def test_failed_tokenizer_load_warns_once(monkeypatch, caplog):
+    monkeypatch.setattr(prompt_builder, "_tokenizer_failed", False)
+    monkeypatch.setitem(sys.modules, "tiktoken", None)  # import fails
+    with caplog.at_level(logging.WARNING, logger="prompt-builder"):
+        for model in ("gpt-4o", "gpt-4o", "gpt-4.1", None):
+            assert count_tokens("abcdefgh", model) == 2
+    assert sum("Tokenizer unavailable" in r.message for r in caplog.records) == 1
@@ -0,0 +1,173 @@
+import types
+
+import pytest
+
+from backend.src.services import rate_limiter
+from backend.src.services.rate_limiter import LocalBuckets, RateLimiter, call_with_retries, retry_after_seconds
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f"status {response.status_code}")
+        self.response = response
+
+
+class Clock:
+    '''Stands in for the time module : sleeping advances the monotonic clock.'''
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setenv("RATE_LIMIT_BACKOFF_BASE_SECONDS", "0.01")
+    monkeypatch.setenv("RATE_LIMIT_MAX_RETRIES", "3")
+    return clock
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    buckets = LocalBuckets()
+    monkeypatch.setitem(rate_limiter._limiters, "test", RateLimiter("test", buckets))
+    return buckets
+
+
+def _scripted(*outcomes):
+    outcomes = list(outcomes)
+    calls = []
+
+    def call():
+        calls.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    return call, calls
+
+
+def test_transient_status_is_retried_and_discarded_responses_closed(clock, buckets):
+    failed = [Response(503), Response(500)]
+    call, calls = _scripted(*failed, Response(200))
+    assert call_with_retries("test", call).status_code == 200
+    assert len(calls) == 3
+    assert all(response.closed for response in failed)
+    assert len(clock.sleeps) == 2 and all(0 <= s <= 0.02 for s in clock.sleeps)
+
+
+def test_client_errors_are_not_retried(clock, buckets):
+    call, calls = _scripted(Response(400))
+    assert call_with_retries("test", call).status_code == 400
+    assert len(calls) == 1 and not clock.sleeps
+
+
+def test_retry_after_wins_over_backoff_and_pauses_the_endpoint(clock, buckets):
+    call, _ = _scripted(Response(429, {"Retry-After": "5"}), Response(200))
+    call_with_retries("test", call)
+    assert 5 <= clock.sleeps[0] <= 6
+    # the pause was set from the moment of the 429, so it is over once the caller slept
+    assert buckets.take("test", []) == 0.0
+
+
+def test_retry_after_ms_and_http_date():
+    assert retry_after_seconds(Response(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(HTTPError(Response(429, {"x-ms-retry-after-ms": "1500"}))) == 1.5
+    assert retry_after_seconds(Response(503, {"Retry-After": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0.0
+    assert retry_after_seconds(Response(503, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(Response(503)) is None
+
+
+def test_paused_endpoint_makes_other_callers_wait(clock, monkeypatch):
+    buckets = LocalBuckets()
+    monkeypatch.setitem(rate_limiter._limiters, "test", RateLimiter("test", buckets, rpm=6000))
+    buckets.pause("test", 3)
+    assert buckets.take("test", []) == pytest.approx(3)
+    call, _ = _scripted(Response(200))
+    call_with_retries("test", call)
+    assert sum(clock.sleeps) == pytest.approx(3)
+
+
+def test_connection_errors_are_retried_then_raised(clock, buckets):
+    call, calls = _scripted(*[ConnectionError("reset")] * 4)
+    with pytest.raises(ConnectionError) as excinfo:
+        call_with_retries("test", call)
+    assert len(calls) == 4
+    assert excinfo.value.retries_exhausted
+
+
+def test_exhausted_inner_call_is_not_retried_again(clock, buckets):
+    def outer():
+        return call_with_retries("test", inner, max_retries=1)
+
+    inner, calls = _scripted(*[ReadTimeout()] * 10)
+    with pytest.raises(ReadTimeout):
+        call_with_retries("test", outer)
+    assert len(calls) == 2
+
+
+def test_last_response_is_returned_when_retries_run_out(clock, buckets):
+    responses = [Response(502) for _ in range(3)]
+    call, calls = _scripted(*responses)
+    assert call_with_retries("test", call, max_retries=2) is responses[-1]
+    assert not responses[-1].closed and len(calls) == 3
+
+
+@pytest.mark.parametrize("outcome, retried", [
+    (Response(429), True),
+    (HTTPError(Response(429)), True),
+    (ConnectionError("refused"), True),
+    (Response(503), False),
+    (HTTPError(Response(500)), False),
+    (ReadTimeout(), False),
+])
+def test_non_idempotent_calls_retry_only_unsent_failures(clock, buckets, outcome, retried):
+    call, calls = _scripted(outcome, Response(200))
+    try:
+        call_with_retries("test", call, idempotent=False)
+    except Exception as e:
+        assert e is outcome
+    assert len(calls) == (2 if retried else 1)
+
+
+def test_buckets_throttle_to_the_configured_rate(clock, monkeypatch):
+    # 60 requests/min with a 1 second burst : one request per second after the first
+    monkeypatch.setitem(rate_limiter._limiters, "test", RateLimiter("test", LocalBuckets(), rpm=60, burst_seconds=1))
+    limiter = rate_limiter.get_rate_limiter("test")
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.acquire() == pytest.approx(1.0)
+
+
+def test_settle_charges_tokens_used_beyond_the_estimate(clock):
+    limiter = RateLimiter("test", LocalBuckets(), tpm=600, burst_seconds=60)  # 600 token bucket, 10/s
+    assert limiter.acquire(tokens=100) == 0.0
+    limiter.settle(100, 600)
+    # the bucket is empty after the 500 token correction : 100 more tokens take 10 seconds
+    assert limiter.acquire(tokens=100) == pytest.approx(10.0)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from backend.src.services import retrievers
+from backend.src.services.retrievers import LocalVectorIndex, export_local_index, load_local_entries
+
+DIMENSIONS = 32
+
+
+def _corpus(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, DIMENSIONS)).astype(np.float32)
+    documents = [Document(page_content=f"rule {i}", metadata={"chunk_id": f"c{i}"}) for i in range(rows)]
+    return vectors, documents
+
+
+def _exact_top(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [f"rule {i}" for i in np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k]]
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+@pytest.mark.parametrize("ann_lists", [0, 8])
+def test_top_k_matches_exact_search(tmp_path, quantization, ann_lists):
+    vectors, documents = _corpus()
+    path = str(tmp_path / "rules_index")
+    export_local_index(path, vectors, documents, quantization=quantization, ann_lists=ann_lists)
+    # probing every list makes IVF exhaustive, so results must equal brute force
+    index = LocalVectorIndex(path, embedding_function=None, nprobe=ann_lists or 4)
+    for query in vectors[:20]:
+        got = [doc.page_content for doc, _ in index.search_vector(query, k=5)]
+        expected = _exact_top(vectors, query, 5)
+        assert got[0] == expected[0]
+        if quantization == "none":
+            assert got == expected
+        else:
+            assert len(set(got) & set(expected)) >= 4
+
+
+def test_scores_are_sorted_cosine_similarities(tmp_path):
+    vectors, documents = _corpus(rows=50)
+    path = str(tmp_path / "rules_index")
+    export_local_index(path, vectors, documents)
+    results = LocalVectorIndex(path, embedding_function=None).search_vector(vectors[3], k=4)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_int8_scoring_spans_row_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrievers, "INT8_BLOCK_ROWS", 7)
+    vectors, documents = _corpus(rows=50)
+    path = str(tmp_path / "rules_index")
+    export_local_index(path, vectors, documents, quantization="int8")
+    index = LocalVectorIndex(path, embedding_function=None)
+    assert index.search_vector(vectors[49], k=1)[0][0].page_content == "rule 49"
+
+
+def test_k_larger_than_index(tmp_path):
+    vectors, documents = _corpus(rows=3)
+    path = str(tmp_path / "rules_index")
+    export_local_index(path, vectors, documents)
+    assert len(LocalVectorIndex(path, embedding_function=None).search_vector(vectors[0], k=10)) == 3
+
+
+def test_load_local_entries_round_trip(tmp_path):
+    vectors, documents = _corpus(rows=10)
+    path = str(tmp_path / "rules_index")
+    export_local_index(path, vectors, documents, quantization="int8", version="v1")
+    entries = load_local_entries(path)
+    assert sorted(entries) == sorted(f"c{i}" for i in range(10))
+    doc, vector = entries["c4"]
+    assert doc.page_content == "rule 4"
+    unit = vectors[4] / np.linalg.norm(vectors[4])
+    assert np.allclose(vector, unit, atol=0.02)
+
+
+def test_retriever_reloads_after_re_export(tmp_path, monkeypatch):
+    path = str(tmp_path / "rules_index")
+    monkeypatch.setenv("RULES_RETRIEVER", "local")
+    monkeypatch.setenv("RULES_LOCAL_INDEX_PATH", path)
+    monkeypatch.setattr(retrievers.client_registry, "get_embeddings", lambda: type("E", (), {"embed_query": None})())
+    monkeypatch.setattr(retrievers, "_retrievers", {})
+
+    vectors, documents = _corpus(rows=20)
+    export_local_index(path, vectors, documents, version="v1")
+    first = retrievers.get_rules_retriever()
+    assert retrievers.get_rules_retriever() is first
+
+    export_local_index(path, vectors[:5], documents[:5], version="v2")
+    second = retrievers.get_rules_retriever()
+    assert second is not first
+    assert len(second.documents) == 5
+    # the old memory map stays readable for queries already holding it
+    assert len(first.search_vector(vectors[0], k=3)) == 3